@@ -9,59 +9,55 @@
 
 
 import os
-import subprocess
+import sys
+from extract_specific_traces import process_sgy_file_groups
 
-def process_folder(root_folder, x1, x2, python_script_path):
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common_tools'))
+from batch_runner import run_batch, report
+
+def process_folder(root_folder, param_groups, processes=None):
     """
-    Process all .sgy files in a given folder, invoking an external Python script for each file.
+    Process all .sgy files in a given folder, cutting every trace range from one read of each file.
 
     Args:
         root_folder (str): The root directory containing .sgy files to process.
-        x1 (int): The starting parameter for processing.
-        x2 (int): The ending parameter for processing.
-        python_script_path (str): The path to the Python script to be executed.
+        param_groups (list): (x1, x2) trace ranges (1-based, inclusive) to extract.
+        processes (int): Number of worker processes, defaults to the number of CPU cores.
 
     Returns:
-        None
+        list: Paths of the files that could not be processed.
     """
-    # Create an output folder with a suffix based on parameters
-    output_suffix = f"_{x1}_{x2}"
-    output_folder = os.path.join(os.path.dirname(root_folder), os.path.basename(root_folder) + output_suffix)
-    os.makedirs(output_folder, exist_ok=True)
-    print("Output folder:", output_folder)
+    # Create an output folder per parameter group with a suffix based on the parameters
+    groups = []
+    for x1, x2 in param_groups:
+        output_suffix = f"_{x1}_{x2}"
+        output_folder = os.path.join(os.path.dirname(root_folder), os.path.basename(root_folder) + output_suffix)
+        os.makedirs(output_folder, exist_ok=True)
+        print("Output folder:", output_folder)
+        groups.append((x1, x2, output_folder))
 
-    # Traverse the directory and process each .sgy file
+    # Traverse the directory and process the .sgy files on a worker pool
+    tasks = []
     for foldername, subfolders, filenames in os.walk(root_folder):
         for filename in filenames:
             if filename.endswith('.sgy'):
-                sgy_file_path = os.path.join(foldername, filename)
-                print("Processing file:", sgy_file_path)
-
-                # Call the external Python script using subprocess
-                cmd = ["python", python_script_path, sgy_file_path, output_folder, str(x1), str(x2)]
-                result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
+                tasks.append((os.path.join(foldername, filename), groups))
 
-                # Debugging information for subprocess
-                print(f"Debug: Subprocess command: {' '.join(cmd)}")
-                print("Debug: Subprocess output:", result.stdout)
-                if result.stderr:
-                    print("Debug: Subprocess error:", result.stderr)
-                print("Debug: Subprocess return code:", result.returncode)
+    results = run_batch(process_sgy_file_groups, tasks, processes, desc="Extracting traces")
+    return report(results)
 
 if __name__ == "__main__":
     """
     Main entry point of the script.
 
-    This script processes all .sgy files in the specified root folder by calling an external Python script with 
-    various parameter groups. The results for each parameter group are saved in separate output folders.
+    This script processes all .sgy files in the specified root folder with various parameter groups.
+    Every file is read once for all groups; the results for each parameter group are saved in separate
+    output folders.
     """
 
     # Define the root folder containing the .sgy files
     root_folder = r"H:\experiment\2306_主动源面波\DAS data\zdy\0621（无阴井）\36\2023-06-21_sgy"
 
-    # Path to the external Python script to process each file
-    python_script_path = r"H:\code_copy\active_source_classification\1_extract_specific_traces\extract_specific_traces.py"
-
     # Parameter groups to be used for processing
     param_groups = [
         (46, 170),
@@ -71,7 +67,9 @@ if __name__ == "__main__":
         (1784, 1927),
         (1963, 2054),
     ]
+
+    # Number of worker processes (None = number of CPU cores)
+    processes = None
     
-    # Loop through each parameter group and process the folder
-    for x1, x2 in param_groups:
-        process_folder(root_folder, x1, x2, python_script_path)
+    # Process the folder for all parameter groups at once
+    process_folder(root_folder, param_groups, processes)
@@ -8,44 +8,44 @@
 '''
 
 
-import segyio
 import os
 import re
 import sys
 import argparse
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'process_file_sgy'))
+from sgy_subset import copy_trace_range, extract_subsets, output_name
+
 def extract_numbers_from_parent_folder_name(folder_path):
     parent_folder_name = os.path.basename(os.path.dirname(folder_path))
     return re.findall(r'\d+', parent_folder_name)
 
 def process_sgy_file(sgy_file_path, x1, x2, output_folder):
-    path = os.path.dirname(sgy_file_path)
-    base_name = os.path.basename(sgy_file_path)
-    base_name_no_ext = os.path.splitext(base_name)[0]
-    new_name = f"{base_name_no_ext}_{x1}_{x2}.sgy"
-    new_file_path = os.path.join(output_folder, new_name)
-
-    copy_trace_range(sgy_file_path, new_file_path, x1, x2)
-
-def copy_trace_range(src_filename, dst_filename, start_trace, end_trace):
-    with segyio.open(src_filename, "r", ignore_geometry=True) as src:
-        if start_trace < 1 or end_trace > src.tracecount:
-            print(f"Invalid trace range. File contains {src.tracecount} traces.")
-            return
-
-        spec = segyio.tools.metadata(src)
-        spec.tracecount = end_trace - start_trace + 1
-
-        with segyio.create(dst_filename, spec) as dst:
-            dst.text[0] = src.text[0]
-            dst.bin = src.bin
-
-            for i in range(start_trace - 1, end_trace):
-                dst.trace[i - start_trace + 1] = src.trace[i]
-                dst.header[i - start_trace + 1] = src.header[i]
-                dst.header[i - start_trace + 1].update({segyio.TraceField.TRACE_SEQUENCE_LINE: i - start_trace + 2})
-
-        print(f"Copied traces {start_trace} to {end_trace} from {src_filename} to {dst_filename}.")
+    new_file_path = output_name(sgy_file_path, output_folder, f"_{x1}_{x2}")
+
+    if copy_trace_range(sgy_file_path, new_file_path, x1, x2):
+        print(f"Copied traces {x1} to {x2} from {sgy_file_path} to {new_file_path}.")
+
+def process_sgy_file_groups(sgy_file_path, groups):
+    """
+    Extract several trace ranges from one SEG-Y file with a single read of the source.
+
+    Args:
+        sgy_file_path (str): Path to the input SEG-Y file.
+        groups (list): (x1, x2, output_folder) for every trace range (1-based, inclusive).
+
+    Returns:
+        list: Paths of the files written.
+    """
+    subsets = [
+        {"dst_filename": output_name(sgy_file_path, output_folder, f"_{x1}_{x2}"),
+         "start_trace": x1, "end_trace": x2}
+        for x1, x2, output_folder in groups
+    ]
+    written = extract_subsets(sgy_file_path, subsets)
+    for dst_filename in written:
+        print(f"Copied traces to {dst_filename}.")
+    return written
 
 def main():
     parser = argparse.ArgumentParser(description='Extract specific traces from a SEG-Y file.')
@@ -10,9 +10,9 @@
 
 import os
 import json
-from shot_time_match_module import match_shot_time
-from stalta_module import process_sgy
-from total_energy_module import filter_high_energy_files
+import logging
+from screening_module import screen_files
+from shot_time_match_module import load_shot_log
 from utils import setup_logging, create_output_folder, list_sgy_files
 
 def load_config(config_path):
@@ -42,23 +42,21 @@ def main():
     input_folders = config['input_folders']
     txt_file_path = config['txt_file_path']
     
-    # Step 1: Match shot times and copy files
-    for folder in input_folders:
-        sgy_files = list_sgy_files(folder)
-        for file_path in sgy_files:
-            match_shot_time(file_path, txt_file_path, output_folder)
+    # STA/LTA parameters; the trigger thresholds are top-level settings
+    stalta_params = dict(config["stalta_params"], threshold=config["threshold"])
+    if "threshold_off" in config:
+        stalta_params["threshold_off"] = config["threshold_off"]
+    energy_threshold = config.get("energy_threshold", 1000)
 
-    # Step 2: Process SEG-Y files with STA/LTA
-    stalta_params = config["stalta_params"]
-    for folder in input_folders:
-        sgy_files = list_sgy_files(folder)
-        for file_path in sgy_files:
-            process_sgy(file_path, output_folder, stalta_params)
+    # Load the shot time index once for all files (cached next to the text file)
+    shot_log = load_shot_log(txt_file_path)
+    tolerance = config.get("shot_time_tolerance", 0)
 
-    # Step 3: Filter high-energy files
-    energy_threshold = config.get("energy_threshold", 1000)
-    for folder in input_folders:
-        filter_high_energy_files(folder, output_folder, energy_threshold)
+    # Single pass: every file is read once for shot-time matching, STA/LTA and energy
+    sgy_files = (file_path for folder in input_folders for file_path in list_sgy_files(folder))
+    for result in screen_files(sgy_files, output_folder, stalta_params, shot_log, energy_threshold, tolerance):
+        logging.info(f"{result['file_path']}: {len(result['extracted'])} trigger windows, "
+                     f"energy {result['energy']:.6g}")
 
 if __name__ == "__main__":
     main()
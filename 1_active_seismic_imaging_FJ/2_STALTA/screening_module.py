@@ -0,0 +1,105 @@
+# -*- encoding: utf-8 -*-
+'''
+@File        :   screening_module.py
+@Time        :   2026/10/18 15:48:12
+@Author      :   Haiyang Liao
+@Affiliation :   Nanjing University (NJU)
+@Contact     :   haiyangliao@smail.nju.edu.cn
+@Description :   Single-pass screening of active-source SEG-Y files. Each file is read once;
+                 the shot-time lookup, the trace-mean STA/LTA curve, the trigger windows and
+                 the total energy are all taken from that one in-memory copy, and the
+                 results are streamed file by file to the next stage.
+'''
+
+
+import os
+import sys
+from shot_time_match_module import lookup_shot_time
+from stalta_module import compute_stalta_mean, detect_triggers, extract_trigger_windows, stalta_settings
+from total_energy_module import compute_total_energy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'process_file_sgy'))
+from sgy_block_io import decode_samples
+from sgy_subset import load_sgy
+
+def screen_sgy(file_path, output_folder, params, shot_log, energy_threshold, tolerance=0):
+    """
+    Screen one SEG-Y file with a single read.
+
+    Does what the separate shot-time, STA/LTA and energy steps did: copies the file as
+    `matched_<name>` if exactly one shot time lies within the tolerance, writes every trigger window as
+    `extracted_<time>.sgy`, and copies the file under its own name if its total energy
+    exceeds the threshold. The copies are written from memory.
+
+    Args:
+        file_path (str): Path to the `.sgy` file.
+        output_folder (str): Folder to save results.
+        params (dict): STA/LTA parameters (threshold, duration, optional nsta, nlta, method).
+        shot_log (ShotLog): Shot time table from `load_shot_log`.
+        energy_threshold (float): Minimum total energy for the energy copy.
+        tolerance (float): Half width of the shot time match window in seconds.
+
+    Returns:
+        dict: `file_path`, `shot_match` (see `ShotLog.lookup`, None for an invalid
+              name), `trigger_times`, `extracted` (written windows), `energy` and
+              `source` (the file in memory, as returned by `sgy_subset.load_sgy`).
+    """
+    base_name = os.path.basename(file_path)
+    source = load_sgy(file_path)
+    binary, raw, records = source
+    sample_interval = binary["Interval"] / 1_000_000
+    data = decode_samples(records["data"], binary["Format"])
+
+    # Shot-time lookup against the preloaded table
+    match = lookup_shot_time(base_name, shot_log, tolerance)
+    if match is None:
+        print(f"Invalid timestamp in {base_name}.")
+    elif match["candidates"] == 1:
+        output_file = os.path.join(output_folder, f"matched_{base_name}")
+        raw.tofile(output_file)
+        print(f"Matched file saved: {output_file}.")
+    elif match["ambiguous"]:
+        print(f"Multiple matches found for {base_name}.")
+    else:
+        print(f"No match found for {base_name}.")
+
+    # STA/LTA triggers and their windows
+    curve = compute_stalta_mean(data, *stalta_settings(params))
+    trigger_times = detect_triggers(file_path, curve, sample_interval, output_folder, params)
+    extracted = extract_trigger_windows(file_path, trigger_times, params["duration"], output_folder, source)
+
+    # Total energy from the same buffer
+    energy = compute_total_energy(data)
+    if energy > energy_threshold:
+        raw.tofile(os.path.join(output_folder, base_name))
+        print(f"File {base_name} copied (Energy: {energy}).")
+
+    return {
+        "file_path": file_path,
+        "shot_match": match,
+        "trigger_times": trigger_times,
+        "extracted": extracted,
+        "energy": energy,
+        "source": source,
+    }
+
+def screen_files(file_paths, output_folder, params, shot_log, energy_threshold, tolerance=0):
+    """
+    Screen SEG-Y files one after another, yielding each result as soon as it is ready.
+
+    Only one file is held in memory at a time, so a following stage can consume the
+    results (including the in-memory file) while the next file is being read.
+
+    Args:
+        file_paths (iterable): Paths of the `.sgy` files.
+        output_folder (str): Folder to save results.
+        params (dict): STA/LTA parameters (threshold, duration).
+        shot_log (ShotLog): Shot time table from `load_shot_log`.
+        energy_threshold (float): Minimum total energy for the energy copy.
+        tolerance (float): Half width of the shot time match window in seconds.
+
+    Yields:
+        dict: Result of `screen_sgy` for each file.
+    """
+    for file_path in file_paths:
+        yield screen_sgy(file_path, output_folder, params, shot_log, energy_threshold, tolerance)
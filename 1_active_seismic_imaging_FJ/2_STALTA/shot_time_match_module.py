@@ -9,10 +9,168 @@
 
 
 import os
+import re
 import shutil
-from datetime import datetime, timedelta
+import numpy as np
 
-def match_shot_time(file_path, txt_file_path, output_folder):
+SHOT_LOG_CACHE_SUFFIX = ".shotidx"  # Parsed shot log cached next to the text file
+SHOT_LOG_VERSION = 2
+
+# e.g. 2024-05-02-10-21-33 or 2024-05-02-10-21-33.250
+TIMESTAMP_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})-(\d{2})-(\d{2})-(\d{2})(\.\d+)?')
+
+def parse_timestamp(text):
+    """
+    Convert a `YYYY-MM-DD-HH-MM-SS[.fff]` time stamp to np.datetime64.
+
+    Returns:
+        np.datetime64: Time in milliseconds, or NaT if `text` holds no time stamp.
+    """
+    match = TIMESTAMP_PATTERN.search(text)
+    if not match:
+        return np.datetime64("NaT", "ms")
+    date, hour, minute, second, fraction = match.groups()
+    return np.datetime64(f"{date}T{hour}:{minute}:{second}{fraction or ''}", "ms")
+
+class ShotLog:
+    """
+    Shot time table sorted by time, resolved with binary search.
+
+    Use `load_shot_log` to create one from the shot time text file.
+    """
+
+    def __init__(self, times, lines):
+        order = np.argsort(times, kind="stable")
+        self.times = times[order]
+        self.lines = lines[order]
+        self.seconds = self.times.astype("datetime64[s]").astype("datetime64[ms]")
+
+    def lookup_many(self, times, tolerance=0):
+        """
+        Resolve many times at once.
+
+        Args:
+            times (np.ndarray): Times as datetime64.
+            tolerance (float): Half width of the match window in seconds. Times are cut to
+                               whole seconds on both sides first, so 0 matches shots in
+                               the same second and a larger tolerance never matches fewer.
+
+        Returns:
+            tuple: (index of the nearest shot, offset to it in seconds, number of shots
+                   within the tolerance window). The index is -1 for an empty log.
+        """
+        times = np.asarray(times, dtype="datetime64[ms]")
+        # Whole seconds on both sides, as in the time stamp comparison of the original matcher
+        exact_times = times
+        times = times.astype("datetime64[s]").astype("datetime64[ms]")
+        shot_times = self.seconds
+        tol = np.timedelta64(int(round(tolerance * 1000)), "ms")
+        count = (np.searchsorted(shot_times, times + tol, side="right")
+                 - np.searchsorted(shot_times, times - tol, side="left"))
+        if len(shot_times) == 0:
+            return np.full(times.shape, -1), np.full(times.shape, np.inf), count
+
+        # Nearest shot is either side of the insertion point
+        right = np.clip(np.searchsorted(shot_times, times), 0, len(shot_times) - 1)
+        left = np.clip(right - 1, 0, len(shot_times) - 1)
+        offset_right = (shot_times[right] - times) / np.timedelta64(1, "s")
+        offset_left = (shot_times[left] - times) / np.timedelta64(1, "s")
+        use_left = np.abs(offset_left) < np.abs(offset_right)
+        nearest = np.where(use_left, left, right)
+        offset = (self.times[nearest] - exact_times) / np.timedelta64(1, "s")
+        return nearest, offset, count
+
+    def lookup(self, time, tolerance=0):
+        """
+        Resolve one time.
+
+        Args:
+            time (np.datetime64): Time to match.
+            tolerance (float): Half width of the match window in seconds.
+
+        Returns:
+            dict: `line` (the nearest shot within the tolerance, or None), `offset`
+                  (seconds from `time` to the nearest shot), `candidates` (shots within
+                  the tolerance) and `ambiguous` (True if there is more than one).
+        """
+        nearest, offset, count = self.lookup_many(np.array([time]), tolerance)
+        candidates = int(count[0])
+        return {
+            "line": str(self.lines[nearest[0]]) if candidates else None,
+            "offset": float(offset[0]),
+            "candidates": candidates,
+            "ambiguous": candidates > 1,
+        }
+
+def _parse_shot_log(txt_file_path):
+    times, lines = [], []
+    with open(txt_file_path, "r") as f:
+        for line in f:
+            time = parse_timestamp(line)
+            if not np.isnat(time):
+                times.append(time)
+                lines.append(line.rstrip("\n"))
+    return np.array(times, dtype="datetime64[ms]"), np.array(lines, dtype=str)
+
+def load_shot_log(txt_file_path, cache=True):
+    """
+    Load the shot time table, using the cached index if the text file is unchanged.
+
+    Args:
+        txt_file_path (str): Text file with one shot per line, time stamp anywhere in the line.
+        cache (bool): Read and write the parsed index at `<txt_file_path>.shotidx`; if it
+                      cannot be written, the parsed index is used without caching.
+
+    Returns:
+        ShotLog: The sorted shot table.
+    """
+    cache_path = txt_file_path + SHOT_LOG_CACHE_SUFFIX
+    stat = os.stat(txt_file_path)
+    if cache and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f, np.load(f) as archive:
+                if (int(archive["version"]) == SHOT_LOG_VERSION and int(archive["size"]) == stat.st_size
+                        and float(archive["mtime"]) == stat.st_mtime):
+                    return ShotLog(archive["times"], archive["lines"])
+        except (OSError, ValueError, KeyError) as e:
+            # An unreadable or partly written index is parsed again
+            print(f"Shot log index {cache_path} ignored: {e}")
+
+    times, lines = _parse_shot_log(txt_file_path)
+    shot_log = ShotLog(times, lines)
+    if cache:
+        # The index is only an optimization; a read-only folder must not stop the run
+        try:
+            with open(cache_path, "wb") as f:
+                np.savez_compressed(f, version=SHOT_LOG_VERSION, size=stat.st_size, mtime=stat.st_mtime,
+                                    times=shot_log.times, lines=shot_log.lines)
+        except OSError as e:
+            print(f"Shot log index not cached at {cache_path}: {e}")
+            if os.path.exists(cache_path):
+                try:
+                    os.remove(cache_path)
+                except OSError:
+                    pass
+    return shot_log
+
+def lookup_shot_time(base_name, shot_log, tolerance=0):
+    """
+    Look up the shot matching the time stamp of a file name.
+
+    Args:
+        base_name (str): SEG-Y file name.
+        shot_log (ShotLog): Table from `load_shot_log`.
+        tolerance (float): Half width of the match window in seconds.
+
+    Returns:
+        dict: Result of `ShotLog.lookup`, or None if the file name has no time stamp.
+    """
+    time = parse_timestamp(base_name)
+    if np.isnat(time):
+        return None
+    return shot_log.lookup(time, tolerance)
+
+def match_shot_time(file_path, txt_file_path, output_folder, shot_log=None, tolerance=0):
     """
     Match shot times and copy files based on reference.
 
@@ -20,25 +178,26 @@ def match_shot_time(file_path, txt_file_path, output_folder):
         file_path (str): Path to the `.sgy` file.
         txt_file_path (str): Path to the text file containing reference times.
         output_folder (str): Folder to save results.
+        shot_log (ShotLog): Preloaded table from `load_shot_log`; loaded from `txt_file_path` if None.
+        tolerance (float): Half width of the match window in seconds.
 
     Returns:
         None
     """
     base_name = os.path.basename(file_path)
-    time_stamp = extract_timestamp(base_name)
+    if shot_log is None:
+        shot_log = load_shot_log(txt_file_path)
+    match = lookup_shot_time(base_name, shot_log, tolerance)
 
-    if not time_stamp:
+    if match is None:
         print(f"Invalid timestamp in {base_name}.")
         return
 
-    with open(txt_file_path, "r") as f:
-        matches = [line for line in f if time_stamp in line]
-
-    if len(matches) == 1:
+    if match["candidates"] == 1:
         output_file = os.path.join(output_folder, f"matched_{base_name}")
         shutil.copy(file_path, output_file)
         print(f"Matched file saved: {output_file}.")
-    elif len(matches) > 1:
+    elif match["ambiguous"]:
         print(f"Multiple matches found for {base_name}.")
     else:
         print(f"No match found for {base_name}.")
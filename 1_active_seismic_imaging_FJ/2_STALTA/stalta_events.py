@@ -0,0 +1,60 @@
+# -*- encoding: utf-8 -*-
+'''
+@File        :   stalta_events.py
+@Time        :   2026/10/18 16:58:03
+@Author      :   Haiyang Liao
+@Affiliation :   Nanjing University (NJU)
+@Contact     :   haiyangliao@smail.nju.edu.cn
+@Description :   Turns an STA/LTA curve into events. An event starts where the curve rises
+                 above the on threshold and ends where it falls below the off threshold;
+                 events separated by less than a minimum gap are merged, and each event
+                 reports its onset, end and peak, so one physical shot gives one event.
+'''
+
+
+import numpy as np
+
+
+def detect_events(curve, thr_on, thr_off=None, min_gap=0):
+    """
+    Detect events on a characteristic function with on/off thresholds.
+
+    Args:
+        curve (np.ndarray): STA/LTA curve (e.g. the trace mean).
+        thr_on (float): An event starts at the first sample above this value.
+        thr_off (float): The event ends at the first later sample below this value.
+                         Defaults to `thr_on`.
+        min_gap (int): Events whose onset is fewer than `min_gap` samples after the
+                       end of the previous event are merged into it.
+
+    Returns:
+        list: One dict per event with `onset`, `end` (exclusive) and `peak` sample
+              indices and `peak_value`, in time order.
+    """
+    curve = np.asarray(curve)
+    if thr_off is None:
+        thr_off = thr_on
+    if thr_off > thr_on:
+        raise ValueError(f"The off threshold ({thr_off}) must not exceed the on threshold ({thr_on}).")
+
+    above = curve > thr_on
+    rising = np.flatnonzero(above & ~np.concatenate(([False], above[:-1])))
+    below = np.flatnonzero(curve < thr_off)
+
+    # Pair every on-crossing with the next off-crossing; crossings inside an event are skipped
+    spans = []
+    for onset in rising:
+        if spans and onset < spans[-1][1]:
+            continue
+        k = np.searchsorted(below, onset)
+        end = int(below[k]) if k < len(below) else len(curve)
+        if spans and onset - spans[-1][1] < min_gap:
+            spans[-1][1] = end
+        else:
+            spans.append([int(onset), end])
+
+    events = []
+    for onset, end in spans:
+        peak = onset + int(np.argmax(curve[onset:end]))
+        events.append({"onset": onset, "end": end, "peak": peak, "peak_value": float(curve[peak])})
+    return events
@@ -0,0 +1,205 @@
+# -*- encoding: utf-8 -*-
+'''
+@File        :   stalta_kernels.py
+@Time        :   2026/10/18 16:20:37
+@Author      :   Haiyang Liao
+@Affiliation :   Nanjing University (NJU)
+@Contact     :   haiyangliao@smail.nju.edu.cn
+@Description :   Multi-trace STA/LTA kernels. A whole gather (trace_count, num_samples) is
+                 processed at once along the time axis: the classic and delayed variants
+                 take window sums from one cumulative sum, the recursive variant is an IIR
+                 filter. Traces are processed in chunks sized to a workspace budget
+                 (optionally on several threads) with float32 output, and `StaLtaStack`
+                 keeps only the running trace stack so the trace-mean curve can be
+                 computed while streaming a file.
+'''
+
+
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from scipy.signal import lfilter
+
+METHODS = ("classic", "recursive", "delayed")
+CHUNK_TRACES = 64             # Upper limit of the traces processed together
+WORKSPACE_BUDGET = 256 << 20  # Bytes of float64 workspace shared by all worker threads
+WORKSPACE_ARRAYS = 3          # Chunk-sized float64 arrays alive at once (cumulative sum, STA and LTA sums)
+
+_TINY = np.finfo(np.float64).tiny  # Avoids division by zero, as in obspy
+
+
+def _cumsum_energy(chunk):
+    """Cumulative energy with a leading zero column: window sum over [a, b] is P[b + 1] - P[a]."""
+    P = np.empty((chunk.shape[0], chunk.shape[1] + 1), dtype=np.float64)
+    P[:, 0] = 0
+    np.square(chunk, out=P[:, 1:], dtype=np.float64)
+    np.cumsum(P[:, 1:], axis=1, out=P[:, 1:])
+    return P
+
+
+def _window_ratio(sta_hi, sta_lo, lta_hi, lta_lo, nsta, nlta, out):
+    """(STA window sum / nsta) / (LTA window sum / nlta) written into `out`."""
+    num = sta_hi - sta_lo
+    num *= nlta / nsta
+    den = lta_hi - lta_lo
+    np.maximum(den, _TINY * nlta, out=den)
+    np.divide(num, den, out=out, casting="same_kind")
+
+
+def _classic(chunk, nsta, nlta, out):
+    # Same definition as obspy.signal.trigger.classic_sta_lta: both windows end at the
+    # current sample, zero before the LTA window is full
+    P = _cumsum_energy(chunk)
+    _window_ratio(P[:, nlta:], P[:, nlta - nsta:P.shape[1] - nsta],
+                  P[:, nlta:], P[:, :P.shape[1] - nlta], nsta, nlta, out[:, nlta - 1:])
+    out[:, :nlta - 1] = 0
+
+
+def _delayed(chunk, nsta, nlta, out):
+    # STA over the last nsta samples, LTA over the nlta samples just before the STA window
+    P = _cumsum_energy(chunk)
+    lag = nsta + nlta
+    _window_ratio(P[:, lag:], P[:, nlta:P.shape[1] - nsta],
+                  P[:, nlta:P.shape[1] - nsta], P[:, :P.shape[1] - lag], nsta, nlta, out[:, lag - 1:])
+    out[:, :lag - 1] = 0
+
+
+def _recursive(chunk, nsta, nlta, out):
+    # Same definition as obspy.signal.trigger.recursive_sta_lta: exponential averages from
+    # the second sample on, zero for the first nlta samples. Filtered in float32.
+    energy = np.square(chunk[:, 1:], dtype=np.float32)
+    csta, clta = np.float32(1.0 / nsta), np.float32(1.0 / nlta)
+    sta = lfilter(np.array([csta]), np.array([1, csta - 1], dtype=np.float32), energy, axis=1)
+    lta = lfilter(np.array([clta]), np.array([1, clta - 1], dtype=np.float32), energy, axis=1)
+    np.maximum(lta, np.finfo(np.float32).tiny, out=lta)
+    np.divide(sta, lta, out=out[:, 1:])
+    out[:, :nlta] = 0
+
+
+_KERNELS = {"classic": _classic, "recursive": _recursive, "delayed": _delayed}
+
+
+def _check(num_samples, nsta, nlta, method):
+    if method not in _KERNELS:
+        raise ValueError(f"Unknown STA/LTA method '{method}', expected one of {METHODS}.")
+    if not 0 < nsta < nlta:
+        raise ValueError(f"Expected 0 < nsta < nlta, got nsta={nsta}, nlta={nlta}.")
+    min_samples = nsta + nlta if method == "delayed" else nlta
+    if num_samples < min_samples:
+        raise ValueError(f"Traces have {num_samples} samples, {method} STA/LTA needs at least {min_samples}.")
+
+
+def chunk_size(num_samples, workers, budget=WORKSPACE_BUDGET):
+    """
+    Traces per chunk so that the workspace of all threads stays within `budget`.
+
+    Args:
+        num_samples (int): Samples per trace.
+        workers (int): Threads working on chunks at the same time.
+        budget (int): Bytes of workspace.
+
+    Returns:
+        int: Between 1 and `CHUNK_TRACES`. A single trace may still exceed the budget.
+    """
+    per_trace = WORKSPACE_ARRAYS * np.dtype(np.float64).itemsize * (num_samples + 1)
+    return int(max(1, min(CHUNK_TRACES, budget // (per_trace * max(1, workers)))))
+
+
+def _run_chunks(func, trace_count, num_samples, chunk_traces, workers):
+    """Apply `func(start, stop)` to consecutive trace chunks, on `workers` threads."""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunk_traces is None:
+        chunk_traces = chunk_size(num_samples, workers)
+    bounds = [(start, min(start + chunk_traces, trace_count)) for start in range(0, trace_count, chunk_traces)]
+    if workers <= 1 or len(bounds) == 1:
+        return [func(start, stop) for start, stop in bounds]
+    # numpy and scipy release the GIL in these kernels, so threads run in parallel
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda b: func(*b), bounds))
+
+
+def sta_lta(data, nsta, nlta, method="classic", chunk_traces=None, workers=None):
+    """
+    STA/LTA characteristic function of every trace of a gather.
+
+    Args:
+        data (np.ndarray): Samples of shape (trace_count, num_samples), any float type
+                           (e.g. a big-endian memmap view).
+        nsta (int): STA window length in samples.
+        nlta (int): LTA window length in samples.
+        method (str): "classic", "recursive" or "delayed".
+        chunk_traces (int): Traces processed together; derived from `WORKSPACE_BUDGET`,
+                            the trace length and `workers` if None.
+        workers (int): Threads; defaults to the number of CPU cores.
+
+    Returns:
+        np.ndarray: float32 array of shape (trace_count, num_samples).
+    """
+    data = np.atleast_2d(data)
+    _check(data.shape[1], nsta, nlta, method)
+    kernel = _KERNELS[method]
+    out = np.empty(data.shape, dtype=np.float32)
+    _run_chunks(lambda start, stop: kernel(data[start:stop], nsta, nlta, out[start:stop]),
+                data.shape[0], data.shape[1], chunk_traces, workers)
+    return out
+
+
+class StaLtaStack:
+    """
+    Running trace stack of STA/LTA curves.
+
+    Feed blocks of traces with `add`; only the per-sample sum over traces is kept,
+    so memory does not grow with the number of traces.
+    """
+
+    def __init__(self, nsta, nlta, method="classic", chunk_traces=None, workers=None):
+        self.nsta = nsta
+        self.nlta = nlta
+        self.method = method
+        self.chunk_traces = chunk_traces
+        self.workers = workers
+        self.total = None
+        self.count = 0
+
+    def _chunk_sum(self, traces):
+        out = np.empty(traces.shape, dtype=np.float32)
+        _KERNELS[self.method](traces, self.nsta, self.nlta, out)
+        return out.sum(axis=0, dtype=np.float64)
+
+    def add(self, traces):
+        """Add a block of traces of shape (n, num_samples)."""
+        traces = np.atleast_2d(traces)
+        _check(traces.shape[1], self.nsta, self.nlta, self.method)
+        sums = _run_chunks(lambda start, stop: self._chunk_sum(traces[start:stop]),
+                           traces.shape[0], traces.shape[1], self.chunk_traces, self.workers)
+        block_sum = np.sum(sums, axis=0)
+        self.total = block_sum if self.total is None else self.total + block_sum
+        self.count += traces.shape[0]
+
+    def mean(self):
+        """Trace-mean STA/LTA curve (float32) of everything added so far."""
+        if self.count == 0:
+            raise ValueError("No traces were added to the STA/LTA stack.")
+        return (self.total / self.count).astype(np.float32)
+
+
+def sta_lta_mean(data, nsta, nlta, method="classic", chunk_traces=None, workers=None):
+    """
+    Trace-mean STA/LTA curve of a gather without holding the per-trace curves.
+
+    Args:
+        data (np.ndarray): Samples of shape (trace_count, num_samples).
+        nsta (int): STA window length in samples.
+        nlta (int): LTA window length in samples.
+        method (str): "classic", "recursive" or "delayed".
+        chunk_traces (int): Traces processed together; derived from `WORKSPACE_BUDGET`,
+                            the trace length and `workers` if None.
+        workers (int): Threads; defaults to the number of CPU cores.
+
+    Returns:
+        np.ndarray: float32 curve of length num_samples.
+    """
+    stack = StaLtaStack(nsta, nlta, method, chunk_traces, workers)
+    stack.add(data)
+    return stack.mean()
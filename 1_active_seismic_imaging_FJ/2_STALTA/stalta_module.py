@@ -9,13 +9,113 @@
 
 
 import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
-import segyio
-from obspy.signal.trigger import classic_sta_lta
+from stalta_events import detect_events
+from stalta_kernels import StaLtaStack, sta_lta_mean
 from utils import create_output_folder
 
-def process_sgy(file_path, output_folder, params):
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'process_file_sgy'))
+from sgy_block_io import decode_samples, open_sgy
+from sgy_subset import extract_subsets
+
+NSTA = 1            # STA window length in samples
+NLTA = 1000         # LTA window length in samples
+METHOD = "classic"  # "classic", "recursive" or "delayed"
+STREAM_TRACES = 1024  # Traces decoded at a time when streaming a file
+
+def stalta_settings(params):
+    """(nsta, nlta, method) from the STA/LTA parameters, with the module defaults."""
+    return params.get("nsta", NSTA), params.get("nlta", NLTA), params.get("method", METHOD)
+
+def compute_stalta_mean(data, nsta=NSTA, nlta=NLTA, method=METHOD):
+    """
+    Trace-mean STA/LTA curve of a gather.
+
+    Args:
+        data (np.ndarray): Samples of shape (trace_count, num_samples).
+        nsta (int): STA window length in samples.
+        nlta (int): LTA window length in samples.
+        method (str): "classic", "recursive" or "delayed".
+
+    Returns:
+        np.ndarray: Mean STA/LTA curve (float32) of length num_samples.
+    """
+    return sta_lta_mean(data, nsta, nlta, method)
+
+def stream_stalta_mean(file_path, nsta=NSTA, nlta=NLTA, method=METHOD, stream_traces=STREAM_TRACES):
+    """
+    Trace-mean STA/LTA curve of a SEG-Y file, decoding `stream_traces` traces at a time.
+
+    Only the running stack is kept, so memory does not grow with the file size.
+
+    Args:
+        file_path (str): Path to the SEG-Y file.
+        nsta (int): STA window length in samples.
+        nlta (int): LTA window length in samples.
+        method (str): "classic", "recursive" or "delayed".
+        stream_traces (int): Traces read and decoded per block.
+
+    Returns:
+        tuple: (binary header dict, mean STA/LTA curve).
+    """
+    binary, records = open_sgy(file_path)
+    stack = StaLtaStack(nsta, nlta, method)
+    for start in range(0, binary["trace_count"], stream_traces):
+        stack.add(decode_samples(records["data"][start:start + stream_traces], binary["Format"]))
+    del records
+    return binary, stack.mean()
+
+def plot_stalta(sta_lta_mean, sample_interval, threshold, png_path, events=None, threshold_off=None):
+    """Plot the mean STA/LTA curve with the trigger thresholds and the detected events."""
+    time_axis = np.arange(len(sta_lta_mean)) * sample_interval * 1000
+    plt.plot(time_axis, sta_lta_mean)
+    plt.axhline(y=threshold, color='green', linestyle='--')
+    if threshold_off is not None and threshold_off != threshold:
+        plt.axhline(y=threshold_off, color='orange', linestyle=':')
+    for event in events or []:
+        plt.axvspan(time_axis[event["onset"]], time_axis[event["end"] - 1], color='red', alpha=0.2)
+    plt.savefig(png_path)
+    plt.close()
+
+def event_settings(params):
+    """(on threshold, off threshold, minimum gap in seconds) from the STA/LTA parameters."""
+    threshold = params["threshold"]
+    return threshold, params.get("threshold_off", threshold), params.get("min_gap", params["duration"])
+
+def detect_triggers(file_path, sta_lta_mean, sample_interval, output_folder, params):
+    """
+    Detect trigger events on a trace-mean STA/LTA curve and plot it.
+
+    Samples above the threshold are grouped into events (see `stalta_events.detect_events`),
+    so each shot gives one trigger at its onset instead of one per sample.
+
+    Args:
+        file_path (str): Path of the SEG-Y file the curve came from (used for naming).
+        sta_lta_mean (np.ndarray): Mean STA/LTA curve from `compute_stalta_mean`.
+        sample_interval (float): Sample interval in seconds.
+        output_folder (str): Folder to save output.
+        params (dict): STA/LTA parameters: `threshold` (on), optional `threshold_off`
+                       (defaults to `threshold`) and `min_gap` in seconds between
+                       events (defaults to `duration`).
+
+    Returns:
+        np.ndarray: Event onset times in seconds.
+    """
+    threshold, threshold_off, min_gap = event_settings(params)
+    events = detect_events(sta_lta_mean, threshold, threshold_off, int(round(min_gap / sample_interval)))
+    trigger_times = np.array([event["onset"] for event in events]) * sample_interval
+
+    plot_stalta(sta_lta_mean, sample_interval, threshold,
+                os.path.join(output_folder, f"{os.path.basename(file_path)}_stalta.png"), events, threshold_off)
+    for event in events:
+        print(f"Event in {os.path.basename(file_path)}: onset {event['onset'] * sample_interval:.3f} s, "
+              f"peak {event['peak'] * sample_interval:.3f} s (STA/LTA {event['peak_value']:.1f})")
+    print(f"Triggers detected in {file_path}: {trigger_times}")
+    return trigger_times
+
+def process_sgy(file_path, output_folder, params, source=None):
     """
     Process SEG-Y file to detect trigger events using STA/LTA and save results.
 
@@ -23,41 +123,70 @@ def process_sgy(file_path, output_folder, params):
         file_path (str): Path to the input SEG-Y file.
         output_folder (str): Folder to save output.
         params (dict): STA/LTA parameters (threshold, duration, etc.).
+        source (tuple): The file as returned by `sgy_subset.load_sgy`. If None, the file
+                        is streamed from disk and never held in memory as a whole.
 
     Returns:
-        None
+        list: Paths of the extracted trigger windows.
     """
-    threshold = params["threshold"]
     duration = params["duration"]
+    nsta, nlta, method = stalta_settings(params)
+    if source is None:
+        binary, curve = stream_stalta_mean(file_path, nsta, nlta, method)
+    else:
+        binary, raw, records = source
+        curve = compute_stalta_mean(decode_samples(records["data"], binary["Format"]), nsta, nlta, method)
+    sample_interval = binary["Interval"] / 1_000_000
 
-    with segyio.open(file_path, "r", ignore_geometry=True) as f:
-        sample_interval = f.bin[segyio.BinField.Interval] / 1_000_000
-        num_samples = f.bin[segyio.BinField.Samples]
-        trace_count = f.tracecount
+    trigger_times = detect_triggers(file_path, curve, sample_interval, output_folder, params)
+    return extract_trigger_windows(file_path, trigger_times, duration, output_folder, source, binary)
 
-        sta_lta_all = np.zeros((trace_count, num_samples))
-        nsta = 1
-        nlta = 1000
 
-        for i in range(trace_count):
-            trace = f.trace[i]
-            sta_lta_all[i] = classic_sta_lta(trace, nsta, nlta)
+def extract_trigger_windows(file_path, trigger_times, duration, output_folder, source=None, binary=None):
+    """
+    Cut every trigger window in one write pass.
 
-        sta_lta_mean = np.mean(sta_lta_all, axis=0)
-        trigger_indices = np.where(sta_lta_mean > threshold)[0]
-        trigger_times = trigger_indices / (1 / sample_interval)
+    Args:
+        file_path (str): Path to the input SEG-Y file.
+        trigger_times (np.ndarray): Window start times in seconds.
+        duration (float): Window length in seconds.
+        output_folder (str): Folder to save output.
+        source (tuple): The file as returned by `sgy_subset.load_sgy`; read from disk if None.
+        binary (dict): Binary header of the file, needed when `source` is None.
 
-        time_axis = np.arange(len(sta_lta_mean)) * sample_interval * 1000
-        plt.plot(time_axis, sta_lta_mean)
-        plt.axhline(y=threshold, color='green', linestyle='--')
-        plt.savefig(os.path.join(output_folder, f"{os.path.basename(file_path)}_stalta.png"))
-        plt.close()
+    Returns:
+        list: Paths of the extracted windows.
+    """
+    if source is not None:
+        binary = source[0]
+    record_length = binary["Samples"] * binary["Interval"] / 1_000_000
+    subsets = [time_range_subset(file_path, time, duration, output_folder, record_length)
+               for time in trigger_times]
+    written = extract_subsets(file_path, subsets, source=source)
+    for output_file in written:
+        print(f"Time range extracted and saved to {output_file}.")
+    return written
 
-    print(f"Triggers detected in {file_path}: {trigger_times}")
 
-    # Call copy_time_range (logic encapsulated separately)
-    for time in trigger_times:
-        copy_time_range(file_path, time, duration, output_folder)
+def time_range_subset(file_path, start_time, duration, output_folder, record_length=None):
+    """
+    Describe one extracted time window for `sgy_subset.extract_subsets`.
+
+    Args:
+        file_path (str): Path to the input SEG-Y file.
+        start_time (float): Start time in seconds.
+        duration (float): Duration in seconds.
+        output_folder (str): Folder to save output.
+        record_length (float): Length of the record in seconds; windows running past the end are cut short.
+
+    Returns:
+        dict: Subset description with `dst_filename`, `start_time` and `end_time`.
+    """
+    end_time = start_time + duration
+    if record_length is not None:
+        end_time = min(end_time, record_length)
+    output_file = os.path.join(output_folder, f"extracted_{start_time:.2f}.sgy")
+    return {"dst_filename": output_file, "start_time": start_time, "end_time": end_time}
 
 
 def copy_time_range(file_path, start_time, duration, output_folder):
@@ -73,16 +202,6 @@ def copy_time_range(file_path, start_time, duration, output_folder):
     Returns:
         None
     """
-    with segyio.open(file_path, "r", ignore_geometry=True) as src:
-        sample_interval = src.bin[segyio.BinField.Interval] / 1_000_000
-        start_sample = int(start_time / sample_interval)
-        end_sample = start_sample + int(duration / sample_interval)
-
-        output_file = os.path.join(output_folder, f"extracted_{start_time:.2f}.sgy")
-        with segyio.create(output_file, segyio.tools.metadata(src)) as dst:
-            dst.text[0] = src.text[0]
-            dst.bin = src.bin
-            for i in range(src.tracecount):
-                dst.trace[i] = src.trace[i][start_sample:end_sample]
-
+    subset = time_range_subset(file_path, start_time, duration, output_folder)
+    for output_file in extract_subsets(file_path, [subset]):
         print(f"Time range extracted and saved to {output_file}.")
@@ -8,15 +8,24 @@
 '''
 
 
-import segyio
-import numpy as np
 import os
+import sys
+import shutil
+import numpy as np
 from utils import create_output_folder
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'process_file_sgy'))
+from sgy_block_io import decode_samples, open_sgy
+
+def compute_total_energy(data):
+    """Sum of squared samples of a (trace_count, num_samples) array, accumulated in float64."""
+    return float(np.einsum("ij,ij->", data, data, dtype=np.float64))
+
 def calculate_total_energy(file_path):
-    with segyio.open(file_path, "r", ignore_geometry=True) as f:
-        total_energy = sum(np.sum(trace**2) for trace in f.trace)
-    return total_energy
+    binary, records = open_sgy(file_path)
+    energy = compute_total_energy(decode_samples(records["data"], binary["Format"]))
+    del records
+    return energy
 
 def filter_high_energy_files(input_folder, output_folder, energy_threshold):
     for file in os.listdir(input_folder):
@@ -9,11 +9,18 @@
 
 
 import os
-import subprocess
 import re
+import sys
 import shutil
 import segyio
 import numpy as np
+from split_sgy import split_sgy_file
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common_tools'))
+from batch_runner import run_batch, report
+
+# Number of worker processes (None = number of CPU cores)
+processes = None
 
 # Store the paths of each folder and their respective coordinate points
 folders_and_coords = {
@@ -56,83 +63,86 @@ def reverse_traces(src_filename, dst_filename):
     except Exception as e:
         print(f"Error reversing traces in {src_filename}: {e}")
 
-# Path to the external script for splitting SEG-Y files
-script_path = r"H:\lhyonedrive\OneDrive\code_copy\active_source_classification\4_shot_center\split_sgy.py"
-problem_files = []
-
-# Process each folder and its respective coordinates
-for root_folder, coords in folders_and_coords.items():
-    a, b = calculate_a_b(coords)
-    parent_folder = os.path.dirname(root_folder)
-    output_folder = os.path.join(parent_folder, os.path.basename(root_folder) + "_centersplit")
-    left_folder = os.path.join(parent_folder, os.path.basename(root_folder) + "_left")
-    right_folder = os.path.join(parent_folder, os.path.basename(root_folder) + "_right")
-    left_reverse_folder = os.path.join(parent_folder, os.path.basename(root_folder) + "_left_reverse")
-
-    # Create necessary output directories if they do not exist
-    for folder in [output_folder, left_folder, right_folder, left_reverse_folder]:
-        if not os.path.exists(folder):
-            os.makedirs(folder)
-
-    print(f"Input folder: {root_folder}")
-    print(f"Output folder: {output_folder}")
-    print(f"Left folder: {left_folder}")
-    print(f"Right folder: {right_folder}")
-    print(f"Left reversed folder: {left_reverse_folder}")
-
-    # Process each file in the input folder
-    for subdir, dirs, files in os.walk(root_folder):
-        for file in files:
-            if file.endswith(".sgy"):
-                match = re.search(r'(\d+)-(\d+)_', file)
-                if match:
-                    try:
+def process_file(sgy_file_path, x_middle, output_folder, left_folder, right_folder, left_reverse_folder):
+    """Split one shot gather at its middle trace, then copy the halves and reverse the left one."""
+    print(f"Processing file: {sgy_file_path}, calculated middle trace index: {x_middle}")
+    if not split_sgy_file(sgy_file_path, x_middle, output_folder):
+        raise RuntimeError(f"Splitting failed for {sgy_file_path}")
+
+    base_name = os.path.splitext(os.path.basename(sgy_file_path))[0]
+    left_sgy_path = os.path.join(output_folder, f"{base_name}_left.sgy")
+    right_sgy_path = os.path.join(output_folder, f"{base_name}_right.sgy")
+
+    # Copy and reverse traces for left and right output files
+    if os.path.exists(left_sgy_path):
+        shutil.copy(left_sgy_path, left_folder)
+        reversed_left_sgy_path = os.path.join(left_reverse_folder, f"{base_name}_left_reversed.sgy")
+        reverse_traces(left_sgy_path, reversed_left_sgy_path)
+
+    if os.path.exists(right_sgy_path):
+        shutil.copy(right_sgy_path, right_folder)
+
+def main():
+    problem_files = []
+
+    # Process each folder and its respective coordinates
+    for root_folder, coords in folders_and_coords.items():
+        a, b = calculate_a_b(coords)
+        parent_folder = os.path.dirname(root_folder)
+        output_folder = os.path.join(parent_folder, os.path.basename(root_folder) + "_centersplit")
+        left_folder = os.path.join(parent_folder, os.path.basename(root_folder) + "_left")
+        right_folder = os.path.join(parent_folder, os.path.basename(root_folder) + "_right")
+        left_reverse_folder = os.path.join(parent_folder, os.path.basename(root_folder) + "_left_reverse")
+
+        # Create necessary output directories if they do not exist
+        for folder in [output_folder, left_folder, right_folder, left_reverse_folder]:
+            if not os.path.exists(folder):
+                os.makedirs(folder)
+
+        print(f"Input folder: {root_folder}")
+        print(f"Output folder: {output_folder}")
+        print(f"Left folder: {left_folder}")
+        print(f"Right folder: {right_folder}")
+        print(f"Left reversed folder: {left_reverse_folder}")
+
+        # Collect the files of the input folder and split them on a worker pool
+        tasks = []
+        for subdir, dirs, files in os.walk(root_folder):
+            for file in files:
+                if file.endswith(".sgy"):
+                    match = re.search(r'(\d+)-(\d+)_', file)
+                    if match:
                         value = int(match.group(1))
                         x_middle = calculate_x_middle(value, a, b)
-                        sgy_file_path = os.path.join(subdir, file)
-                        print(f"Processing file: {sgy_file_path}, calculated middle trace index: {x_middle}")
-                        print(f"Calling script: python {script_path} {sgy_file_path} {str(x_middle)} {output_folder}")
-                        result = subprocess.run(["python", script_path, sgy_file_path, str(x_middle), output_folder], capture_output=True, text=True)
-                        print(result.stdout)
-                        if result.stderr:
-                            print(f"Error in split_sgy.py: {result.stderr}")
-
-                        base_name = os.path.splitext(file)[0]
-                        left_sgy_path = os.path.join(output_folder, f"{base_name}_left.sgy")
-                        right_sgy_path = os.path.join(output_folder, f"{base_name}_right.sgy")
-
-                        # Copy and reverse traces for left and right output files
-                        if os.path.exists(left_sgy_path):
-                            shutil.copy(left_sgy_path, left_folder)
-                            reversed_left_sgy_path = os.path.join(left_reverse_folder, f"{base_name}_left_reversed.sgy")
-                            reverse_traces(left_sgy_path, reversed_left_sgy_path)
-
-                        if os.path.exists(right_sgy_path):
-                            shutil.copy(right_sgy_path, right_folder)
-                    except Exception as e:
-                        print(f"Error processing file {sgy_file_path}: {e}")
-                        problem_files.append(sgy_file_path)
-
-    # Create an _ALL folder and copy contents from _right and _left_reverse folders
-    all_folder = os.path.join(parent_folder, os.path.basename(root_folder) + "_ALL")
-
-    if not os.path.exists(all_folder):
-        os.makedirs(all_folder)
-
-    # Copy contents from _right folder to _ALL folder
-    for root, dirs, files in os.walk(right_folder):
-        for file in files:
-            shutil.copy(os.path.join(root, file), all_folder)
-
-    # Copy contents from _left_reverse folder to _ALL folder
-    for root, dirs, files in os.walk(left_reverse_folder):
-        for file in files:
-            shutil.copy(os.path.join(root, file), all_folder)
-
-    print(f"All files have been successfully copied to: {all_folder}")
-
-# Print the list of problematic files
-if problem_files:
-    print("\nProblematic files:")
-    for problem_file in problem_files:
-        print(problem_file)
+                        tasks.append((os.path.join(subdir, file), x_middle, output_folder,
+                                      left_folder, right_folder, left_reverse_folder))
+
+        results = run_batch(process_file, tasks, processes, desc="Splitting shots")
+        problem_files.extend(report(results))
+
+        # Create an _ALL folder and copy contents from _right and _left_reverse folders
+        all_folder = os.path.join(parent_folder, os.path.basename(root_folder) + "_ALL")
+
+        if not os.path.exists(all_folder):
+            os.makedirs(all_folder)
+
+        # Copy contents from _right folder to _ALL folder
+        for root, dirs, files in os.walk(right_folder):
+            for file in files:
+                shutil.copy(os.path.join(root, file), all_folder)
+
+        # Copy contents from _left_reverse folder to _ALL folder
+        for root, dirs, files in os.walk(left_reverse_folder):
+            for file in files:
+                shutil.copy(os.path.join(root, file), all_folder)
+
+        print(f"All files have been successfully copied to: {all_folder}")
+
+    # Print the list of problematic files
+    if problem_files:
+        print("\nProblematic files:")
+        for problem_file in problem_files:
+            print(problem_file)
+
+if __name__ == "__main__":
+    main()
@@ -9,8 +9,12 @@
 
 
 import os
-import subprocess
+import sys
 import segyio
+from bandpass_sgy import process_sgy_file_with_obspy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common_tools'))
+from batch_runner import run_batch, report
 
 def find_sgy_files(folder_path):
     sgy_files = []
@@ -33,20 +37,22 @@ def get_sample_rate(sgy_file):
     print(f"Sample rate for {sgy_file}: {sample_rate_hz} Hz")
     return sample_rate_hz
 
-def call_bandpass_script(sgy_file, output_folder, lowcut, highcut):
-    script_path = r"H:\lhyonedrive\OneDrive\termite\scripts\bandpass\bandpass_sgy.py"
+def bandpass_file(sgy_file, output_folder, lowcut, highcut):
     output_file = os.path.join(output_folder, os.path.basename(sgy_file))
     sample_rate_hz = get_sample_rate(sgy_file)
-    subprocess.call(['python', script_path, sgy_file, output_file, str(lowcut), str(highcut), str(sample_rate_hz)])
+    process_sgy_file_with_obspy(sgy_file, output_file, lowcut, highcut, sample_rate_hz)
+    return output_file
 
-def main(folder_path, lowcut, highcut):
+def main(folder_path, lowcut, highcut, processes=None):
     sgy_files = find_sgy_files(folder_path)
     output_folder = create_output_folder(folder_path)
-    for sgy_file in sgy_files:
-        call_bandpass_script(sgy_file, output_folder, lowcut, highcut)
+    tasks = [(sgy_file, output_folder, lowcut, highcut) for sgy_file in sgy_files]
+    results = run_batch(bandpass_file, tasks, processes, desc="Bandpass")
+    return report(results)
 
 if __name__ == "__main__":
     folder_path = r"H:\lhyonedrive\OneDrive\termite\school\active_source_2\shots_510_610_split_center_right"
     lowcut = 2
     highcut = 100
-    main(folder_path, lowcut, highcut)
+    processes = None  # Number of worker processes (None = number of CPU cores)
+    main(folder_path, lowcut, highcut, processes)
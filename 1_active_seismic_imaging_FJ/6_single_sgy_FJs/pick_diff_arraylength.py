@@ -9,40 +9,23 @@
 
 
 import os
-import segyio
 import numpy as np
 import sys
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'process_file_sgy'))
+from sgy_block_io import read_binary_header
+from sgy_subset import extract_subsets
 
-def extract_array_by_length(file_path, output_dir, array_length_m, trace_spacing):
-    trace_count = int(array_length_m // trace_spacing)
-    
-    with segyio.open(file_path, "r", ignore_geometry=True) as src:
-        if trace_count > src.tracecount:
-            print(f"The requested array length {array_length_m}m exceeds the number of traces in the file. Skipping.")
-            return None
-
-        start_trace = 0
-        end_trace = trace_count - 1
-
-        spec = segyio.tools.metadata(src)
-        spec.tracecount = trace_count
 
-        new_file_name = f"arraylength_{array_length_m}m_{os.path.basename(file_path)}"
-        new_file_path = os.path.join(output_dir, new_file_name)
-
-        with segyio.create(new_file_path, spec) as dst:
-            dst.text[0] = src.text[0]
-            dst.bin = src.bin
-
-            for i in range(start_trace, end_trace + 1):
-                dst.trace[i - start_trace] = src.trace[i]
-                dst.header[i - start_trace] = src.header[i]
-                dst.header[i - start_trace].update({segyio.TraceField.TRACE_SEQUENCE_LINE: i - start_trace + 1})
+def array_length_subset(file_path, output_dir, array_length_m, trace_spacing):
+    """Describe the output of one array length, or None if the file has too few traces."""
+    trace_count = int(array_length_m // trace_spacing)
+    if trace_count > read_binary_header(file_path)["trace_count"]:
+        print(f"The requested array length {array_length_m}m exceeds the number of traces in the file. Skipping.")
+        return None
 
-    print(f"File saved with array length {array_length_m}m: {new_file_path}")
-    print("Output file header information:")
-    return new_file_path
+    new_file_name = f"arraylength_{array_length_m}m_{os.path.basename(file_path)}"
+    return {"dst_filename": os.path.join(output_dir, new_file_name), "start_trace": 1, "end_trace": trace_count}
 
 def process_traces_for_array_lengths(file_path, min_length, max_length, step_length, trace_spacing):
     base_dir = os.path.dirname(file_path)
@@ -53,8 +36,15 @@ def process_traces_for_array_lengths(file_path, min_length, max_length, step_len
 
     trace_spacing = float(trace_spacing)
 
+    # Cut all array lengths from one read of the source file
+    subsets = []
     for array_length_m in np.arange(min_length, max_length + step_length, step_length):
-        extract_array_by_length(file_path, output_dir, array_length_m, trace_spacing)
+        subset = array_length_subset(file_path, output_dir, array_length_m, trace_spacing)
+        if subset is not None:
+            subsets.append(subset)
+
+    for new_file_path in extract_subsets(file_path, subsets):
+        print(f"File saved: {new_file_path}")
 
 if __name__ == "__main__":
     if len(sys.argv) < 6:
@@ -20,12 +20,16 @@ import matplotlib.dates as mdates
 from scipy import signal, fftpack
 from scipy.fftpack import fft, fftshift
 import segyio
-import torch
-from torch import nn
-import torch.nn.functional as F
 import pandas as pd
 import time
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common_tools'))
+from batch_runner import report
+from render_queue import RenderQueue
+from cc_backend import get_backend, pairs_to_lag_matrix, window_starts
+from c3_preprocess import preprocess_matrix
+import design_cache
+
 # ----------------------------------------------------------------------------------
 # Loading functions
 # ----------------------------------------------------------------------------------
@@ -218,65 +222,21 @@ def taper(x,p):
     if p <= 0.0:
         return x
     else:
-        f0 = 0.5
-        f1 = 0.5
         n  = len(x)
         nw = int(p*n)
 
         if nw > 0:
-            ow = np.pi/nw
-
-            w = np.ones( n )
-            for i in range( nw ):
-                w[i] = f0 - f1 * np.cos(ow*i)
-
-            for i in range( n-nw,n ):
-                w[i] = 1.0 - w[i-n+nw]
-
-            return x * w
+            return x * design_cache.cosine_taper(n, p)
         elif nw == 0:
             return x
 def preprocessing(data, dt, fmin, fmax, norm_method='bpnorm'):
-    f1 = fmin*0.5
-    f2 = fmin
-    f3 = fmax
-    f4 = fmax*1.2
-    itwin = int(1/dt*0.1)
-    fwin = .1
-    nch = data.shape[1]
-    data0 = data.copy()
-    for i in range(nch):
-        dat_in = data[:,i]
-        dat_in = filter_szh(dat_in, dt, fmin, fmax) # filter 
-        dat = dat_in - np.mean((dat_in))
-        if norm_method == 'bpnorm':
-            dat_tn = bpnorm(dat, fmin, fmax, dt, itwin)
-        elif norm_method == '1bit':
-            dat_tn = np.sign(dat)
-            dat_tn = np.float32(dat_tn)
-        data0[:,i] = whtnd(f1, f2, f3, f4, dt, dat_tn, fwin)
-    return data0
+    # filter_szh, bpnorm and whtnd for all channels at once, see c3_preprocess.py
+    return preprocess_matrix(data, dt, fmin, fmax, norm_method)
 def hanning(N):
-    window = np.array([0.5 - 0.5 * np.cos(2 * np.pi * n / (N - 1)) for n in range(N)])
-    return window
+    return design_cache.hanning(N)
 def whtnd(f1,f2,f3,f4,dt,d1n,fwin):
     dlen = len(d1n)
-    df = 1/(dlen*dt)
-    d1 = int(round(f1/df))
-    d2 = int(round(f2/df))
-    d3 = int(round(f3/df))
-    d4 = int(round(f4/df))
-    # print(d2-d1,d4-d3)
-    tpr = hanning(int(2*(d2-d1)+1))
-    tpr1 = tpr[:d2-d1+1]
-    tpr = hanning(int(2*(d4-d3)+1))
-    tpr2 = tpr[d4-d3:]
-    if (np.mod(dlen,2)== 0.0):
-        tprp= np.hstack([np.zeros(d1),tpr1,np.ones(d3-d2-1),tpr2,np.zeros(int(dlen/2)-d4-1)])
-        tprf = np.hstack([0,np.flip(tprp[1:]),tprp])
-    else:
-        tprp= np.hstack([np.zeros(d1),tpr1,np.ones(d3-d2-1),tpr2,np.zeros(int((dlen+1)/2)-d4-1)])
-        tprf = np.hstack([np.flip(tprp[1:]),tprp])
+    tprf = design_cache.whitening_taper(f1,f2,f3,f4,dt,dlen)
     smln = int(round(fwin*dlen*dt))   
     d1nff = fftpack.fftshift(fftpack.fft(d1n))
     d1nffs = convsm(abs(d1nff),smln)
@@ -284,7 +244,7 @@ def whtnd(f1,f2,f3,f4,dt,d1n,fwin):
     return d1nw
 def bpnorm(dat0,f0,f1,dt,itwin):
     fs = 1/dt/2
-    b, a = signal.butter(2, [f0/fs,f1/fs], 'bandpass')
+    b, a = design_cache.butter_ba(2, [f0/fs,f1/fs], 'bandpass')
     dat1 = signal.filtfilt(b, a, dat0)
 #    itwin = int(np.floor(itwin/dt));
     if(np.mod(itwin,2) == 0.0):
@@ -295,12 +255,12 @@ def bpnorm(dat0,f0,f1,dt,itwin):
 def filter_szh(data,dt,fmin,fmax):
     band = np.array([fmin, fmax])
     Wn = band * 2 * dt
-    b, a = signal.butter(2, Wn, 'bandpass') 
+    b, a = design_cache.butter_ba(2, Wn, 'bandpass')
     pp2 = signal.filtfilt(b, a, data.T)    
     return pp2.T
 def bandpass_bp(dat0, f0, f1, dt):
     fs = 1/dt/2
-    b, a = signal.butter(2, [f0/fs,f1/fs], 'bandpass')
+    b, a = design_cache.butter_ba(2, [f0/fs,f1/fs], 'bandpass')
     dat1 = signal.filtfilt(b, a, dat0)
     return dat1
 def smooth(a,WSZ):
@@ -316,15 +276,7 @@ def convsm(A,nx):
     Ap[:nx] = Ap[np.arange(nx*2,nx,-1)].copy()
     Ap[nx+Nx:] = Ap[np.arange(nx+Nx-2,Nx-2,-1)]
     Nxp = Nx+2*nx
-    Ktx = np.zeros((Nxp))
-    kx = np.arange(1,Nxp+1)
-    eps = 2.2204e-16
-    if (np.mod(Nx,2)==0):
-        Ktx = 1/(2*nx+1)*np.sin(0.5*(2*nx+1)*(kx-((Nxp+2)/2)+eps)*((2*np.pi)/Nxp))/np.sin\
-            (0.5*(kx-((Nxp+2)/2)+eps)*((2*np.pi)/Nxp))
-    else:
-        Ktx = 1/(2*nx+1)*np.sin(0.5*(2*nx+1)*(kx-((Nxp+1)/2)+eps)*((2*np.pi)/Nxp))/np.sin\
-            (0.5*(kx-((Nxp+1)/2)+eps)*((2*np.pi)/Nxp))
+    Ktx = design_cache.sinc_kernel(nx, Nxp, np.mod(Nx,2)==0)
     Ap = np.real(fftpack.ifftn(fftpack.ifftshift(fftpack.fftshift(fftpack.fftn(Ap))*Ktx)))
     Asm = np.zeros(Nx)
     Asm = Ap[nx:nx+Nx]
@@ -484,40 +436,14 @@ def sgy2numpy(filename, ch1=0, ch2=0):
         else:
             data = np.array(segyfile.trace.raw[ch1:ch2])
     return data.T
-# Cross-correlation function for all channels
-def cc_all(data):
-    a, b = data.shape
-    base = torch.cat([torch.zeros_like(data), data, torch.zeros_like(data)], axis=1)
-    data = data.repeat((a, 1)).view(a, a, -1).permute((1, 0, 2))
-    re = cal_cc(base, data)
-    return re
-# Calculate cross-correlation
-def cal_cc(data, tmp, step=1):
-    tmf_num = tmp.shape[0]
-    groups = tmp.shape[1]
-    tmp = tmp.permute(1, 0, 2).reshape(-1, 1, tmp.shape[-1])
-    ans = F.conv1d(data.view(1, -1, data.shape[-1]), tmp, groups=groups, stride=step)
-    return ans.reshape(data.shape[0], tmf_num, -1).permute(2, 1, 0)
-
-# Cross-correlation using FFT
-def xcorr_torch(a, b):
-    fa = torch.fft.fft(a, n=len(a) * 2 - 1)
-    fb = torch.fft.fft(b, n=len(a) * 2 - 1)
-    xx = fa * torch.conj(fb)
-    if b.ndim > 1:
-        xcc = torch.fft.fftshift(torch.fft.ifft(xx), 1)
-    else:
-        xcc = torch.fft.fftshift(torch.fft.ifft(xx))
-    return np.real(xcc)
 
 # ----------------------------------------------------------------------------------
 # Setting the parameters
 # ----------------------------------------------------------------------------------
 
+# Font of the summary figure, applied by the render workers
 font_path = '/usr/share/fonts/truetype/msttcorefonts/Arial.ttf'
-matplotlib.font_manager.fontManager.addfont(font_path)
-matplotlib.pyplot.rcParams['font.family'] = 'Arial'
-matplotlib.pyplot.rcParams['font.size'] = 8
+plot_rc = {'font.family': 'Arial', 'font.size': 8}
 
 start = time.time()
 path = sys.argv[1]
@@ -544,6 +470,12 @@ curve_C2_dir = sys.argv[17]
 curve_C3_dir = sys.argv[18]
 curve_ccfj_dir = sys.argv[19]
 
+# Figure rendering: "full", "preview" (low DPI) or "none"; with "later" the figure is only
+# queued in <jpg_outputfolder_path>/render_spool, e.g. for the rolling script to render all at once
+render_mode = sys.argv[20] if len(sys.argv) > 20 else "full"
+render_later = len(sys.argv) > 21 and sys.argv[21] == "later"
+render_spool_path = os.path.join(jpg_outputfolder_path, 'render_spool')
+
 path_folder_name = os.path.basename(os.path.dirname(path))
 filename = f'{path_folder_name}-{start_file_number_int}-{end_file_number_int}-{ch1}-{ch2}'
 
@@ -564,6 +496,11 @@ dt_ = 1 / 500
 maxshift = 0.5
 twin = maxshift * 3
 
+# Cross-correlation backend: "auto", "numpy", "torch-cpu" or "cuda"; threads=None uses all cores
+cc_backend = "auto"
+cc_threads = None
+cc_memory_budget = 1 << 30  # Bytes of working memory per batch of windows
+
 # ----------------------------------------------------------------------------------
 # Calculating the cross-correlation function
 # ----------------------------------------------------------------------------------
@@ -574,49 +511,32 @@ nch = len(channel)
 itwin = int(twin * fs)
 wpm = int(maxshift * fs)
 nwin = int((tend - tbegin) / twin) * 2 - 1
-ccf = np.zeros((2 * wpm + 1, len(channel), len(channel)))
-ccf = torch.from_numpy(ccf).to('cuda')
+backend = get_backend(cc_backend, cc_threads)
+print(f"Cross-correlation backend: {backend.name}")
+# Only the channel pairs i <= j are correlated and stacked; the full matrix is rebuilt at the end
+npairs = nch * (nch + 1) // 2
+ccf = backend.zeros((npairs, 2 * wpm + 1))
 
 for ifile in lst:
     data = sgy2numpy(path + ifile, ch1, ch2 + 1)
     ifactor = int(dt / dt_)
     dat0_ = np.zeros((int((tend - tbegin) / dt), nch))
-    for j in range(nch):
-        if ifactor > 1:
-            dat0_[:, j] = signal.decimate(data[:, j], ifactor, ftype='fir')
-        else:
-            dat0_[:, j] = data[:, j]
+    if ifactor > 1:
+        dat0_[:] = signal.decimate(data, ifactor, ftype='fir', axis=0)
+    else:
+        dat0_[:] = data
     dat = preprocessing(dat0_, dt, fmin, fmax)
-    dat = torch.from_numpy(dat).to('cuda')
-    for kk in range(nwin):
-        ind0 = int(kk * itwin / 2)
-        ind1 = int(ind0 + itwin)
-        torchdata = dat[ind0:ind1, :].T
-        cc = cc_all(torchdata)
-        tmp = cc[itwin - wpm:itwin + wpm + 1, :, :]
-        max_abs = torch.max(torch.abs(tmp), axis=0)[0]
-        tmp = tmp / max_abs
-        ccf += tmp / len(lst)
-
-ccf = np.array(ccf.cpu())
+    dat = backend.from_numpy(dat)
+    # All nwin half-overlapping windows are correlated, normalized and stacked in batches
+    ccf += backend.stack_windows(dat, window_starts(nwin, itwin), itwin, wpm, cc_memory_budget) / len(lst)
+
+ccf = pairs_to_lag_matrix(backend.to_numpy(ccf), nch)
 tvec = np.linspace(-maxshift, maxshift, ccf.shape[0])
 
 # ----------------------------------------------------------------------------------
-# Plotting the result: normal C2 method
+# Saving the result: normal C2 method
 # ----------------------------------------------------------------------------------
 
-matplotlib.use('Agg')
-plt.figure(figsize=(12, 6), dpi=500)
-
-plt.subplot(241)
-for i in range(len(channel)):
-    plt.plot(tvec, ccf[:, i, 0] / np.max(ccf[:, i, 0]) * 2 + i, 'k', lw=0.5)
-plt.title("CCFs_C2")
-plt.xlabel('Time (s)')
-plt.ylabel('Channel')
-plt.tight_layout()
-
-plt.subplot(242)
 ncf222 = ccf[::-1, :, :] + ccf
 compute_dimension_size = int(ncf222.shape[0] / 2)
 ncf222 = ncf222[compute_dimension_size:, :, :]
@@ -624,33 +544,26 @@ ncf222 = ncf222[compute_dimension_size:, :, :]
 np.savez_compressed(os.path.join(CCFs_C2_dir, filename + '.npz'), data=ncf222[:, :, 0])
 spec = radon_transform_obs(ncf222[:, :, 0], dt, np.arange(ch2 - ch1 + 1) * spacing, vmin, vmax, fmin, fmax, df)
 np.savez_compressed(os.path.join(spectrum_C2_dir, filename + '.npz'), data=spec)
-plt.imshow(spec**5, aspect='auto', extent=[fmin, fmax, vmin, vmax], origin='lower')
-plt.xlabel('Frequency (Hz)')
-plt.ylabel('Phase velocity (m/s)')
-plt.title('spectrum_C2')
-plt.tight_layout()
 
 c = np.arange(vmax - vmin) + vmin
 f = np.arange(int((fmax - 1) / df)) * df + 1
 indices = np.argmax(spec, 0)
 indices = np.clip(indices, 0, len(c) - 1)
 disp = c[indices]
-step = 10
 curve_C2_save = pd.DataFrame({
     'Frequency': f,
     'Velocity': disp
 })
-curve_C2_save_reduced = curve_C2_save.iloc[::step]
-plt.scatter(curve_C2_save_reduced['Frequency'], curve_C2_save_reduced['Velocity'], edgecolors='r', facecolors='none', s=5)
-plt.grid(True, linestyle='--')
-plt.tight_layout()
 curve_C2_save.to_csv(os.path.join(curve_C2_dir, filename + '.txt'), index=False, header=False)
 
-plt.subplot(246)
-plt.imshow(spec**5, aspect='auto', extent=[fmin, fmax, vmin, vmax], origin='lower')
-plt.xlabel('Frequency (Hz)')
-plt.ylabel('Phase velocity (m/s)')
-plt.title('spectrum_C3')
-plt.tight_layout()
+# ----------------------------------------------------------------------------------
+# Plotting the result, from the saved arrays
+# ----------------------------------------------------------------------------------
 
-plt.savefig(os.path.join(jpg_outputfolder_path, f'{filename}.jpg'))
+render_queue = RenderQueue(render_spool_path, render_mode, rc=plot_rc, fonts=[font_path])
+render_queue.submit('c3_figures:plot_c3_summary', os.path.join(jpg_outputfolder_path, f'{filename}.jpg'),
+                    os.path.dirname(os.path.abspath(__file__)), figsize=(12, 6), dpi=500,
+                    params={'fmin': fmin, 'fmax': fmax, 'vmin': vmin, 'vmax': vmax, 'step': 10},
+                    tvec=tvec, ccf=ccf[:, :, 0], spec=spec, f=f, disp=disp)
+if not render_later:
+    report(render_queue.render(processes=1))
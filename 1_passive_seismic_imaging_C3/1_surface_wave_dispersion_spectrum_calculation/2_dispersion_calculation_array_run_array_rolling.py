@@ -12,6 +12,10 @@ import os
 import sys
 from tqdm import tqdm
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common_tools'))
+from batch_runner import report
+from render_queue import render_spool
+
 data_dir = sys.argv[3]
 upper_dir = os.path.dirname(os.path.dirname(data_dir))
 inputfolder_name = os.path.basename(os.path.dirname(data_dir))
@@ -32,6 +36,10 @@ array_length = 12  # Array length in meters
 array_interval = 0.5  # Rolling distance in meters, that means, when we move the array, the distance that the array moves
 channel_number = array_length / spacing
 
+# Figures of all arrays are queued and rendered together after the loop: "full", "preview" (low DPI) or "none"
+render_mode = "full"
+render_processes = None  # Worker processes for rendering, all cores if None
+
 current_directory = os.path.dirname(os.path.abspath(__file__))
 script_path = os.path.join(current_directory, "1_dispersion_calculation_array_run.py")
 
@@ -96,7 +104,13 @@ for array_start in tqdm(range(line_start, line_end, step_size), desc="Processing
             curve_C2_dir,                # 17
             curve_C3_dir,                # 18
             curve_ccfj_dir,              # 19
+            render_mode,                 # 20
+            "later",                     # 21
         ], check=True)
         print("Script ran successfully!")
     except subprocess.CalledProcessError as e:
         print(f"An error occurred while running the script: {e}")
+
+# Render the figures of every array
+if render_mode != "none":
+    report(render_spool(os.path.join(jpg_dir, "render_spool"), render_mode, render_processes))
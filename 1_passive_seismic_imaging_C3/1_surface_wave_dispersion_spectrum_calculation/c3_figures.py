@@ -0,0 +1,52 @@
+# -*- encoding: utf-8 -*-
+'''
+@File        :   c3_figures.py
+@Time        :   2026/10/18 21:49:15
+@Author      :   Haiyang Liao
+@Affiliation :   Nanjing University (NJU)
+@Contact     :   haiyangliao@smail.nju.edu.cn
+@Description :   Summary figure of `1_dispersion_calculation_array_run.py`, drawn by the render
+                 workers of `common_tools/render_queue.py` from the CCFs, spectrum and picked
+                 curve the script has already saved.
+'''
+
+
+import numpy as np
+
+
+def plot_c3_summary(fig, data, fmin, fmax, vmin, vmax, step=10):
+    """
+    CCFs of the first channel and the C2 spectrum with its picked curve.
+
+    Args:
+        fig (Figure): Empty figure.
+        data (dict): `tvec` lag times, `ccf` (nlag, nch) CCFs with the first channel,
+                     `spec` (nv, nf) spectrum, `f` and `disp` the picked curve.
+        fmin, fmax (float): Frequency range of the spectrum.
+        vmin, vmax (float): Phase velocity range of the spectrum.
+        step (int): Every `step`-th point of the curve is drawn.
+    """
+    tvec, ccf, spec = data["tvec"], data["ccf"], data["spec"]
+    extent = [fmin, fmax, vmin, vmax]
+
+    ax = fig.add_subplot(241)
+    for i in range(ccf.shape[1]):
+        ax.plot(tvec, ccf[:, i] / np.max(ccf[:, i]) * 2 + i, 'k', lw=0.5)
+    ax.set_title("CCFs_C2")
+    ax.set_xlabel('Time (s)')
+    ax.set_ylabel('Channel')
+
+    ax = fig.add_subplot(242)
+    ax.imshow(spec**5, aspect='auto', extent=extent, origin='lower')
+    ax.set_xlabel('Frequency (Hz)')
+    ax.set_ylabel('Phase velocity (m/s)')
+    ax.set_title('spectrum_C2')
+    ax.scatter(data["f"][::step], data["disp"][::step], edgecolors='r', facecolors='none', s=5)
+    ax.grid(True, linestyle='--')
+
+    ax = fig.add_subplot(246)
+    ax.imshow(spec**5, aspect='auto', extent=extent, origin='lower')
+    ax.set_xlabel('Frequency (Hz)')
+    ax.set_ylabel('Phase velocity (m/s)')
+    ax.set_title('spectrum_C3')
+    fig.tight_layout()
@@ -0,0 +1,93 @@
+# -*- encoding: utf-8 -*-
+'''
+@File        :   c3_preprocess.py
+@Time        :   2026/10/18 22:41:58
+@Author      :   Haiyang Liao
+@Affiliation :   Nanjing University (NJU)
+@Contact     :   haiyangliao@smail.nju.edu.cn
+@Description :   Channel-batched preprocessing for the C3 script: bandpass, running-absolute-
+                 mean normalization and spectral whitening of a whole (time, channel) record
+                 as matrix operations along axis 0. The filter, smoothing kernel and whitening
+                 taper are drawn from `common_tools/design_cache.py`.
+'''
+
+
+import os
+import sys
+import numpy as np
+from scipy import signal, fftpack
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common_tools'))
+import design_cache
+
+FILTER_ORDER = 2
+FILTER_PADLEN = 15         # Edge padding of filtfilt for a 2nd-order Butterworth bandpass (3 * len(b))
+NORM_WINDOW = 0.1          # Running-mean window of bpnorm in seconds
+WHITEN_WINDOW = 0.1        # Spectral smoothing window of the whitening in Hz
+
+
+class PreprocessDesign:
+    """Filters, kernels and tapers of `preprocess_matrix` for one (dt, fmin, fmax, npts)."""
+
+    def __init__(self, dt, fmin, fmax, npts):
+        self.sos = design_cache.butter_sos(FILTER_ORDER, np.array([fmin, fmax]) * 2 * dt, 'bandpass')
+        self.norm_window = int(1 / dt * NORM_WINDOW)
+        if np.mod(self.norm_window, 2) == 0.0:
+            self.norm_window += 1
+        self.taper = design_cache.whitening_taper(fmin * 0.5, fmin, fmax, fmax * 1.2, dt, npts)
+        self.smooth_length = int(round(WHITEN_WINDOW * npts * dt))
+        self.kernel = design_cache.sinc_kernel(self.smooth_length, npts + 2 * self.smooth_length, np.mod(npts, 2) == 0)
+
+
+def smooth_columns(a, wsz):
+    """`smooth` (running mean with shrinking edge windows) of every column of `a`."""
+    cs = np.cumsum(a, axis=0)
+    out0 = np.vstack([cs[wsz - 1:wsz], cs[wsz:] - cs[:-wsz]]) / wsz
+    r = np.arange(1, wsz - 1, 2)[:, np.newaxis]
+    start = cs[:wsz - 1][::2] / r
+    stop = (np.cumsum(a[:-wsz:-1], axis=0)[::2] / r)[::-1]
+    return np.concatenate((start, out0, stop))
+
+
+def convsm_columns(a, nx, kernel):
+    """`convsm` (mirrored padding and sinc smoothing) of every column of `a`."""
+    n = a.shape[0]
+    ap = np.zeros((n + 2 * nx, a.shape[1]), dtype=a.dtype)
+    ap[nx:nx + n] = a
+    ap[:nx] = ap[np.arange(nx * 2, nx, -1)]
+    ap[nx + n:] = ap[np.arange(nx + n - 2, n - 2, -1)]
+    spectrum = fftpack.fftshift(fftpack.fft(ap, axis=0), axes=0) * kernel[:, np.newaxis]
+    return np.real(fftpack.ifft(fftpack.ifftshift(spectrum, axes=0), axis=0))[nx:nx + n]
+
+
+def preprocess_matrix(data, dt, fmin, fmax, norm_method='bpnorm'):
+    """
+    Bandpass, temporal normalization and spectral whitening of all channels at once.
+
+    Same steps as the per-channel `filter_szh` -> demean -> `bpnorm` (or one-bit)
+    -> `whtnd` chain, with the filters run by `sosfiltfilt` along axis 0.
+
+    Args:
+        data (np.ndarray): (npts, nch) record.
+        dt (float): Sampling interval in seconds.
+        fmin (float): Lower corner frequency in Hz.
+        fmax (float): Upper corner frequency in Hz.
+        norm_method (str): 'bpnorm' or '1bit'.
+
+    Returns:
+        np.ndarray: (npts, nch) preprocessed record.
+    """
+    design = PreprocessDesign(dt, fmin, fmax, data.shape[0])
+    dat = signal.sosfiltfilt(design.sos, data, axis=0, padlen=FILTER_PADLEN)
+    dat = dat - np.mean(dat, axis=0)
+    if norm_method == 'bpnorm':
+        envelope = np.abs(signal.sosfiltfilt(design.sos, dat, axis=0, padlen=FILTER_PADLEN))
+        dat = dat / smooth_columns(envelope, design.norm_window)
+    elif norm_method == '1bit':
+        dat = np.float32(np.sign(dat))
+
+    spectrum = fftpack.fftshift(fftpack.fft(dat, axis=0), axes=0)
+    amplitude = np.abs(spectrum)
+    smoothed = convsm_columns(amplitude, design.smooth_length, design.kernel)
+    whitened = (spectrum / smoothed + np.spacing(1) * np.mean(amplitude, axis=0)) * design.taper[:, np.newaxis]
+    return np.real(fftpack.ifft(fftpack.ifftshift(whitened, axes=0), axis=0)).astype(data.dtype, copy=False)
@@ -0,0 +1,336 @@
+# -*- encoding: utf-8 -*-
+'''
+@File        :   cc_backend.py
+@Time        :   2026/10/18 22:16:23
+@Author      :   Haiyang Liao
+@Affiliation :   Nanjing University (NJU)
+@Contact     :   haiyangliao@smail.nju.edu.cn
+@Description :   Compute backends for the all-channel cross-correlation of the C3 script: a
+                 NumPy/SciPy FFT path, a multithreaded torch CPU path and the CUDA path.
+                 The CPU paths transform every channel once and keep only the lags within
+                 +-maxshift; all paths return the same (lag, channel, channel) CCFs. The
+                 pair correlator `cc_pairs` only forms the upper triangle of channel pairs,
+                 block by block, so its memory grows with pairs x lags, not window length.
+                 `stack_windows` cuts all windows of a file from one strided view and
+                 correlates, normalizes and stacks them in batches sized to a memory budget.
+'''
+
+
+import numpy as np
+import scipy.fft as sfft
+
+try:
+    import torch
+    import torch.nn.functional as F
+except ImportError:
+    torch = None
+
+BACKENDS = ("auto", "numpy", "torch-cpu", "cuda")
+PAIR_BLOCK = 2048          # Channel pairs whose full-length correlations exist at one time
+MEMORY_BUDGET = 1 << 30    # Bytes of working memory of one window batch in `stack_windows`
+
+
+def fft_length(npts, maxlag):
+    """Fast FFT length that correlates `npts` samples without wrap-around up to `maxlag` lags."""
+    return sfft.next_fast_len(npts + maxlag, real=True)
+
+
+def lag_indices(maxlag, n):
+    """FFT bins of the lags -maxlag..maxlag of a length-`n` circular correlation."""
+    return np.arange(-maxlag, maxlag + 1) % n
+
+
+def window_starts(nwin, npts):
+    """First samples of `nwin` half-overlapping windows of `npts` samples, as int(k * npts / 2)."""
+    return (np.arange(nwin) * npts / 2).astype(np.int64)
+
+
+def windows_per_batch(nch, npts, maxlag, memory_budget=MEMORY_BUDGET, pair_block=PAIR_BLOCK):
+    """
+    Windows `stack_windows` handles at once within a memory budget.
+
+    Per window, a batch holds the window samples, the spectra of all channels and,
+    for one block of pairs, the cross-spectra, full-length and kept-lag CCFs.
+
+    Returns:
+        int: At least 1.
+    """
+    n = fft_length(npts, maxlag)
+    nf = n // 2 + 1
+    block = min(pair_block, nch * (nch + 1) // 2)
+    per_window = nch * npts * 8 + nch * nf * 16 + block * (nf * 16 + n * 8 + 2 * (2 * maxlag + 1) * 8)
+    return max(1, int(memory_budget // per_window))
+
+
+def upper_pairs(nch):
+    """(i, j) index arrays of the channel pairs i <= j, autocorrelations included."""
+    return np.triu_indices(nch)
+
+
+def pairs_to_lag_matrix(cc, nch):
+    """
+    Expand upper-triangle CCFs to the (lag, channel, channel) layout of `cc_all`.
+
+    The pair (j, i) is the pair (i, j) with the lag axis reversed.
+
+    Args:
+        cc (np.ndarray): (npairs, nlags) CCFs in `upper_pairs` order.
+        nch (int): Number of channels.
+
+    Returns:
+        np.ndarray: (nlags, nch, nch) CCFs.
+    """
+    i, j = upper_pairs(nch)
+    matrix = np.empty((cc.shape[1], nch, nch), dtype=cc.dtype)
+    matrix[:, i, j] = cc.T
+    matrix[:, j, i] = cc[:, ::-1].T
+    return matrix
+
+
+# ----------------------------------------------------------------------------------
+# CUDA path: grouped conv1d over a zero-padded base, as in the original script
+# ----------------------------------------------------------------------------------
+
+# Cross-correlation function for all channels
+def cc_all(data):
+    a, b = data.shape
+    base = torch.cat([torch.zeros_like(data), data, torch.zeros_like(data)], axis=1)
+    data = data.repeat((a, 1)).view(a, a, -1).permute((1, 0, 2))
+    re = cal_cc(base, data)
+    return re
+
+# Calculate cross-correlation
+def cal_cc(data, tmp, step=1):
+    tmf_num = tmp.shape[0]
+    groups = tmp.shape[1]
+    tmp = tmp.permute(1, 0, 2).reshape(-1, 1, tmp.shape[-1])
+    ans = F.conv1d(data.view(1, -1, data.shape[-1]), tmp, groups=groups, stride=step)
+    return ans.reshape(data.shape[0], tmf_num, -1).permute(2, 1, 0)
+
+# Cross-correlation using FFT
+def xcorr_torch(a, b):
+    fa = torch.fft.fft(a, n=len(a) * 2 - 1)
+    fb = torch.fft.fft(b, n=len(a) * 2 - 1)
+    xx = fa * torch.conj(fb)
+    if b.ndim > 1:
+        xcc = torch.fft.fftshift(torch.fft.ifft(xx), 1)
+    else:
+        xcc = torch.fft.fftshift(torch.fft.ifft(xx))
+    return torch.real(xcc)
+
+
+# ----------------------------------------------------------------------------------
+# Backends
+# ----------------------------------------------------------------------------------
+
+class NumpyBackend:
+    """
+    NumPy/SciPy FFT backend.
+
+    `cc_all(data, maxlag)` of every backend returns `cc[l + maxlag, i, j] =
+    sum_k data[i, k] * data[j, k + l]` for l in -maxlag..maxlag.
+    """
+
+    name = "numpy"
+
+    def __init__(self, threads=None):
+        self.workers = threads if threads else -1
+
+    def from_numpy(self, array):
+        return np.asarray(array, dtype=np.float64)
+
+    def to_numpy(self, x):
+        return np.asarray(x)
+
+    def zeros(self, shape):
+        return np.zeros(shape, dtype=np.float64)
+
+    def max_abs(self, x, axis=0):
+        return np.max(np.abs(x), axis=axis)
+
+    def cc_all(self, data, maxlag):
+        """
+        Cross-correlate all channel pairs of one window.
+
+        Args:
+            data (np.ndarray): (nch, npts) window.
+            maxlag (int): Largest lag kept, in samples.
+
+        Returns:
+            np.ndarray: (2 * maxlag + 1, nch, nch) CCFs.
+        """
+        n = fft_length(data.shape[-1], maxlag)
+        spec = sfft.rfft(data, n=n, axis=-1, workers=self.workers)
+        cc = sfft.irfft(np.conj(spec)[:, np.newaxis, :] * spec[np.newaxis, :, :], n=n, axis=-1,
+                        workers=self.workers)
+        return np.ascontiguousarray(np.moveaxis(cc[:, :, lag_indices(maxlag, n)], -1, 0))
+
+    def cc_pairs(self, data, maxlag, pair_block=PAIR_BLOCK):
+        """
+        Cross-correlate the channel pairs i <= j of one window.
+
+        Every channel is transformed once; the cross-spectra and inverse transforms
+        are formed `pair_block` pairs at a time and only the kept lags are stored.
+
+        Args:
+            data (np.ndarray): (nch, npts) window.
+            maxlag (int): Largest lag kept, in samples.
+            pair_block (int): Pairs transformed together.
+
+        Returns:
+            np.ndarray: (npairs, 2 * maxlag + 1) CCFs in `upper_pairs` order, with
+                        `cc[p, l + maxlag] = sum_k data[i, k] * data[j, k + l]`.
+        """
+        n = fft_length(data.shape[-1], maxlag)
+        spec = sfft.rfft(data, n=n, axis=-1, workers=self.workers)
+        i, j = upper_pairs(data.shape[0])
+        lags = lag_indices(maxlag, n)
+        cc = np.empty((len(i), len(lags)), dtype=np.float64)
+        for start in range(0, len(i), pair_block):
+            block = slice(start, start + pair_block)
+            cross = np.conj(spec[i[block]]) * spec[j[block]]
+            cc[block] = sfft.irfft(cross, n=n, axis=-1, workers=self.workers)[:, lags]
+        return cc
+
+    def stack_windows(self, data, starts, npts, maxlag, memory_budget=MEMORY_BUDGET, pair_block=PAIR_BLOCK):
+        """
+        Sum of the max-abs normalized pair CCFs of many windows of one record.
+
+        The windows are taken from one strided view of `data`, transformed together
+        in batches of `windows_per_batch` windows, and every window's CCF of every
+        pair is divided by its largest absolute value before it is summed over the
+        batch.
+
+        Args:
+            data (np.ndarray): (ntime, nch) record.
+            starts (np.ndarray): First sample of every window, see `window_starts`.
+            npts (int): Samples per window.
+            maxlag (int): Largest lag kept, in samples.
+            memory_budget (int): Bytes of working memory per batch.
+            pair_block (int): Pairs transformed together.
+
+        Returns:
+            np.ndarray: (npairs, 2 * maxlag + 1) stacked CCFs in `upper_pairs` order.
+        """
+        windows = np.lib.stride_tricks.sliding_window_view(data, npts, axis=0)
+        nch = data.shape[1]
+        n = fft_length(npts, maxlag)
+        i, j = upper_pairs(nch)
+        lags = lag_indices(maxlag, n)
+        batch = windows_per_batch(nch, npts, maxlag, memory_budget, pair_block)
+        stack = np.zeros((len(i), len(lags)), dtype=np.float64)
+        for first in range(0, len(starts), batch):
+            spec = sfft.rfft(windows[starts[first:first + batch]], n=n, axis=-1, workers=self.workers)
+            for start in range(0, len(i), pair_block):
+                block = slice(start, start + pair_block)
+                cross = np.conj(spec[:, i[block]]) * spec[:, j[block]]
+                cc = sfft.irfft(cross, n=n, axis=-1, workers=self.workers)[..., lags]
+                stack[block] += (cc / np.max(np.abs(cc), axis=-1, keepdims=True)).sum(axis=0)
+        return stack
+
+    def xcorr(self, a, b):
+        """Full cross-correlation of `a` and `b` via the FFT, centred on lag 0 (see `xcorr_torch`)."""
+        n = len(a) * 2 - 1
+        xx = sfft.fft(a, n=n, workers=self.workers) * np.conj(sfft.fft(b, n=n, workers=self.workers))
+        xcc = sfft.fftshift(sfft.ifft(xx, workers=self.workers), 1 if np.ndim(b) > 1 else None)
+        return np.real(xcc)
+
+
+class TorchBackend:
+    """
+    PyTorch backend. On the CPU it uses the FFT path of `NumpyBackend` with torch
+    threads; on CUDA it keeps the grouped conv1d of `cc_all`.
+    """
+
+    def __init__(self, device="cpu", threads=None):
+        if torch is None:
+            raise ImportError("The torch-cpu and cuda backends need PyTorch.")
+        if device == "cuda" and not torch.cuda.is_available():
+            raise RuntimeError("The cuda backend was requested but no CUDA device is available.")
+        self.device = torch.device(device)
+        self.name = "cuda" if device == "cuda" else "torch-cpu"
+        if threads and device == "cpu":
+            torch.set_num_threads(threads)
+
+    def from_numpy(self, array):
+        return torch.from_numpy(np.ascontiguousarray(array, dtype=np.float64)).to(self.device)
+
+    def to_numpy(self, x):
+        return x.cpu().numpy()
+
+    def zeros(self, shape):
+        return torch.zeros(shape, dtype=torch.float64, device=self.device)
+
+    def max_abs(self, x, axis=0):
+        return torch.max(torch.abs(x), axis=axis)[0]
+
+    def cc_all(self, data, maxlag):
+        """See `NumpyBackend.cc_all`."""
+        npts = data.shape[-1]
+        if self.device.type == "cuda":
+            return cc_all(data)[npts - maxlag:npts + maxlag + 1]
+        n = fft_length(npts, maxlag)
+        spec = torch.fft.rfft(data, n=n, dim=-1)
+        cc = torch.fft.irfft(torch.conj(spec)[:, None, :] * spec[None, :, :], n=n, dim=-1)
+        lags = torch.from_numpy(lag_indices(maxlag, n)).to(self.device)
+        return cc[:, :, lags].permute(2, 0, 1).contiguous()
+
+    def cc_pairs(self, data, maxlag, pair_block=PAIR_BLOCK):
+        """See `NumpyBackend.cc_pairs`; runs on the backend's device."""
+        n = fft_length(data.shape[-1], maxlag)
+        spec = torch.fft.rfft(data, n=n, dim=-1)
+        i, j = (torch.from_numpy(index).to(self.device) for index in upper_pairs(data.shape[0]))
+        lags = torch.from_numpy(lag_indices(maxlag, n)).to(self.device)
+        cc = torch.empty((len(i), len(lags)), dtype=torch.float64, device=self.device)
+        for start in range(0, len(i), pair_block):
+            block = slice(start, start + pair_block)
+            cross = torch.conj(spec[i[block]]) * spec[j[block]]
+            cc[block] = torch.fft.irfft(cross, n=n, dim=-1)[:, lags]
+        return cc
+
+    def stack_windows(self, data, starts, npts, maxlag, memory_budget=MEMORY_BUDGET, pair_block=PAIR_BLOCK):
+        """See `NumpyBackend.stack_windows`; the windows are cut with `Tensor.unfold`."""
+        windows = data.unfold(0, npts, 1)
+        nch = data.shape[1]
+        n = fft_length(npts, maxlag)
+        i, j = (torch.from_numpy(index).to(self.device) for index in upper_pairs(nch))
+        lags = torch.from_numpy(lag_indices(maxlag, n)).to(self.device)
+        starts = torch.from_numpy(np.asarray(starts)).to(self.device)
+        batch = windows_per_batch(nch, npts, maxlag, memory_budget, pair_block)
+        stack = torch.zeros((len(i), len(lags)), dtype=torch.float64, device=self.device)
+        for first in range(0, len(starts), batch):
+            spec = torch.fft.rfft(windows[starts[first:first + batch]], n=n, dim=-1)
+            for start in range(0, len(i), pair_block):
+                block = slice(start, start + pair_block)
+                cross = torch.conj(spec[:, i[block]]) * spec[:, j[block]]
+                cc = torch.fft.irfft(cross, n=n, dim=-1)[..., lags]
+                stack[block] += (cc / torch.amax(torch.abs(cc), dim=-1, keepdim=True)).sum(dim=0)
+        return stack
+
+    def xcorr(self, a, b):
+        return xcorr_torch(a, b)
+
+
+def get_backend(name="auto", threads=None):
+    """
+    Backend for the C3 cross-correlations.
+
+    Args:
+        name (str): "numpy", "torch-cpu", "cuda" or "auto" (CUDA if available, then
+                    torch on the CPU, then NumPy).
+        threads (int): CPU threads for the FFTs; all cores (NumPy) or the torch
+                       default if None.
+
+    Returns:
+        NumpyBackend or TorchBackend
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}', expected one of {BACKENDS}.")
+    if name == "auto":
+        if torch is not None and torch.cuda.is_available():
+            name = "cuda"
+        else:
+            name = "torch-cpu" if torch is not None else "numpy"
+    if name == "numpy":
+        return NumpyBackend(threads)
+    return TorchBackend("cuda" if name == "cuda" else "cpu", threads)
@@ -0,0 +1,144 @@
+# -*- encoding: utf-8 -*-
+'''
+@File        :   cc_chunks.py
+@Time        :   2026/10/18 19:58:27
+@Author      :   Haiyang Liao
+@Affiliation :   Nanjing University (NJU)
+@Contact     :   haiyangliao@smail.nju.edu.cn
+@Description :   Gap-aware CC-FJpy cross-correlation. CC takes one start/end index per
+                 station, so the shared time axis is cut only where a station resumes
+                 recording after a gap; inside each chunk every station's coverage is one
+                 range, passed to CC as its start/end. The chunk results are averaged per
+                 station pair, weighted by the number of FFT windows the pair shares.
+                 Gaps are skipped instead of correlated as zeros.
+'''
+
+
+import numpy as np
+from ccfj import CC
+
+
+def window_step(fft_length, overlap_rate):
+    """Samples between the starts of consecutive FFT windows of CC."""
+    return max(1, int(fft_length * (1 - overlap_rate)))
+
+
+def window_count(length, fft_length, overlap_rate):
+    """Number of FFT windows CC fits into `length` samples."""
+    if length < fft_length:
+        return 0
+    return (length - fft_length) // window_step(fft_length, overlap_rate) + 1
+
+
+def pair_window_count(ranges, pairs, fft_length, overlap_rate):
+    """
+    FFT windows of a chunk that lie inside the ranges of both stations of each pair.
+
+    Windows start every `window_step` samples from the start of the chunk.
+
+    Args:
+        ranges (np.ndarray): (nsta, 2) [start, end) of every station within the chunk.
+        pairs (np.ndarray): (npairs, 2) station indices.
+        fft_length (int): FFT window length in samples.
+        overlap_rate (float): Window overlap.
+
+    Returns:
+        np.ndarray: int64 count per pair.
+    """
+    step = window_step(fft_length, overlap_rate)
+    lo = np.maximum(ranges[pairs[:, 0], 0], ranges[pairs[:, 1], 0]).astype(np.int64)
+    hi = np.minimum(ranges[pairs[:, 0], 1], ranges[pairs[:, 1], 1]).astype(np.int64)
+    first = -(-lo // step)
+    last = np.floor_divide(hi - fft_length, step)
+    return np.maximum(last - first + 1, 0)
+
+
+def plan_chunks(segments, min_length):
+    """
+    Cut the time axis only where a station's coverage would stop being one range.
+
+    Segments shorter than `min_length` (one FFT window) are ignored. A chunk runs
+    until some station starts its next segment, since from there on the station's
+    coverage would be two ranges. Fully recorded stations never cause a cut, and a
+    station with dropouts keeps the rest of the line in the chunk.
+
+    Args:
+        segments (list): (k, 2) [start, end) valid columns of every station, in time order.
+        min_length (int): Shortest range that can hold an FFT window.
+
+    Returns:
+        list: (start, end, ranges) per chunk, `ranges` being an (nsta, 2) int32 array of
+              every station's [start, end) within the chunk, relative to `start` ((0, 0)
+              if the station has no range of at least `min_length` there). Only chunks
+              with at least two such stations are listed.
+    """
+    usable = []
+    for station in segments:
+        station = np.asarray(station, dtype=np.int64).reshape(-1, 2)
+        usable.append(station[station[:, 1] - station[:, 0] >= min_length])
+    recorded = [station for station in usable if len(station)]
+    if not recorded:
+        return []
+    start = min(station[0, 0] for station in recorded)
+    stop = max(station[-1, 1] for station in recorded)
+
+    chunks = []
+    while start < stop:
+        # Current segment of every station: the first one ending after `start`
+        current = [int(np.searchsorted(station[:, 1], start, side="right")) for station in usable]
+        end = stop
+        for station, k in zip(usable, current):
+            if k + 1 < len(station):
+                end = min(end, station[k + 1, 0])
+        ranges = np.zeros((len(usable), 2), dtype=np.int32)
+        for i, (station, k) in enumerate(zip(usable, current)):
+            if k < len(station):
+                lo, hi = max(station[k, 0], start), min(station[k, 1], end)
+                if hi - lo >= min_length:
+                    ranges[i] = lo - start, hi - start
+        if np.count_nonzero(ranges[:, 1]) >= 2:
+            chunks.append((int(start), int(end), ranges))
+        start = end
+    return chunks
+
+
+def chunked_cc(data, segments, nf, fft_length, station_pairs, fstride=1, overlap_rate=0.0,
+               nThreads=1, **cc_kwargs):
+    """
+    Cross-correlate stations over their valid segments only.
+
+    Args:
+        data (np.ndarray): (nsta, npts) float32 samples on a shared time axis.
+        segments (list): (k, 2) [start, end) valid columns of every station.
+        nf (int): Number of frequency samples kept by CC.
+        fft_length (int): FFT window length in samples.
+        station_pairs (np.ndarray): Flat station index pairs, as from `GetStationPairs`.
+        fstride (int): Frequency stride passed to CC.
+        overlap_rate (float): Window overlap passed to CC.
+        nThreads (int): Threads used by CC.
+        **cc_kwargs: Further CC options (e.g. ifonebit, ifspecwhittenning).
+
+    Returns:
+        tuple: (ncfs of shape (npairs, nf), number of FFT windows per pair). Pairs
+               without a common window are zero.
+    """
+    nsta, npts = data.shape
+    pairs = np.asarray(station_pairs).reshape(-1, 2)
+    ncfs = np.zeros((len(pairs), nf), dtype=np.complex64)
+    windows = np.zeros(len(pairs), dtype=np.int64)
+
+    for start, end, ranges in plan_chunks(segments, fft_length):
+        length = end - start
+        if start == 0 and end == npts:
+            chunk = np.ascontiguousarray(data).reshape(-1)
+        else:
+            chunk = np.ascontiguousarray(data[:, start:end]).reshape(-1)
+        chunk_ncfs = CC(length, nsta, nf, fft_length, station_pairs, ranges.reshape(-1), chunk,
+                        fstride=fstride, overlaprate=overlap_rate, nThreads=nThreads, **cc_kwargs)
+        weight = pair_window_count(ranges, pairs, fft_length, overlap_rate)
+        ncfs += chunk_ncfs * weight[:, np.newaxis].astype(np.float32)
+        windows += weight
+
+    used = windows > 0
+    ncfs[used] /= windows[used, np.newaxis].astype(np.float32)
+    return ncfs, windows
@@ -0,0 +1,237 @@
+# -*- encoding: utf-8 -*-
+'''
+@File        :   ccf_archive.py
+@Time        :   2026/10/18 20:31:06
+@Author      :   Haiyang Liao
+@Affiliation :   Nanjing University (NJU)
+@Contact     :   haiyangliao@smail.nju.edu.cn
+@Description :   Persistent HDF5 archive of cross-correlation functions, indexed by station
+                 pair and time window. The frequency axis is stored once; the CCFs live in
+                 one chunked, compressed (window, pair, frequency) dataset that grows as new
+                 windows (e.g. days) and new pairs are appended, and single pairs or single
+                 windows can be read without loading the rest.
+'''
+
+
+import numpy as np
+import h5py
+
+ARCHIVE_VERSION = 1
+PAIR_CHUNK = 64          # Pairs per HDF5 chunk; one chunk holds one window
+COMPRESSION = "gzip"
+COMPRESSION_LEVEL = 4
+
+_STR = h5py.string_dtype()
+
+
+def canonical_pair(name_a, name_b):
+    """(first, second, flipped): the pair ordered by name, and whether it was swapped."""
+    return (name_a, name_b, False) if name_a <= name_b else (name_b, name_a, True)
+
+
+class CCFArchive:
+    """
+    HDF5 file with the CCFs of many station pairs and time windows.
+
+    A pair (a, b) is stored once with a <= b by name; reading it as (b, a) returns
+    the complex conjugate, i.e. the time-reversed CCF. Missing (pair, window)
+    entries are zero with a window count of 0.
+
+    Layout:
+        f (nf,)                      frequency axis
+        stations (nsta,)             station names
+        pairs (npairs, 2)            station indices of every pair
+        windows (nwin,)              window labels
+        ncfs (nwin, npairs, nf)      complex64 CCFs, chunked per window and PAIR_CHUNK pairs
+        counts (nwin, npairs)        FFT windows stacked into each CCF
+    """
+
+    def __init__(self, path, mode="a"):
+        self.path = path
+        self.file = h5py.File(path, mode)
+        self._station_index = {name: i for i, name in enumerate(self.stations)}
+        self._pair_index = {tuple(pair): i for i, pair in enumerate(self.file["pairs"][:])} if "pairs" in self.file else {}
+        self._window_index = {label: i for i, label in enumerate(self.windows)}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    @property
+    def f(self):
+        return self.file["f"][:] if "f" in self.file else None
+
+    @property
+    def stations(self):
+        return list(self.file["stations"].asstr()[:]) if "stations" in self.file else []
+
+    @property
+    def windows(self):
+        return list(self.file["windows"].asstr()[:]) if "windows" in self.file else []
+
+    def pair_names(self):
+        """(npairs, 2) station names of every stored pair, in archive order."""
+        if "pairs" not in self.file:
+            return np.zeros((0, 2), dtype=str)
+        return np.asarray(self.stations)[self.file["pairs"][:]]
+
+    def _create(self, f):
+        nf = len(f)
+        self.file.attrs["version"] = ARCHIVE_VERSION
+        self.file.create_dataset("f", data=f)
+        self.file.create_dataset("stations", shape=(0,), maxshape=(None,), dtype=_STR)
+        self.file.create_dataset("pairs", shape=(0, 2), maxshape=(None, 2), dtype=np.int32, chunks=(1024, 2))
+        self.file.create_dataset("windows", shape=(0,), maxshape=(None,), dtype=_STR)
+        self.file.create_dataset("ncfs", shape=(0, 0, nf), maxshape=(None, None, nf), dtype=np.complex64,
+                                 chunks=(1, PAIR_CHUNK, nf), compression=COMPRESSION,
+                                 compression_opts=COMPRESSION_LEVEL, shuffle=True)
+        self.file.create_dataset("counts", shape=(0, 0), maxshape=(None, None), dtype=np.int64,
+                                 chunks=(1, 1024))
+
+    @staticmethod
+    def _append(dataset, values):
+        start = dataset.shape[0]
+        dataset.resize(start + len(values), axis=0)
+        dataset[start:] = values
+
+    def _station_ids(self, names):
+        new = [name for name in dict.fromkeys(names) if name not in self._station_index]
+        if new:
+            for name in new:
+                self._station_index[name] = len(self._station_index)
+            self._append(self.file["stations"], new)
+        return np.array([self._station_index[name] for name in names], dtype=np.int64)
+
+    def _pair_rows(self, ids, create):
+        keys = [tuple(pair) for pair in ids]
+        new = [key for key in dict.fromkeys(keys) if key not in self._pair_index]
+        if new and create:
+            for key in new:
+                self._pair_index[key] = len(self._pair_index)
+            self._append(self.file["pairs"], np.array(new, dtype=np.int32))
+            self.file["ncfs"].resize(len(self._pair_index), axis=1)
+            self.file["counts"].resize(len(self._pair_index), axis=1)
+        return np.array([self._pair_index.get(key, -1) for key in keys], dtype=np.int64)
+
+    def _pair_ids(self, names_a, names_b, create=False):
+        """Archive pair rows of the named pairs (-1 if absent) and which ones are flipped."""
+        ordered = [canonical_pair(a, b) for a, b in zip(names_a, names_b)]
+        if create:
+            firsts = self._station_ids([pair[0] for pair in ordered])
+            seconds = self._station_ids([pair[1] for pair in ordered])
+        else:
+            firsts = np.array([self._station_index.get(pair[0], -1) for pair in ordered], dtype=np.int64)
+            seconds = np.array([self._station_index.get(pair[1], -1) for pair in ordered], dtype=np.int64)
+        rows = self._pair_rows(np.column_stack((firsts, seconds)), create)
+        rows[(firsts < 0) | (seconds < 0)] = -1
+        return rows, np.array([pair[2] for pair in ordered], dtype=bool)
+
+    def add_window(self, label, names, pairs, ncfs, counts=None, f=None):
+        """
+        Store the CCFs of some pairs in one time window. Pairs already stored for that
+        window are replaced; other pairs of the window are kept. Each pair may be given
+        only once, in either station order.
+
+        Args:
+            label (str): Window label, e.g. the date and time range.
+            names (list): Station names indexed by `pairs`.
+            pairs (np.ndarray): (npairs, 2) or flat station indices into `names`.
+            ncfs (np.ndarray): (npairs, nf) complex CCFs.
+            counts (np.ndarray): FFT windows per pair; 1 for every pair if None.
+            f (np.ndarray): Frequency axis; required for the first window, checked after.
+
+        Returns:
+            int: Window index in the archive.
+        """
+        pairs = np.asarray(pairs).reshape(-1, 2)
+        names = np.asarray(names)
+        if "f" not in self.file:
+            if f is None:
+                raise ValueError("The first window of a CCF archive needs the frequency axis.")
+            self._create(np.asarray(f))
+        elif f is not None and not np.allclose(self.file["f"][:], f):
+            raise ValueError(f"Frequency axis does not match the one stored in {self.path}.")
+        if counts is None:
+            counts = np.ones(len(pairs), dtype=np.int64)
+        seen = set()
+        for a, b in zip(names[pairs[:, 0]], names[pairs[:, 1]]):
+            pair = canonical_pair(a, b)[:2]
+            if pair in seen:
+                raise ValueError(f"Pair {pair[0]}-{pair[1]} is given more than once for window '{label}'.")
+            seen.add(pair)
+
+        rows, flipped = self._pair_ids(names[pairs[:, 0]], names[pairs[:, 1]], create=True)
+        if label in self._window_index:
+            window = self._window_index[label]
+        else:
+            window = len(self._window_index)
+            self._window_index[label] = window
+            self._append(self.file["windows"], [label])
+            self.file["ncfs"].resize(window + 1, axis=0)
+            self.file["counts"].resize(window + 1, axis=0)
+
+        # Only the given pairs are written, so several lines can share one window
+        order = np.argsort(rows)
+        values = np.where(flipped[:, np.newaxis], np.conj(ncfs), ncfs).astype(np.complex64)
+        self.file["ncfs"][window, rows[order]] = values[order]
+        self.file["counts"][window, rows[order]] = np.asarray(counts, dtype=np.int64)[order]
+        return window
+
+    def _window_ids(self, windows):
+        if windows is None:
+            return np.arange(len(self._window_index))
+        return np.array([self._window_index[label] for label in windows], dtype=np.int64)
+
+    def read_pairs(self, names_a, names_b, windows=None):
+        """
+        CCFs of some station pairs in some windows.
+
+        Args:
+            names_a (list): First station of every pair.
+            names_b (list): Second station of every pair.
+            windows (list): Window labels; all windows if None.
+
+        Returns:
+            tuple: (ncfs of shape (nwin, npairs, nf), counts of shape (nwin, npairs)).
+                   Pairs not in the archive are zero with a count of 0.
+        """
+        rows, flipped = self._pair_ids(list(names_a), list(names_b))
+        window_ids = self._window_ids(windows)
+        nf = len(self.file["f"])
+        ncfs = np.zeros((len(window_ids), len(rows), nf), dtype=np.complex64)
+        counts = np.zeros((len(window_ids), len(rows)), dtype=np.int64)
+        present = np.flatnonzero(rows >= 0)
+        if len(present) and len(window_ids):
+            # HDF5 selections must be increasing, so read sorted and scatter back
+            unique_rows, inverse = np.unique(rows[present], return_inverse=True)
+            for k, window in enumerate(window_ids):
+                ncfs[k, present] = self.file["ncfs"][window, unique_rows][inverse]
+                counts[k, present] = self.file["counts"][window, unique_rows][inverse]
+        ncfs[:, flipped] = np.conj(ncfs[:, flipped])
+        return ncfs, counts
+
+    def read_pair(self, name_a, name_b, windows=None):
+        """CCFs (nwin, nf) and counts (nwin,) of one station pair."""
+        ncfs, counts = self.read_pairs([name_a], [name_b], windows)
+        return ncfs[:, 0], counts[:, 0]
+
+    def read_window(self, label, names):
+        """
+        CCFs of a sub-array in one window, in the pair order of `ccfj.GetStationPairs`.
+
+        Args:
+            label (str): Window label.
+            names (list): Station names of the sub-array.
+
+        Returns:
+            tuple: (ncfs of shape (npairs, nf), counts of shape (npairs,)).
+        """
+        i, j = np.triu_indices(len(names), 1)
+        names = np.asarray(names)
+        ncfs, counts = self.read_pairs(names[i], names[j], [label])
+        return ncfs[0], counts[0]
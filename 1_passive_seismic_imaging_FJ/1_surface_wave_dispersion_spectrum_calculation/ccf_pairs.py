@@ -0,0 +1,74 @@
+# -*- encoding: utf-8 -*-
+'''
+@File        :   ccf_pairs.py
+@Time        :   2026/10/18 20:14:50
+@Author      :   Haiyang Liao
+@Affiliation :   Nanjing University (NJU)
+@Contact     :   haiyangliao@smail.nju.edu.cn
+@Description :   Pair-level CCF store for sliding sub-arrays. Every station pair of a line
+                 that fits inside the largest sub-array is cross-correlated once, instead
+                 of running CC again for each sliding window.
+'''
+
+
+import numpy as np
+from cc_chunks import chunked_cc
+
+
+def upper_pairs(nsta):
+    """(npairs, 2) station index pairs i < j in the order of `ccfj.GetStationPairs`."""
+    i, j = np.triu_indices(nsta, 1)
+    return np.column_stack((i, j))
+
+
+def aperture_pairs(nsta, max_offset=None):
+    """
+    Station pairs whose index difference is at most `max_offset`.
+
+    Args:
+        nsta (int): Number of stations of the line.
+        max_offset (int): Largest index difference kept; all pairs if None.
+
+    Returns:
+        np.ndarray: (npairs, 2) int32 pairs i < j, ordered by i then j.
+    """
+    pairs = upper_pairs(nsta)
+    if max_offset is not None:
+        pairs = pairs[pairs[:, 1] - pairs[:, 0] <= max_offset]
+    return pairs.astype(np.int32)
+
+
+class PairCCFStore:
+    """
+    Cross-correlations of a line, one row per station pair.
+
+    Use `compute_pair_store` to create one.
+    """
+
+    def __init__(self, names, pairs, ncfs, windows):
+        self.names = list(names)
+        self.pairs = np.asarray(pairs)
+        self.ncfs = ncfs
+        self.windows = windows
+
+
+def compute_pair_store(names, data, segments, nf, fft_length, max_offset=None, **cc_kwargs):
+    """
+    Cross-correlate every pair of a line within the aperture in one CC run.
+
+    Args:
+        names (list): Station names, one per row of `data`.
+        data (np.ndarray): (nsta, npts) float32 samples on a shared time axis.
+        segments (list): Valid [start, end) columns of every station.
+        nf (int): Number of frequency samples kept by CC.
+        fft_length (int): FFT window length in samples.
+        max_offset (int): Largest station index difference of a pair, i.e. the
+                          sub-array length minus one; all pairs if None.
+        **cc_kwargs: Passed to `cc_chunks.chunked_cc` (fstride, overlap_rate, nThreads, ...).
+
+    Returns:
+        PairCCFStore: CCFs of all pairs within the aperture.
+    """
+    pairs = aperture_pairs(len(names), max_offset)
+    ncfs, windows = chunked_cc(data, segments, nf, fft_length, pairs.reshape(-1), **cc_kwargs)
+    return PairCCFStore(names, pairs, ncfs, windows)
@@ -0,0 +1,173 @@
+# -*- encoding: utf-8 -*-
+'''
+@File        :   ccf_stack.py
+@Time        :   2026/10/18 20:52:19
+@Author      :   Haiyang Liao
+@Affiliation :   Nanjing University (NJU)
+@Contact     :   haiyangliao@smail.nju.edu.cn
+@Description :   Incremental CCF stacking. Running complex sums and counts per station pair
+                 are kept in an HDF5 file; a new day's CCFs are mapped onto the stacked pairs
+                 with one sorted-key lookup and folded in with one indexed add, and the
+                 normalized stack of any sub-array can be read at any time.
+'''
+
+
+import os
+import numpy as np
+import h5py
+from ccf_archive import canonical_pair
+
+_STR = h5py.string_dtype()
+
+
+class CCFStack:
+    """
+    Running stack of CCFs per station pair, stored in an HDF5 file.
+
+    Every folded window adds its CCF to the pair's sum and 1 to its count, so the
+    stack is the mean over the windows that contained the pair. Labels of folded
+    windows are recorded and a label is never folded twice.
+
+    Layout:
+        f (nf,)                 frequency axis
+        stations (nsta,)        station names
+        pairs (npairs, 2)       station indices of every pair, first <= second by name
+        sum (npairs, nf)        complex128 running sums
+        count (npairs,)         number of windows in each sum
+        folded (nwin,)          labels of the folded windows
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.f = None
+        self.stations = []
+        self.pairs = np.zeros((0, 2), dtype=np.int64)
+        self.sum = None
+        self.count = np.zeros(0, dtype=np.int64)
+        self.folded = []
+        if os.path.exists(path):
+            with h5py.File(path, "r") as h5file:
+                self.f = h5file["f"][:]
+                self.stations = list(h5file["stations"].asstr()[:])
+                self.pairs = h5file["pairs"][:].astype(np.int64)
+                self.sum = h5file["sum"][:]
+                self.count = h5file["count"][:]
+                self.folded = list(h5file["folded"].asstr()[:])
+        self._station_index = {name: i for i, name in enumerate(self.stations)}
+
+    def _keys(self, pairs):
+        # One int64 key per pair, so pairs can be matched with a sorted search
+        return pairs[:, 0] * (1 << 31) + pairs[:, 1]
+
+    def _station_ids(self, names, create):
+        if create:
+            for name in names:
+                if name not in self._station_index:
+                    self._station_index[name] = len(self.stations)
+                    self.stations.append(name)
+        return np.array([self._station_index.get(name, -1) for name in names], dtype=np.int64)
+
+    def _canonical(self, names_a, names_b, create=False):
+        ordered = [canonical_pair(a, b) for a, b in zip(names_a, names_b)]
+        ids = np.column_stack((self._station_ids([pair[0] for pair in ordered], create),
+                               self._station_ids([pair[1] for pair in ordered], create)))
+        return ids.reshape(-1, 2), np.array([pair[2] for pair in ordered], dtype=bool)
+
+    def _rows(self, ids):
+        """Stack rows of the station id pairs, -1 where the pair is not stacked."""
+        rows = np.full(len(ids), -1, dtype=np.int64)
+        if len(self.pairs) == 0:
+            return rows
+        keys = self._keys(self.pairs)
+        order = np.argsort(keys)
+        sorted_keys = keys[order]
+        wanted = self._keys(ids)
+        position = np.minimum(np.searchsorted(sorted_keys, wanted), len(keys) - 1)
+        found = (sorted_keys[position] == wanted) & (ids.min(axis=1) >= 0)
+        rows[found] = order[position[found]]
+        return rows
+
+    def fold(self, label, names, pairs, ncfs, counts=None, f=None):
+        """
+        Add one window's CCFs to the stack.
+
+        Args:
+            label (str): Window label, e.g. the date and time range.
+            names (list): Station names indexed by `pairs`.
+            pairs (np.ndarray): (npairs, 2) or flat station indices into `names`.
+            ncfs (np.ndarray): (npairs, nf) complex CCFs.
+            counts (np.ndarray): FFT windows per pair; pairs with 0 are skipped. All
+                                 pairs are used if None.
+            f (np.ndarray): Frequency axis; required for the first window, checked after.
+
+        Returns:
+            bool: False if `label` was already folded (nothing is added).
+        """
+        if label in self.folded:
+            return False
+        if self.f is None:
+            if f is None:
+                raise ValueError("The first window of a CCF stack needs the frequency axis.")
+            self.f = np.asarray(f)
+            self.sum = np.zeros((0, len(self.f)), dtype=np.complex128)
+        elif f is not None and not np.allclose(self.f, f):
+            raise ValueError(f"Frequency axis does not match the one stacked in {self.path}.")
+
+        pairs = np.asarray(pairs).reshape(-1, 2)
+        names = np.asarray(names)
+        ncfs = np.asarray(ncfs)
+        if counts is not None:
+            used = np.asarray(counts) > 0
+            pairs, ncfs = pairs[used], ncfs[used]
+
+        ids, flipped = self._canonical(names[pairs[:, 0]], names[pairs[:, 1]], create=True)
+        rows = self._rows(ids)
+        new = rows < 0
+        if new.any():
+            rows[new] = len(self.pairs) + np.arange(new.sum())
+            self.pairs = np.concatenate((self.pairs, ids[new]))
+            self.sum = np.concatenate((self.sum, np.zeros((new.sum(), len(self.f)), dtype=self.sum.dtype)))
+            self.count = np.concatenate((self.count, np.zeros(new.sum(), dtype=np.int64)))
+
+        np.add.at(self.sum, rows, np.where(flipped[:, np.newaxis], np.conj(ncfs), ncfs))
+        np.add.at(self.count, rows, 1)
+        self.folded.append(label)
+        return True
+
+    def stack(self, names_a, names_b):
+        """
+        Normalized stack of some station pairs.
+
+        Returns:
+            tuple: (complex64 mean CCFs of shape (npairs, nf), count per pair). Pairs
+                   never stacked are zero with a count of 0.
+        """
+        if self.f is None:
+            raise ValueError(f"The CCF stack {self.path} is empty.")
+        ids, flipped = self._canonical(list(names_a), list(names_b))
+        rows = self._rows(ids)
+        found = rows >= 0
+        ncfs = np.zeros((len(rows), len(self.f)), dtype=np.complex64)
+        count = np.zeros(len(rows), dtype=np.int64)
+        count[found] = self.count[rows[found]]
+        ncfs[found] = self.sum[rows[found]] / np.maximum(count[found], 1)[:, np.newaxis]
+        ncfs[flipped] = np.conj(ncfs[flipped])
+        return ncfs, count
+
+    def subarray(self, names):
+        """Normalized stack and counts of a sub-array, in the pair order of `ccfj.GetStationPairs`."""
+        i, j = np.triu_indices(len(names), 1)
+        names = np.asarray(names)
+        return self.stack(names[i], names[j])
+
+    def save(self):
+        """Write the stack to its HDF5 file, replacing the previous state."""
+        tmp_path = self.path + ".tmp"
+        with h5py.File(tmp_path, "w") as h5file:
+            h5file.create_dataset("f", data=self.f)
+            h5file.create_dataset("stations", data=np.array(self.stations, dtype=object), dtype=_STR)
+            h5file.create_dataset("pairs", data=self.pairs)
+            h5file.create_dataset("sum", data=self.sum)
+            h5file.create_dataset("count", data=self.count)
+            h5file.create_dataset("folded", data=np.array(self.folded, dtype=object), dtype=_STR)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,153 @@
+# -*- encoding: utf-8 -*-
+'''
+@File        :   checkpoint.py
+@Time        :   2026/10/18 22:04:36
+@Author      :   Haiyang Liao
+@Affiliation :   Nanjing University (NJU)
+@Contact     :   haiyangliao@smail.nju.edu.cn
+@Description :   Checkpoints for resumable runs. Every finished stage is recorded in a JSON
+                 manifest under a key hashed from its inputs and parameters, together with
+                 the size and digest of its output files; a rerun skips the stages whose key
+                 still matches and whose outputs are still there.
+'''
+
+
+import os
+import json
+import time
+import hashlib
+import threading
+import numpy as np
+
+MANIFEST_VERSION = 1
+READ_BLOCK = 1 << 20       # Bytes read at a time when hashing a file
+
+
+def _update(digest, value):
+    if isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value)
+        digest.update(f"array{value.dtype.str}{value.shape}".encode())
+        digest.update(value.tobytes())
+    elif isinstance(value, dict):
+        digest.update(b"dict")
+        for name in sorted(value):
+            _update(digest, str(name))
+            _update(digest, value[name])
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"list{len(value)}".encode())
+        for item in value:
+            _update(digest, item)
+    elif isinstance(value, bytes):
+        digest.update(b"bytes" + value)
+    else:
+        digest.update(f"{type(value).__name__}:{value!r}".encode())
+
+
+def fingerprint(*parts, **params):
+    """
+    Key of a stage: sha1 over its inputs and parameters.
+
+    Args:
+        *parts: Inputs, e.g. arrays, file signatures or labels.
+        **params: Named parameters; their order does not matter.
+
+    Returns:
+        str: Hex digest.
+    """
+    digest = hashlib.sha1()
+    _update(digest, list(parts))
+    _update(digest, params)
+    return digest.hexdigest()
+
+
+def file_signature(paths):
+    """[path, size, mtime_ns] of every file, cheap to compute for many input files."""
+    signature = []
+    for path in paths:
+        stat = os.stat(path)
+        signature.append([path, stat.st_size, stat.st_mtime_ns])
+    return signature
+
+
+def file_digest(path):
+    """sha1 of a file's content."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(READ_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CheckpointManifest:
+    """
+    JSON manifest of finished stages, rewritten atomically after every record.
+
+    Entry of a stage:
+        key        fingerprint of the stage's inputs and parameters
+        outputs    {path: [size, sha1]} of the files the stage wrote
+        info       anything else worth keeping (timings, counts, ...)
+        finished   time the stage was recorded
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.stages = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                self.stages = json.load(file).get("stages", {})
+
+    def done(self, stage, key, verify=False):
+        """
+        Whether a stage finished with the same key and its outputs are intact.
+
+        Args:
+            stage (str): Stage name.
+            key (str): Current fingerprint of the stage.
+            verify (bool): Also compare the digest of every output, not only its size.
+
+        Returns:
+            bool
+        """
+        entry = self.stages.get(stage)
+        if entry is None or entry["key"] != key:
+            return False
+        for path, (size, digest) in entry["outputs"].items():
+            if not os.path.exists(path) or os.path.getsize(path) != size:
+                return False
+            if verify and file_digest(path) != digest:
+                return False
+        return True
+
+    def record(self, stage, key, outputs=(), **info):
+        """
+        Mark a stage as finished. Call it after all its outputs are written.
+
+        Args:
+            stage (str): Stage name.
+            key (str): Fingerprint of the stage's inputs and parameters.
+            outputs (list): Files written by the stage.
+            **info: JSON-serializable details kept with the entry.
+        """
+        entry = {
+            "key": key,
+            "outputs": {path: [os.path.getsize(path), file_digest(path)] for path in outputs},
+            "info": info,
+            "finished": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        with self._lock:
+            self.stages[stage] = entry
+            self._write()
+
+    def forget(self, stage):
+        """Drop a stage so that it runs again."""
+        with self._lock:
+            if self.stages.pop(stage, None) is not None:
+                self._write()
+
+    def _write(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"version": MANIFEST_VERSION, "stages": self.stages}, file, indent=1)
+        os.replace(tmp_path, self.path)
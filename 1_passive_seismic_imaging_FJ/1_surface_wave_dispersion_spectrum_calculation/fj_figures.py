@@ -0,0 +1,53 @@
+# -*- encoding: utf-8 -*-
+'''
+@File        :   fj_figures.py
+@Time        :   2026/10/18 21:46:52
+@Author      :   Haiyang Liao
+@Affiliation :   Nanjing University (NJU)
+@Contact     :   haiyangliao@smail.nju.edu.cn
+@Description :   Figures of the passive FJ workflow, drawn by the render workers of
+                 `common_tools/render_queue.py` from arrays the noise script has already
+                 saved. Every renderer draws on an empty Figure and does not use pyplot.
+'''
+
+
+import numpy as np
+
+
+def plot_seismograms(fig, data, xlim=(-1.0, 1.0)):
+    """
+    Time-domain CCFs sorted by distance, one trace per pair offset by its distance.
+
+    Args:
+        fig (Figure): Empty figure.
+        data (dict): `ncfs` (npairs, nf) complex CCFs, `r` distances and `f` frequencies.
+        xlim (tuple): Time limits in seconds.
+    """
+    ncfs, r, f = data["ncfs"], data["r"], data["f"]
+    dt = 1 / np.max(f)
+    t = (np.linspace(-len(f) / 2, len(f) / 2 - 1, len(f)) + 0.5) * dt
+    ncfst = np.real(np.fft.fftshift(np.fft.ifft(ncfs, axis=1), axes=1))
+    ax = fig.add_subplot(111)
+    for i in range(len(r)):
+        ax.plot(t, ncfst[i, :] / np.max(ncfst[i, :]) + r[i], 'k', linewidth=0.2)
+    ax.set_xlim(list(xlim))
+    ax.set_ylim(bottom=0)
+
+
+def plot_dispersion(fig, data, xlim=(0, 50), ylim=(0, 1200)):
+    """
+    FJ dispersion spectrum.
+
+    Args:
+        fig (Figure): Empty figure.
+        data (dict): `ds` (nc, nf) spectrum, `f` frequencies and `c` phase velocities.
+        xlim (tuple): Frequency limits.
+        ylim (tuple): Phase velocity limits.
+    """
+    ax = fig.add_subplot(111)
+    ax.pcolormesh(data["f"], data["c"], data["ds"], cmap='jet', vmin=0, vmax=1, shading='auto')
+    ax.set_xlim(list(xlim))
+    ax.set_ylim(list(ylim))
+    ax.tick_params(axis='x', labelsize=12)
+    ax.tick_params(axis='y', labelsize=12)
+    fig.tight_layout()
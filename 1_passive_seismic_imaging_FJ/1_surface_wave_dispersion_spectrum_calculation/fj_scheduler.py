@@ -0,0 +1,139 @@
+# -*- encoding: utf-8 -*-
+'''
+@File        :   fj_scheduler.py
+@Time        :   2026/10/18 21:27:31
+@Author      :   Haiyang Liao
+@Affiliation :   Nanjing University (NJU)
+@Contact     :   haiyangliao@smail.nju.edu.cn
+@Description :   Parallel frequency-Bessel transforms for many sub-arrays. Every sub-array
+                 (of every date) is queued as one task, split into frequency bands; the
+                 bands run as `ccfj.fj_noise` calls on a process pool sized to a core
+                 budget, and each finished spectrum is handed to a writer thread so that
+                 saving results overlaps with the remaining transforms.
+'''
+
+
+import os
+import logging
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from tqdm import tqdm
+
+FJ_BANDS = 4             # Frequency bands per sub-array
+THREADS_PER_TASK = 1     # Threads one fj_noise call may use (OpenMP)
+
+
+def core_budget(total_cores=None, reserved=0, threads_per_task=THREADS_PER_TASK):
+    """
+    Worker processes that fit in a core budget.
+
+    Args:
+        total_cores (int): Cores the run may use; all cores if None.
+        reserved (int): Cores kept for other work running at the same time (e.g. CC threads).
+        threads_per_task (int): Threads used by each worker.
+
+    Returns:
+        int: At least 1.
+    """
+    if total_cores is None:
+        total_cores = os.cpu_count() or 1
+    return max(1, (total_cores - reserved) // max(1, threads_per_task))
+
+
+def split_bands(nf, bands):
+    """Split `nf` frequency samples into at most `bands` contiguous slices."""
+    edges = np.linspace(0, nf, min(bands, nf) + 1).astype(int)
+    return [slice(a, b) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+
+def _init_worker(threads_per_task):
+    os.environ["OMP_NUM_THREADS"] = str(threads_per_task)
+
+
+def _fj_band(ncfs, r, c, f, fstride, itype, func):
+    # Imported in the worker so the pool does not depend on the parent's ccfj state
+    import ccfj
+    return ccfj.fj_noise(ncfs, r, c, f, fstride, itype=itype, func=func)
+
+
+def fj_task(name, ncfs, r, f, **extra):
+    """
+    Describe one sub-array for `run_fj_tasks`.
+
+    Args:
+        name (str): Unique name of the task.
+        ncfs (np.ndarray): (npairs, nf) stacked CCFs (the real part is transformed).
+        r (np.ndarray): Pair distances in meters.
+        f (np.ndarray): Frequency axis.
+        **extra: Anything the result callback needs (output paths, labels, ...).
+
+    Returns:
+        dict: The task.
+    """
+    return dict(extra, name=name, ncfs=np.ascontiguousarray(np.real(ncfs)), r=np.asarray(r), f=np.asarray(f))
+
+
+def run_fj_tasks(tasks, c, fstride=1, on_result=None, processes=None, bands=FJ_BANDS,
+                 threads_per_task=THREADS_PER_TASK, itype=0, func=1):
+    """
+    Run the FJ transform of every task on a process pool.
+
+    Each task is split into frequency bands, which are independent because the
+    transform is evaluated frequency by frequency. When all bands of a task are
+    done, `on_result(task, ds)` runs on a single writer thread while the pool
+    keeps working.
+
+    Args:
+        tasks (list): Tasks from `fj_task`.
+        c (np.ndarray): Phase velocities.
+        fstride (int): Frequency stride passed to fj_noise.
+        on_result (callable): Called with (task, spectrum of shape (nc, nf)).
+        processes (int): Worker processes; see `core_budget`. 1 runs in-process.
+        bands (int): Frequency bands per task.
+        threads_per_task (int): OpenMP threads per worker.
+        itype (int): fj_noise itype.
+        func (int): fj_noise func.
+
+    Returns:
+        dict: Task name -> spectrum. Empty if `on_result` is given; the spectra are
+              then only passed to the callback and not kept.
+    """
+    if processes is None:
+        processes = core_budget(threads_per_task=threads_per_task)
+    task_bands = {task["name"]: split_bands(len(task["f"]), bands) for task in tasks}
+    jobs = [(task, band) for task in tasks for band in task_bands[task["name"]]]
+    parts = {task["name"]: {} for task in tasks}
+    results = {}
+    writes = []
+
+    def finish(task, band, ds):
+        parts[task["name"]][band.start] = ds
+        if len(parts[task["name"]]) < len(task_bands[task["name"]]):
+            return
+        spectrum = np.concatenate([parts[task["name"]][start] for start in sorted(parts[task["name"]])], axis=1)
+        del parts[task["name"]]
+        if on_result is None:
+            results[task["name"]] = spectrum
+        else:
+            writes.append(writer.submit(on_result, task, spectrum))
+
+    with ThreadPoolExecutor(max_workers=1) as writer:
+        if processes <= 1:
+            for task, band in tqdm(jobs, desc="FJ transforms"):
+                finish(task, band, _fj_band(np.ascontiguousarray(task["ncfs"][:, band]), task["r"], c,
+                                            task["f"][band], fstride, itype, func))
+        else:
+            with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                     initargs=(threads_per_task,)) as executor:
+                futures = {
+                    executor.submit(_fj_band, np.ascontiguousarray(task["ncfs"][:, band]), task["r"], c,
+                                    task["f"][band], fstride, itype, func): (task, band)
+                    for task, band in jobs
+                }
+                for future in tqdm(as_completed(futures), total=len(futures), desc="FJ transforms"):
+                    task, band = futures[future]
+                    finish(task, band, future.result())
+        for write in writes:
+            write.result()
+    logging.info(f'{len(tasks)} dispersion spectra computed with {processes} processes')
+    return results
@@ -0,0 +1,240 @@
+# -*- encoding: utf-8 -*-
+'''
+@File        :   noise_loader.py
+@Time        :   2026/10/18 19:21:45
+@Author      :   Haiyang Liao
+@Affiliation :   Nanjing University (NJU)
+@Contact     :   haiyangliao@smail.nju.edu.cn
+@Description :   Staging-free loader for the passive FJ noise pipeline. The per-minute SAC
+                 files are read straight from the original time folders, merged per station
+                 in one pass (see trace_merge) and written into one (nsta, npts) float32
+                 matrix (optionally memmapped). Every sliding sub-array is a slice of that
+                 matrix, so nothing is copied, merged or re-copied on disk. Stations are
+                 placed by their real start times on one time axis, and their valid
+                 segments are kept so CC can skip gaps (see cc_chunks).
+'''
+
+
+import os
+import logging
+import numpy as np
+from obspy.core import Trace
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
+from trace_merge import blank_gaps, merge_segments, widen_gaps
+
+STATION_NAME = "NJU-{:04d}-STA"
+LOAD_THREADS = 20
+FILTER_TRANSIENT_CYCLES = 10   # Periods of the lowpass corner treated as filter transient at gap edges
+
+
+def downsample_and_filter(trace, target_sampling_rate, corner_frequency):
+    trace.filter('lowpass', freq=corner_frequency)
+    trace.resample(sampling_rate=target_sampling_rate)
+    return trace
+
+
+def list_time_folders(path, start_time, end_time):
+    """
+    Time folders from the one named `start_time` to the one named `end_time`.
+
+    Args:
+        path (str): Day folder holding one sub-folder per recording period.
+        start_time (str): `HH-MM-SS` of the first folder (characters 11-19 of its name).
+        end_time (str): `HH-MM-SS` of the last folder, inclusive.
+
+    Returns:
+        list: Folder names in time order. Empty if no folder matches `start_time`;
+              runs to the last folder if none matches `end_time`.
+    """
+    time_folder_list = sorted(os.listdir(path))
+    stamps = [folder[11:19] for folder in time_folder_list]
+    first = stamps.index(start_time) if start_time in stamps else len(stamps)
+    last = stamps.index(end_time) if end_time in stamps else len(stamps)
+    return time_folder_list[first:last + 1]
+
+
+def find_station_files(path, start_traces, end_traces, start_time, end_time):
+    """
+    SAC files of every station in the trace range, in time order.
+
+    Args:
+        path (str): Day folder holding one sub-folder per recording period.
+        start_traces (int): First trace number.
+        end_traces (int): Last trace number, inclusive.
+        start_time (str): `HH-MM-SS` of the first time folder.
+        end_time (str): `HH-MM-SS` of the last time folder.
+
+    Returns:
+        dict: Trace number -> list of SAC file paths. Only stations with files are listed.
+    """
+    station_files = {}
+    for folder in list_time_folders(path, start_time, end_time):
+        sac_path = os.path.join(path, folder)
+        for sac in sorted(os.listdir(sac_path)):
+            try:
+                trace_num = int(sac[-8:-4])
+            except ValueError:
+                logging.warning(f"Unexpected file name format: {sac}")
+                continue
+            if start_traces <= trace_num <= end_traces:
+                station_files.setdefault(trace_num, []).append(os.path.join(sac_path, sac))
+    return station_files
+
+
+def merge_station(file_paths, target_sampling_rate, corner_frequency):
+    """
+    Merge the SAC files of one station and apply the lowpass and resampling.
+
+    The filter runs across the zero-filled gaps, so every gap is widened by
+    `FILTER_TRANSIENT_CYCLES` periods of the corner frequency on both sides to keep
+    the ringing at its edges out of the valid segments.
+
+    Returns:
+        tuple: (merged ObsPy Trace, widened gaps as [start, end) seconds from its
+               start). The gaps are zero after filtering as well.
+    """
+    trace, gaps = merge_segments(file_paths)
+    trace = downsample_and_filter(trace, target_sampling_rate, corner_frequency)
+    gaps = widen_gaps(gaps, FILTER_TRANSIENT_CYCLES / corner_frequency, trace.stats.npts / trace.stats.sampling_rate)
+    return blank_gaps(trace, gaps), gaps
+
+
+def station_segments(offset, npts, gaps, sampling_rate):
+    """
+    Valid column ranges of a station placed at `offset` in the matrix.
+
+    Args:
+        offset (int): Column of the station's first sample.
+        npts (int): Number of samples of the station.
+        gaps (np.ndarray): (n, 2) gaps in seconds from the station's first sample.
+        sampling_rate (float): Sampling rate of the matrix in Hz.
+
+    Returns:
+        np.ndarray: (k, 2) int array of [start, end) columns, in time order.
+    """
+    gaps = np.rint(np.asarray(gaps, dtype=np.float64).reshape(-1, 2) * sampling_rate).astype(np.int64)
+    bounds = np.concatenate(([0], gaps.ravel(), [npts])).reshape(-1, 2)
+    bounds = bounds[bounds[:, 1] > bounds[:, 0]]
+    return bounds + offset
+
+
+class StationMatrix:
+    """
+    Merged noise records of a line of stations, one row per station.
+
+    All rows share one time axis whose column 0 is `reference`. Use
+    `load_station_matrix` to create one; `subarray` returns the inputs of a range of
+    stations without copying the samples.
+    """
+
+    def __init__(self, trace_numbers, data, segments, stats, reference):
+        self.trace_numbers = np.asarray(trace_numbers)
+        self.names = [STATION_NAME.format(num) for num in trace_numbers]
+        self.data = data
+        self.segments = segments
+        self.stats = stats
+        self.reference = reference
+
+    @property
+    def npts(self):
+        return self.data.shape[1]
+
+    @property
+    def startend(self):
+        """(nsta, 2) first and last valid column of every station, (0, 0) if it has none."""
+        startend = np.zeros((len(self.segments), 2), dtype=np.int32)
+        for i, segments in enumerate(self.segments):
+            if len(segments):
+                startend[i] = segments[0, 0], segments[-1, 1]
+        return startend
+
+    def rows(self, start_trace, end_trace):
+        """Row slice of the stations numbered `start_trace` to `end_trace`."""
+        first = int(np.searchsorted(self.trace_numbers, start_trace, side="left"))
+        last = int(np.searchsorted(self.trace_numbers, end_trace, side="right"))
+        return slice(first, last)
+
+    def subarray(self, start_trace, end_trace):
+        """
+        Inputs of the stations numbered `start_trace` to `end_trace`.
+
+        Returns:
+            tuple: (station names, (nsta, npts) float32 view of the matrix, list of
+                   valid segments per station).
+        """
+        rows = self.rows(start_trace, end_trace)
+        return self.names[rows], self.data[rows], self.segments[rows]
+
+    def trace(self, trace_num):
+        """One station on the shared time axis as an ObsPy Trace, e.g. for plotting."""
+        row = self.rows(trace_num, trace_num).start
+        header = self.stats[row].copy()
+        header.starttime = self.reference
+        header.npts = self.npts
+        return Trace(data=np.array(self.data[row]), header=header)
+
+
+def load_station_matrix(path, start_traces, end_traces, start_time, end_time,
+                        target_sampling_rate=500, corner_frequency=50, memmap_path=None,
+                        threads=LOAD_THREADS, reference=None):
+    """
+    Load the noise records of a line of stations straight from the time folders.
+
+    Every station is placed on a shared time axis by its real start time, and its
+    valid segments (its span minus its gaps) are kept for chunked CC.
+
+    Args:
+        path (str): Day folder holding one sub-folder per recording period.
+        start_traces (int): First trace number.
+        end_traces (int): Last trace number, inclusive.
+        start_time (str): `HH-MM-SS` of the first time folder.
+        end_time (str): `HH-MM-SS` of the last time folder.
+        target_sampling_rate (float): Sampling rate after resampling, in Hz.
+        corner_frequency (float): Lowpass corner frequency in Hz.
+        memmap_path (str): If given, the matrix is a `.npy` memmap at this path instead
+                           of an in-memory array.
+        threads (int): Stations merged in parallel.
+        reference (UTCDateTime): Time of column 0. Defaults to the earliest station
+                                 start; samples before it are dropped, and a station
+                                 ending before it is left empty.
+
+    Returns:
+        StationMatrix: One row per station found, in trace number order, spanning
+                       `reference` to the latest station end.
+    """
+    station_files = find_station_files(path, start_traces, end_traces, start_time, end_time)
+    trace_numbers = sorted(station_files)
+    if not trace_numbers:
+        raise FileNotFoundError(f"No SAC files for traces {start_traces} to {end_traces} in {path}.")
+
+    def merge(trace_num):
+        return merge_station(station_files[trace_num], target_sampling_rate, corner_frequency)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        merged = list(tqdm(executor.map(merge, trace_numbers), total=len(trace_numbers), desc="Loading stations"))
+    traces = [trace for trace, _ in merged]
+    gaps = [station_gaps for _, station_gaps in merged]
+    del merged
+
+    if reference is None:
+        reference = min(trace.stats.starttime for trace in traces)
+    offsets = [int(round((trace.stats.starttime - reference) * target_sampling_rate)) for trace in traces]
+    # Stations that end before an explicit reference contribute no columns
+    npts = max(0, max(offset + trace.stats.npts for offset, trace in zip(offsets, traces)))
+    shape = (len(traces), npts)
+    if memmap_path is None:
+        data = np.zeros(shape, dtype=np.float32)
+    else:
+        data = np.lib.format.open_memmap(memmap_path, mode="w+", dtype=np.float32, shape=shape)
+
+    segments, stats = [], []
+    for i, (offset, trace) in enumerate(zip(offsets, traces)):
+        skip = max(0, -offset)
+        if skip < trace.stats.npts:
+            data[i, offset + skip:offset + trace.stats.npts] = trace.data[skip:]
+        station = np.clip(station_segments(offset, trace.stats.npts, gaps[i], target_sampling_rate), 0, npts)
+        segments.append(station[station[:, 1] > station[:, 0]])
+        stats.append(trace.stats)
+        traces[i] = None  # Release each merged trace once it is in the matrix
+    return StationMatrix(trace_numbers, data, segments, stats, reference)
@@ -0,0 +1,121 @@
+# -*- encoding: utf-8 -*-
+'''
+@File        :   pair_geometry.py
+@Time        :   2026/10/18 21:08:44
+@Author      :   Haiyang Liao
+@Affiliation :   Nanjing University (NJU)
+@Contact     :   haiyangliao@smail.nju.edu.cn
+@Description :   Station-pair distances for the passive FJ transform. All pair distances of
+                 a station set are computed in one vectorized haversine (great circle) or
+                 ECEF (straight line) evaluation, or along the fibre for straight DAS
+                 cables, and cached per station set.
+'''
+
+
+from functools import lru_cache
+import numpy as np
+
+EARTH_RADIUS = 6371009.0   # Mean earth radius in meters, as used by geopy's great_circle
+CACHE_SIZE = 32            # Station sets whose distances are kept
+METHODS = ("haversine", "ecef")
+
+# Linear station model of the 2024 Yinji line, see `linear_station_coordinates`
+LINE_ORIGIN = (118.96188946, 32.11321776)
+LINE_STEP = (0.00002478, 0.00000332)
+
+
+def read_station_info(station_info_path):
+    """
+    Read a `stations_info.txt` file (name, longitude, latitude per line).
+
+    Returns:
+        tuple: (names, lon, lat) with lon and lat as float64 arrays in degrees.
+    """
+    names, lon, lat = [], [], []
+    with open(station_info_path, 'r') as f_file:
+        for line in f_file:
+            parts = line.split()
+            if len(parts) < 3:
+                continue
+            names.append(parts[0])
+            lon.append(float(parts[1]))
+            lat.append(float(parts[2]))
+    return names, np.array(lon), np.array(lat)
+
+
+def linear_station_coordinates(trace_numbers, gauge_length, origin=LINE_ORIGIN, step=LINE_STEP):
+    """
+    Coordinates of stations on a straight line, as written by `generate_station_info`.
+
+    Returns:
+        tuple: (lon, lat) float64 arrays in degrees.
+    """
+    trace_numbers = np.asarray(trace_numbers, dtype=np.float64)
+    return origin[0] + step[0] * gauge_length * trace_numbers, origin[1] + step[1] * gauge_length * trace_numbers
+
+
+def upper_pair_indices(nsta):
+    """(first, second) index arrays of all pairs i < j in the order of `ccfj.GetStationPairs`."""
+    return np.triu_indices(nsta, 1)
+
+
+def _haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def _ecef(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    return EARTH_RADIUS * np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _cached_distances(method, lat_bytes, lon_bytes):
+    lat = np.frombuffer(lat_bytes, dtype=np.float64)
+    lon = np.frombuffer(lon_bytes, dtype=np.float64)
+    i, j = upper_pair_indices(len(lat))
+    if method == "haversine":
+        r = _haversine(lat[i], lon[i], lat[j], lon[j])
+    else:
+        xyz = _ecef(lat, lon)
+        r = np.linalg.norm(xyz[i] - xyz[j], axis=1)
+    r.flags.writeable = False
+    return r
+
+
+def pair_distances(lat, lon, method="haversine"):
+    """
+    Distances of all station pairs, in the pair order of `ccfj.GetStationPairs`.
+
+    Args:
+        lat (array-like): Station latitudes in degrees.
+        lon (array-like): Station longitudes in degrees.
+        method (str): "haversine" (great circle on a spherical earth, as geopy's
+                      great_circle) or "ecef" (straight line through the earth).
+
+    Returns:
+        np.ndarray: Read-only float64 distances in meters. Results are cached per
+                    station set and method.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown distance method '{method}', expected one of {METHODS}.")
+    lat = np.ascontiguousarray(lat, dtype=np.float64)
+    lon = np.ascontiguousarray(lon, dtype=np.float64)
+    return _cached_distances(method, lat.tobytes(), lon.tobytes())
+
+
+def along_fibre_distances(positions):
+    """
+    Distances of all station pairs along a straight cable.
+
+    Args:
+        positions (array-like): Position of every station along the fibre, in meters
+                                (e.g. channel number times channel spacing).
+
+    Returns:
+        np.ndarray: float64 distances in meters, in the pair order of `ccfj.GetStationPairs`.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    i, j = upper_pair_indices(len(positions))
+    return np.abs(positions[j] - positions[i])
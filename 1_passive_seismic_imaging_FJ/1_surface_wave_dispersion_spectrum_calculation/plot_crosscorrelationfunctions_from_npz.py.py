@@ -11,18 +11,28 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import os
+from ccf_archive import CCFArchive
 
-# Specify the path to the npz file
+# Specify the path to the npz file, or to a CCF archive (.h5) together with the window to plot
 file_path = r"F:\SYM\ResultS_line1_10_traces_CCF\outputImage\CCF\2024-01-24\2024-01-24 13-00-19 13-01-19 211 to 221.npz"
+archive_window = "2024-01-24 13-00-19 to 13-01-19"
 output_dir = r"F:\SYM\ResultS_line1_10_traces_CCF\outputImage\CCF\2024-01-24"
 
-# Load the npz file
-data = np.load(file_path)
+if file_path.endswith('.h5'):
+    # Read only the pairs containing "0211" from one window of the archive
+    with CCFArchive(file_path, 'r') as archive:
+        station_pairs_names = archive.pair_names()
+        station_pairs_names = station_pairs_names[np.char.find(station_pairs_names, '0211').max(axis=1) >= 0]
+        ncfs = archive.read_pairs(station_pairs_names[:, 0], station_pairs_names[:, 1], [archive_window])[0][0]
+        frequencies = archive.f
+else:
+    # Load the npz file
+    data = np.load(file_path)
 
-# Get cross-correlation function data and frequency data
-ncfs = data['ncfs']
-frequencies = data['f']
-station_pairs_names = data['station_pairs_names']
+    # Get cross-correlation function data and frequency data
+    ncfs = data['ncfs']
+    frequencies = data['f']
+    station_pairs_names = data['station_pairs_names']
 
 # Print debug information
 print("ncfs shape:", ncfs.shape)
@@ -33,7 +43,7 @@ print("First few elements of frequencies:", frequencies[:5])
 print("First few elements of station_pairs_names:", station_pairs_names[:5])
 
 # Filter station pairs containing "0211"
-filtered_indices = [i for i, station_pair in enumerate(station_pairs_names) if '0211' in station_pair]
+filtered_indices = [i for i, station_pair in enumerate(station_pairs_names) if any('0211' in name for name in station_pair)]
 filtered_station_pairs = [station_pairs_names[i] for i in filtered_indices]
 filtered_ncfs = ncfs[filtered_indices]
 
@@ -0,0 +1,103 @@
+# -*- encoding: utf-8 -*-
+'''
+@File        :   trace_merge.py
+@Time        :   2026/10/18 19:36:12
+@Author      :   Haiyang Liao
+@Affiliation :   Nanjing University (NJU)
+@Contact     :   haiyangliao@smail.nju.edu.cn
+@Description :   Single-pass merge of consecutive SAC segments of one station. The headers
+                 are read first to get the total time span, the output array is allocated
+                 once and every segment is written at its sample offset. Missing time is
+                 zero-filled and reported as explicit gaps instead of being interpolated.
+'''
+
+
+import numpy as np
+import obspy
+from obspy.core import Trace
+
+
+def read_segment_headers(file_paths):
+    """Stats of every file, read without the samples."""
+    return [obspy.read(file_path, headonly=True)[0].stats for file_path in file_paths]
+
+
+def find_gaps(valid):
+    """
+    Runs of False in a boolean mask.
+
+    Returns:
+        np.ndarray: (n, 2) int array of [start, end) sample indices.
+    """
+    edges = np.diff(np.concatenate(([1], valid.view(np.int8), [1])))
+    return np.column_stack((np.flatnonzero(edges == -1), np.flatnonzero(edges == 1)))
+
+
+def merge_segments(file_paths):
+    """
+    Merge the SAC segments of one station into one trace.
+
+    Segments may come in any order and may leave gaps; where segments overlap, the
+    later file wins.
+
+    Args:
+        file_paths (list): SAC files of the station.
+
+    Returns:
+        tuple: (ObsPy Trace covering the whole span as float32, gaps as a (n, 2) float
+               array of [start, end) times in seconds from the trace start).
+    """
+    headers = read_segment_headers(file_paths)
+    sampling_rate = headers[0].sampling_rate
+    for file_path, stats in zip(file_paths, headers):
+        if stats.sampling_rate != sampling_rate:
+            raise ValueError(f"{file_path} is sampled at {stats.sampling_rate} Hz, expected {sampling_rate} Hz.")
+
+    starttime = min(stats.starttime for stats in headers)
+    endtime = max(stats.endtime for stats in headers)
+    npts = int(round((endtime - starttime) * sampling_rate)) + 1
+    data = np.zeros(npts, dtype=np.float32)
+    valid = np.zeros(npts, dtype=bool)
+
+    for file_path, stats in zip(file_paths, headers):
+        offset = int(round((stats.starttime - starttime) * sampling_rate))
+        segment = obspy.read(file_path)[0].data
+        data[offset:offset + len(segment)] = segment
+        valid[offset:offset + len(segment)] = True
+
+    header = headers[0].copy()
+    header.starttime = starttime
+    header.npts = npts
+    gaps = find_gaps(valid) / sampling_rate
+    return Trace(data=data, header=header), gaps
+
+
+def widen_gaps(gaps, margin, duration):
+    """
+    Extend every gap by `margin` seconds on both sides, e.g. to cover filter transients.
+
+    Args:
+        gaps (np.ndarray): (n, 2) [start, end) times in seconds, in time order.
+        margin (float): Seconds added on each side.
+        duration (float): Length of the trace in seconds; gaps are clipped to [0, duration].
+
+    Returns:
+        np.ndarray: (k, 2) gaps, overlapping ones merged.
+    """
+    gaps = np.asarray(gaps, dtype=np.float64).reshape(-1, 2)
+    if len(gaps) == 0 or margin <= 0:
+        return gaps
+    merged = []
+    for start, end in zip(np.maximum(gaps[:, 0] - margin, 0), np.minimum(gaps[:, 1] + margin, duration)):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return np.array(merged)
+
+
+def blank_gaps(trace, gaps):
+    """Zero the samples of `trace` inside the gaps (seconds from the trace start)."""
+    for start, end in np.rint(np.asarray(gaps) * trace.stats.sampling_rate).astype(int):
+        trace.data[start:end] = 0
+    return trace
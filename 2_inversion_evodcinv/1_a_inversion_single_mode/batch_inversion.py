@@ -9,11 +9,17 @@
 
 
 import os
-import subprocess
 import sys
 from datetime import datetime
 import shutil
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common_tools'))
+from batch_runner import run_batch, run_script, report
+
+# Number of files inverted at the same time. The optimizer already uses every core
+# ("workers": -1), so files are run one after another in this interpreter by default.
+processes = 1
+
 def convert_to_long_path(path):
     # Add Windows long path prefix if necessary
     if sys.platform == "win32" and not path.startswith("\\\\?\\"):
@@ -46,16 +52,18 @@ def run_inversion(input_dir, output_dir, timestamp, script_path):
     if not os.path.exists(output_best_model_dir):
         os.makedirs(output_best_model_dir)
     
-    # Loop through files in the input directory
+    # Collect the files in the input directory
+    tasks = []
     for filename in os.listdir(input_dir):
         if filename.endswith(".txt"):
             input_file = os.path.join(input_dir, filename)
             input_file = convert_to_long_path(input_file)
-            output_file = os.path.join(output_dir, f"{os.path.splitext(filename)[0]}_{timestamp}.txt")
-            
-            # Run the inversion script for each file
-            subprocess.run(['python', convert_to_long_path(script_path), input_file, output_dir, 
-                            output_best_model_res_dir, output_best_model_dir, output_models_jpg_dir])
+            tasks.append((convert_to_long_path(script_path), (input_file, output_dir,
+                          output_best_model_res_dir, output_best_model_dir, output_models_jpg_dir)))
+
+    # Run the inversion script for each file without starting a new interpreter
+    results = run_batch(run_script, tasks, processes, desc="Inversion")
+    return report(results)
 
 def process_directories(directories):
     # Get the current script directory
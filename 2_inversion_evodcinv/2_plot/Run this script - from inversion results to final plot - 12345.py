@@ -10,7 +10,14 @@
 
 import os
 import sys
-import subprocess
+import importlib
+
+# Get the directory of the current script
+current_script_directory = os.path.dirname(os.path.abspath(__file__))
+
+sys.path.insert(0, current_script_directory)
+sys.path.insert(0, os.path.join(current_script_directory, '..', '..', 'common_tools'))
+from batch_runner import run_task, run_script
 
 # Update the paths as required:
 # Path for inversion model results
@@ -22,59 +29,54 @@ inversion_path = r"I:\diff_dis_to_cavity\RESULTS_LHY_20241201_whole_line1_rollin
 # Modification 3: In "5-画简单插值图.py", decide on the aspect ratio for the plot.
 # Modification 4: In "5-画简单插值图.py", confirm if the x-axis should be inverted.
 
-# Get the directory of the current script
-current_script_directory = os.path.dirname(os.path.abspath(__file__))
+# The first three steps are imported once and called directly; their return values
+# are the paths passed on to the next step
+step1 = importlib.import_module("1_depth_conversion")
+step2 = importlib.import_module("2_add_x_location")
+step3 = importlib.import_module("3_merge_to_one_txt")
 
-# Paths to the dependent scripts
-script1 = os.path.join(current_script_directory, "1_depth_conversion.py")
-script2 = os.path.join(current_script_directory, "2_add_x_location.py")
-script3 = os.path.join(current_script_directory, "3_merge_to_one_txt.py")
+# The plotting scripts read their input from the command line at module level
 script4 = os.path.join(current_script_directory, "4_plot_scatter.py")
 script5 = os.path.join(current_script_directory, "5_plot_interpolation.py")
 
 
+def add_x_location(input_folder):
+    output_folder = input_folder + "_txts"
+    files_info = step2.find_txt_files_and_extract_ds_info(input_folder)
+    step2.process_and_output_files(files_info, output_folder)
+    return output_folder
+
+
+def merge_to_one_txt(input_folder):
+    return step3.merge_txt_files(input_folder, input_folder + '_onetxt')
+
+
+def run_step(description, func, *args):
+    """Run one step of the workflow and stop at the first failure."""
+    result = run_task(func, args, name=description)
+    if not result["ok"]:
+        print(f"Error occurred while running the {description}:\n{result['error']}")
+        sys.exit(1)
+    print(f"{description.capitalize()} finished in {result['elapsed']:.2f}s")
+    return result["value"]
+
+
 # Execute the first script
-try:
-    result1 = subprocess.run(['python', script1, inversion_path], check=True, capture_output=True, text=True, encoding='utf-8')
-    output_folder_1 = result1.stdout.strip()
-    print(f"First script output:\n{output_folder_1}")
-except subprocess.CalledProcessError as e:
-    print(f"Error occurred while running the first script:\n{e.stderr}")
-    sys.exit(1)
+output_folder_1 = run_step("first script", step1.process_files, inversion_path)
+print(f"First script output:\n{output_folder_1}")
 
 # Execute the second script
-try:
-    result2 = subprocess.run(['python', script2, output_folder_1], check=True, capture_output=True, text=True, encoding='utf-8')
-    print(f"Second script raw output:\n{result2.stdout}")
-    output_folder_2 = result2.stdout.strip().split("\n")[-1].strip()
-    print(f"Second script output:\n{output_folder_2}")
-except subprocess.CalledProcessError as e:
-    print(f"Error occurred while running the second script:\n{e.stderr}")
-    sys.exit(1)
+output_folder_2 = run_step("second script", add_x_location, output_folder_1)
+print(f"Second script output:\n{output_folder_2}")
 
 # Execute the third script
-try:
-    result3 = subprocess.run(['python', script3, output_folder_2], check=True, capture_output=True, text=True, encoding='utf-8')
-    output_file = result3.stdout.strip()
-    print(f"Third script output:\n{output_file}")
-except subprocess.CalledProcessError as e:
-    print(f"Error occurred while running the third script:\n{e.stderr}")
-    sys.exit(1)
+output_file = run_step("third script", merge_to_one_txt, output_folder_2)
+print(f"Third script output:\n{output_file}")
 
 # Execute the fourth script
-try:
-    result4 = subprocess.run(['python', script4, output_file], check=True, capture_output=True, text=True, encoding='utf-8')
-    print(f"Fourth script output:\n{result4.stdout}")
-except subprocess.CalledProcessError as e:
-    print(f"Error occurred while running the fourth script:\n{e.stderr}")
-    sys.exit(1)
+run_step("fourth script", run_script, script4, (output_file,))
 
 # Execute the fifth script
-try:
-    result5 = subprocess.run(['python', script5, output_file], check=True, capture_output=True, text=True, encoding='utf-8')
-    print(f"Fifth script output:\n{result5.stdout}")
-except subprocess.CalledProcessError as e:
-    print(f"Error occurred while running the fifth script:\n{e.stderr}")
-    sys.exit(1)
+run_step("fifth script", run_script, script5, (output_file,))
 
 print("All scripts executed successfully.")
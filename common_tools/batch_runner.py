@@ -0,0 +1,157 @@
+# -*- encoding: utf-8 -*-
+'''
+@File        :   batch_runner.py
+@Time        :   2026/10/18 15:12:40
+@Author      :   Haiyang Liao
+@Affiliation :   Nanjing University (NJU)
+@Contact     :   haiyangliao@smail.nju.edu.cn
+@Description :   In-process batch execution. Per-file functions are imported once and run
+                 over a process pool instead of starting a new `python script.py ...`
+                 interpreter per file. Every task returns a result dict (success, return
+                 value, error, optional captured output, run time), so batch scripts no
+                 longer have to scrape stdout to find out what happened.
+'''
+
+
+import io
+import os
+import sys
+import time
+import runpy
+import traceback
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tqdm import tqdm
+
+
+def run_task(func, args=(), name=None, capture_output=False):
+    """
+    Run one task and describe its outcome instead of raising.
+
+    Args:
+        func (callable): Function to run.
+        args (tuple): Positional arguments for `func`.
+        name (str): Label of the task in the result, defaults to the first argument.
+        capture_output (bool): Collect everything the task prints into `output`
+                               instead of printing it.
+
+    Returns:
+        dict: `name`, `ok` (bool), `value` (return value of `func`), `error`
+              (traceback text or None), `output` (captured text or None) and
+              `elapsed` (seconds).
+    """
+    if name is None:
+        name = str(args[0]) if args else getattr(func, "__name__", "task")
+    buffer = io.StringIO() if capture_output else None
+    start = time.time()
+    value, error = None, None
+    try:
+        with contextlib.redirect_stdout(buffer) if capture_output else contextlib.nullcontext():
+            value = func(*args)
+    except BaseException as e:
+        if isinstance(e, KeyboardInterrupt):
+            raise
+        error = traceback.format_exc()
+    return {
+        "name": name,
+        "ok": error is None,
+        "value": value,
+        "error": error,
+        "output": buffer.getvalue() if capture_output else None,
+        "elapsed": time.time() - start,
+    }
+
+
+def run_script(script_path, args=(), cwd=None):
+    """
+    Run a command-line script inside the current interpreter, as `python script_path *args` would.
+
+    The script's folder is put in front of `sys.path` and `sys.argv` is set for the
+    duration of the run, so scripts that read `sys.argv` at module level or import
+    modules from their own folder work unchanged. Modules already imported (numpy,
+    segyio, obspy, matplotlib, ...) are reused instead of being imported again.
+
+    Args:
+        script_path (str): Path to the script.
+        args (tuple): Command-line arguments (converted with `str`).
+        cwd (str): Working directory for the run, defaults to the current one.
+
+    Returns:
+        None
+
+    Raises:
+        RuntimeError: If the script exits with a non-zero status.
+    """
+    script_path = os.path.abspath(script_path)
+    old_argv, old_path, old_cwd = sys.argv, list(sys.path), os.getcwd()
+    sys.argv = [script_path] + [str(a) for a in args]
+    sys.path.insert(0, os.path.dirname(script_path))
+    if cwd:
+        os.chdir(cwd)
+    try:
+        runpy.run_path(script_path, run_name="__main__")
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            raise RuntimeError(f"{os.path.basename(script_path)} exited with status {e.code}") from None
+    finally:
+        sys.argv = old_argv
+        sys.path[:] = old_path
+        os.chdir(old_cwd)
+
+
+def run_batch(func, tasks, processes=None, desc="Processing", capture_output=False):
+    """
+    Run `func` over a list of argument tuples on a pool of worker processes.
+
+    `func` must be a module-level function so it can be sent to the workers, and
+    scripts using a pool must start it under `if __name__ == "__main__":`.
+
+    Args:
+        func (callable): Per-task function, e.g. the per-file function of a script.
+        tasks (list): One tuple of positional arguments per task.
+        processes (int): Number of worker processes. Defaults to the number of CPU
+                         cores; 1 runs every task in this process without a pool.
+        desc (str): Label of the progress bar.
+        capture_output (bool): Keep what each task prints in its result instead of
+                               printing it, see `run_task`.
+
+    Returns:
+        list: One result dict per task (see `run_task`), in the order of `tasks`.
+    """
+    tasks = [args if isinstance(args, tuple) else (args,) for args in tasks]
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, len(tasks)))
+
+    results = [None] * len(tasks)
+    with tqdm(total=len(tasks), desc=desc, unit="task") as progress:
+        if processes == 1:
+            for i, args in enumerate(tasks):
+                results[i] = run_task(func, args, capture_output=capture_output)
+                progress.update()
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                futures = {executor.submit(run_task, func, args, None, capture_output): i
+                           for i, args in enumerate(tasks)}
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+                    progress.update()
+    return results
+
+
+def report(results):
+    """
+    Print a summary of a batch run and the errors of the failed tasks.
+
+    Args:
+        results (list): Result dicts from `run_batch`.
+
+    Returns:
+        list: Names of the failed tasks.
+    """
+    failed = [r for r in results if not r["ok"]]
+    total_time = sum(r["elapsed"] for r in results)
+    print(f"{len(results) - len(failed)} of {len(results)} tasks succeeded ({total_time:.2f}s of task time).")
+    for r in failed:
+        print(f"\nFailed: {r['name']}\n{r['error']}")
+    return [r["name"] for r in failed]
@@ -0,0 +1,214 @@
+# -*- encoding: utf-8 -*-
+'''
+@File        :   design_cache.py
+@Time        :   2026/10/18 22:58:14
+@Author      :   Haiyang Liao
+@Affiliation :   Nanjing University (NJU)
+@Contact     :   haiyangliao@smail.nju.edu.cn
+@Description :   Shared cache of filter, taper, kernel and mask designs. Every design is built
+                 once per (type, parameters, length, dtype) and kept in an LRU cache; arrays
+                 are returned read-only so that callers cannot change a shared design, and SOS
+                 sections are returned as small copies because scipy's sosfilt needs them
+                 writable.
+'''
+
+
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from scipy import signal
+from scipy.ndimage import gaussian_filter
+
+CACHE_SIZE = 256           # Designs kept; the least recently used one is dropped first
+
+_BUILDERS = {}
+_designs = OrderedDict()
+_stats = {"hits": 0, "misses": 0}
+_lock = threading.Lock()
+
+
+def register(kind):
+    """Decorator adding a builder `builder(*params, length=..., dtype=...)` for a design type."""
+    def decorator(builder):
+        _BUILDERS[kind] = builder
+        return builder
+    return decorator
+
+
+def _freeze(value):
+    # Hashable form of a parameter; arrays are keyed by their digest, not their bytes
+    if isinstance(value, np.ndarray):
+        return ("ndarray", value.dtype.str, value.shape, hashlib.sha1(np.ascontiguousarray(value).tobytes()).hexdigest())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _read_only(design):
+    if isinstance(design, np.ndarray):
+        design.flags.writeable = False
+    elif isinstance(design, tuple):
+        for array in design:
+            _read_only(array)
+    return design
+
+
+def get_design(kind, params=(), length=None, dtype=np.float64):
+    """
+    Cached design of a registered type.
+
+    Args:
+        kind (str): Design type, e.g. "butter_ba" or "hanning".
+        params (tuple): Design parameters; arrays are allowed.
+        length (int or tuple): Length (or shape) of the design, if it has one.
+        dtype: dtype of the returned arrays.
+
+    Returns:
+        np.ndarray or tuple: Read-only array(s).
+    """
+    if kind not in _BUILDERS:
+        raise KeyError(f"Unknown design type '{kind}', expected one of {sorted(_BUILDERS)}.")
+    dtype = np.dtype(dtype)
+    key = (kind, _freeze(tuple(params)), _freeze(length), dtype.str)
+    with _lock:
+        design = _designs.get(key)
+        if design is not None:
+            _designs.move_to_end(key)
+            _stats["hits"] += 1
+            return design
+    # Built outside the lock: builders may draw other designs from the cache
+    design = _read_only(_BUILDERS[kind](*params, length=length, dtype=dtype))
+    with _lock:
+        _stats["misses"] += 1
+        _designs[key] = design
+        while len(_designs) > CACHE_SIZE:
+            _designs.popitem(last=False)
+    return design
+
+
+def cache_info():
+    """Hits, misses and number of cached designs."""
+    with _lock:
+        return dict(_stats, size=len(_designs))
+
+
+def clear_cache():
+    with _lock:
+        _designs.clear()
+        _stats.update(hits=0, misses=0)
+
+
+# ----------------------------------------------------------------------------------
+# Designs
+# ----------------------------------------------------------------------------------
+
+@register("butter_ba")
+def _butter_ba(order, wn, btype, length=None, dtype=np.float64):
+    b, a = signal.butter(order, wn, btype)
+    return b.astype(dtype), a.astype(dtype)
+
+
+@register("butter_sos")
+def _butter_sos(order, wn, btype, length=None, dtype=np.float64):
+    return signal.butter(order, wn, btype, output='sos').astype(dtype)
+
+
+@register("hanning")
+def _hanning(length, dtype=np.float64):
+    return (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(length) / (length - 1))).astype(dtype)
+
+
+@register("cosine_taper")
+def _cosine_taper(p, length, dtype=np.float64):
+    nw = int(p * length)
+    w = np.ones(length)
+    w[:nw] = 0.5 - 0.5 * np.cos(np.pi / nw * np.arange(nw)) if nw > 0 else 1.0
+    w[length - nw:] = 1.0 - w[:nw]
+    return w.astype(dtype)
+
+
+@register("whitening_taper")
+def _whitening_taper(f1, f2, f3, f4, dt, length, dtype=np.float64):
+    df = 1 / (length * dt)
+    d1, d2, d3, d4 = (int(round(freq / df)) for freq in (f1, f2, f3, f4))
+    tpr1 = hanning(int(2 * (d2 - d1) + 1))[:d2 - d1 + 1]
+    tpr2 = hanning(int(2 * (d4 - d3) + 1))[d4 - d3:]
+    if np.mod(length, 2) == 0.0:
+        tprp = np.hstack([np.zeros(d1), tpr1, np.ones(d3 - d2 - 1), tpr2, np.zeros(int(length / 2) - d4 - 1)])
+        tprf = np.hstack([0, np.flip(tprp[1:]), tprp])
+    else:
+        tprp = np.hstack([np.zeros(d1), tpr1, np.ones(d3 - d2 - 1), tpr2, np.zeros(int((length + 1) / 2) - d4 - 1)])
+        tprf = np.hstack([np.flip(tprp[1:]), tprp])
+    return tprf.astype(dtype)
+
+
+@register("sinc_kernel")
+def _sinc_kernel(nx, even, length, dtype=np.float64):
+    kx = np.arange(1, length + 1)
+    eps = 2.2204e-16
+    centre = (length + 2) / 2 if even else (length + 1) / 2
+    ktx = 1 / (2 * nx + 1) * np.sin(0.5 * (2 * nx + 1) * (kx - centre + eps) * ((2 * np.pi) / length)) / \
+        np.sin(0.5 * (kx - centre + eps) * ((2 * np.pi) / length))
+    return ktx.astype(dtype)
+
+
+@register("fk_polygon")
+def _fk_polygon(vmin, vmax, freq_min, freq_max, freqs, kx, length=None, dtype=np.float64):
+    f, k = np.abs(freqs)[:, np.newaxis], np.abs(kx)[np.newaxis, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        velocity = np.where(k == 0, np.inf, f / np.where(k == 0, 1, k))
+    mask = (vmin <= velocity) & (velocity <= vmax) & (freq_min <= f) & (f <= freq_max)
+    return mask.astype(dtype)
+
+
+@register("gaussian_decay")
+def _gaussian_decay(mask, sigma, length=None, dtype=np.float64):
+    return np.clip(gaussian_filter(mask.astype(float), sigma=sigma), 0, 1).astype(dtype)
+
+
+# ----------------------------------------------------------------------------------
+# Shortcuts
+# ----------------------------------------------------------------------------------
+
+def butter_ba(order, wn, btype='bandpass'):
+    """Read-only (b, a) of a digital Butterworth filter (`scipy.signal.butter`)."""
+    return get_design("butter_ba", (order, tuple(np.atleast_1d(wn).tolist()), btype))
+
+
+def butter_sos(order, wn, btype='bandpass'):
+    """SOS sections of a digital Butterworth filter, as a writable copy for `sosfilt`/`sosfiltfilt`."""
+    return get_design("butter_sos", (order, tuple(np.atleast_1d(wn).tolist()), btype)).copy()
+
+
+def hanning(n):
+    """Read-only Hann window of `n` samples, 0.5 - 0.5 cos(2 pi i / (n - 1))."""
+    return get_design("hanning", length=int(n))
+
+
+def cosine_taper(n, p):
+    """Read-only weights of a cosine taper over the first and last `int(p * n)` samples."""
+    return get_design("cosine_taper", (p,), length=int(n))
+
+
+def whitening_taper(f1, f2, f3, f4, dt, n):
+    """Read-only two-sided whitening taper (passband f2-f3, ramps f1-f2 and f3-f4) in fftshift order."""
+    return get_design("whitening_taper", (f1, f2, f3, f4, dt), length=int(n))
+
+
+def sinc_kernel(nx, n, even):
+    """Read-only frequency-domain smoothing kernel of half-width `nx` for a padded length `n`."""
+    return get_design("sinc_kernel", (int(nx), bool(even)), length=int(n))
+
+
+def fk_polygon_mask(vmin, vmax, freq_min, freq_max, freqs, kx):
+    """Read-only (nf, nk) F-K mask: 1 where vmin <= |f / k| <= vmax and freq_min <= |f| <= freq_max."""
+    return get_design("fk_polygon", (vmin, vmax, freq_min, freq_max, np.asarray(freqs), np.asarray(kx)),
+                      length=(len(freqs), len(kx)))
+
+
+def gaussian_decay(mask, sigma):
+    """Read-only mask smoothed with a Gaussian of standard deviation `sigma` and clipped to [0, 1]."""
+    return get_design("gaussian_decay", (np.asarray(mask), sigma), length=np.shape(mask))
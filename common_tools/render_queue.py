@@ -0,0 +1,183 @@
+# -*- encoding: utf-8 -*-
+'''
+@File        :   render_queue.py
+@Time        :   2026/10/18 21:41:07
+@Author      :   Haiyang Liao
+@Affiliation :   Nanjing University (NJU)
+@Contact     :   haiyangliao@smail.nju.edu.cn
+@Description :   Deferred figure rendering. Processing scripts only write the arrays of each
+                 figure to a spool folder; the figures are drawn afterwards (or on another
+                 machine) by a pool of worker processes, each of which keeps one figure per
+                 renderer and size and clears it between jobs instead of building a new one.
+
+Usage:
+    python render_queue.py <spool_dir> [full|preview] [processes]
+'''
+
+
+import os
+import sys
+import json
+import uuid
+import importlib
+import numpy as np
+from batch_runner import report, run_batch
+
+RENDER_MODES = ("full", "preview", "none")
+PREVIEW_DPI = 100          # DPI of every figure in "preview" mode
+MANIFEST = "jobs.jsonl"    # One JSON line per queued figure; its arrays are in <id>.npz
+
+_figures = {}              # Figure templates of this worker, keyed by (renderer, figsize)
+_fonts = set()             # Font files already registered in this worker
+
+
+class RenderQueue:
+    """
+    Spool of figures waiting to be rendered.
+
+    A renderer is a module-level function `render(fig, data, **params)` that draws on
+    an empty matplotlib Figure; `data` is a dict of the arrays given to `submit`.
+    Renderers are named as "module:function" and imported in the workers from
+    `search_path`, so the processing script itself never imports matplotlib.
+
+    Modes:
+        full       figures are rendered at their own DPI
+        preview    figures are rendered at PREVIEW_DPI
+        none       nothing is queued or rendered
+    """
+
+    def __init__(self, spool_dir, mode="full", rc=None, fonts=()):
+        """
+        Args:
+            spool_dir (str): Folder of the queued jobs.
+            mode (str): One of RENDER_MODES.
+            rc (dict): matplotlib rcParams applied to every figure of this queue.
+            fonts (tuple): Font files registered in the workers before rendering.
+        """
+        if mode not in RENDER_MODES:
+            raise ValueError(f"Unknown render mode '{mode}', expected one of {RENDER_MODES}.")
+        self.spool_dir = spool_dir
+        self.mode = mode
+        self.rc = dict(rc or {})
+        self.fonts = list(fonts)
+        if mode != "none":
+            os.makedirs(spool_dir, exist_ok=True)
+
+    def submit(self, renderer, output_path, search_path, figsize, dpi=100, params=None, **data):
+        """
+        Queue one figure. Its arrays are written to the spool right away.
+
+        Args:
+            renderer (str): "module:function" of the renderer.
+            output_path (str): Image file to write.
+            search_path (str): Folder the renderer module is imported from.
+            figsize (tuple): Figure size in inches.
+            dpi (int): DPI of the image in "full" mode.
+            params (dict): JSON-serializable keyword arguments of the renderer.
+            **data: Arrays passed to the renderer.
+
+        Returns:
+            str: Job id, or None in "none" mode.
+        """
+        if self.mode == "none":
+            return None
+        job_id = uuid.uuid4().hex
+        np.savez(os.path.join(self.spool_dir, job_id + ".npz"), **data)
+        job = {"id": job_id, "renderer": renderer, "output": os.path.abspath(output_path),
+               "search_path": os.path.abspath(search_path), "figsize": list(figsize), "dpi": dpi,
+               "params": params or {}, "rc": self.rc, "fonts": self.fonts}
+        with open(os.path.join(self.spool_dir, MANIFEST), "a", encoding="utf-8") as manifest:
+            manifest.write(json.dumps(job) + "\n")
+        return job_id
+
+    def render(self, processes=None):
+        """Render every queued figure, see `render_spool`."""
+        if self.mode == "none":
+            return []
+        return render_spool(self.spool_dir, self.mode, processes)
+
+
+def pending_jobs(spool_dir):
+    """Jobs of a spool folder that have not been rendered yet."""
+    manifest_path = os.path.join(spool_dir, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return []
+    with open(manifest_path, "r", encoding="utf-8") as manifest:
+        jobs = [json.loads(line) for line in manifest if line.strip()]
+    return [job for job in jobs if os.path.exists(os.path.join(spool_dir, job["id"] + ".npz"))]
+
+
+def _template(key, figsize):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = _figures.get(key)
+    if fig is None:
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        _figures[key] = fig
+    else:
+        fig.clf()
+    return fig
+
+
+def _render_job(output_path, job, spool_dir, mode):
+    import matplotlib
+    from matplotlib import font_manager
+
+    for font in set(job["fonts"]) - _fonts:
+        font_manager.fontManager.addfont(font)
+        _fonts.add(font)
+    if job["search_path"] not in sys.path:
+        sys.path.insert(0, job["search_path"])
+    module_name, function_name = job["renderer"].split(":")
+    render = getattr(importlib.import_module(module_name), function_name)
+
+    data_path = os.path.join(spool_dir, job["id"] + ".npz")
+    with np.load(data_path) as npz:
+        data = {name: npz[name] for name in npz.files}
+    with matplotlib.rc_context(job["rc"]):
+        fig = _template((job["renderer"], tuple(job["figsize"])), tuple(job["figsize"]))
+        render(fig, data, **job["params"])
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        fig.savefig(output_path, dpi=PREVIEW_DPI if mode == "preview" else job["dpi"])
+    os.remove(data_path)
+    return output_path
+
+
+def render_spool(spool_dir, mode="full", processes=None):
+    """
+    Render the pending figures of a spool folder on a pool of worker processes.
+
+    Rendered jobs are removed from the spool; failed ones stay and are retried by
+    the next call.
+
+    Args:
+        spool_dir (str): Folder written by a `RenderQueue`.
+        mode (str): "full" or "preview".
+        processes (int): Worker processes; all cores if None, 1 renders in-process.
+
+    Returns:
+        list: One result dict per job (see `batch_runner.run_task`).
+    """
+    jobs = pending_jobs(spool_dir)
+    if not jobs or mode == "none":
+        return []
+    results = run_batch(_render_job, [(job["output"], job, spool_dir, mode) for job in jobs], processes,
+                        desc="Rendering figures")
+
+    remaining = pending_jobs(spool_dir)
+    with open(os.path.join(spool_dir, MANIFEST), "w", encoding="utf-8") as manifest:
+        for job in remaining:
+            manifest.write(json.dumps(job) + "\n")
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    mode = sys.argv[2] if len(sys.argv) > 2 else "full"
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    failed = report(render_spool(sys.argv[1], mode, processes))
+    sys.exit(1 if failed else 0)
@@ -7,84 +7,46 @@
 @Contact     :   haiyangliao@smail.nju.edu.cn
 '''
 
-import sys
 import os
-import numpy as np
-import obspy
-import shutil
-import threading
+import time
 import multiprocessing  # To determine the number of available CPU cores
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from sac_writer import convert_dat_to_sac
 
 # Input directory
 input_dir = r"F:\diff_distance_to_cavity\noise_data\raw_data"
 # Output directory
 output_dir = r"F:\diff_distance_to_cavity\noise_data\processed_sac"
 
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
 
-# Dynamically determine the number of threads based on CPU cores
-num_threads = multiprocessing.cpu_count()  # Number of available CPU cores
-file_list = os.listdir(input_dir)
-total_files = len(file_list)
+def process_file(file_name):
+    try:
+        convert_dat_to_sac(os.path.join(input_dir, file_name), output_dir)
+        return file_name, None
+    except (ValueError, FileNotFoundError) as e:
+        return file_name, e
 
-# Automatically calculate the number of files each thread should process
-files_per_thread = max(1, total_files // num_threads)  # Ensure at least 1 file per thread
 
-def process_files(file_list):
-    for file_name in file_list:
-        try:
-            input_file_path = os.path.join(input_dir, file_name)
-            with open(input_file_path, 'rb') as f:
-                raw_data = np.fromfile(f, dtype=np.float32)
-                header = raw_data[:64]  # File header
-                waveform_data = raw_data[64:]  # Signal data
-                sampling_rate = header[10]  # Sampling rate
-                num_channels = int(header[16])  # Number of channels
-                samples_per_channel = int(header[10] * header[17])  # Samples per channel
-                
-                # Reshape waveform data into a 2D array: [num_channels, samples_per_channel]
-                reshaped_data = waveform_data.reshape(samples_per_channel, num_channels).T
-                
-                # Define output path for the current file
-                file_output_dir = os.path.join(output_dir, file_name[:-4])  # Directory per file
-                if not os.path.exists(file_output_dir):
-                    os.makedirs(file_output_dir)
-                else:
-                    shutil.rmtree(file_output_dir)
-                    os.makedirs(file_output_dir)
-                
-                # Process each channel and save as SAC file
-                for channel_idx in range(num_channels):
-                    channel_data = reshaped_data[channel_idx, :]
-                    channel_number = f"{channel_idx + 1:04}"  # Format as 4-digit number
-                    sac_filename = f"{file_name[:19]}{file_name[-8:-4]}{channel_number}.sac"
-                    sac_file_path = os.path.join(file_output_dir, sac_filename)
-                    
-                    trace = obspy.Trace()
-                    trace.stats.network = "NJU"
-                    trace.stats.station = "STA"
-                    trace.stats.channel = "BHZ"
-                    trace.stats.sampling_rate = sampling_rate
-                    trace.stats.starttime = obspy.UTCDateTime(
-                        file_name[0:10] + 'T' + file_name[11:13] + ':' + file_name[14:16] + ':' + file_name[17:19]
-                    )
-                    trace.data = channel_data
-                    trace.write(sac_file_path, format='sac')
-            print(f"Processed: {file_name}")
-        except (ValueError, FileNotFoundError) as e:
-            print(f"Error processing {file_name}: {e}")
-            continue
+def main():
+    start_time = time.time()
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
 
-# Divide file list among threads
-threads = []
+    # One process per CPU core, each converting whole files
+    num_workers = multiprocessing.cpu_count()
+    file_list = sorted(os.listdir(input_dir))
 
-for i in range(0, total_files, files_per_thread):
-    files_chunk = file_list[i:i + files_per_thread]
-    t = threading.Thread(target=process_files, args=(files_chunk,))
-    threads.append(t)
-    t.start()
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = [executor.submit(process_file, file_name) for file_name in file_list]
+        for future in as_completed(futures):
+            file_name, error = future.result()
+            if error is None:
+                print(f"Processed: {file_name}")
+            else:
+                print(f"Error processing {file_name}: {error}")
 
-# Wait for all threads to complete
-for thread in threads:
-    thread.join()
+    print(f"Total time taken: {time.time() - start_time:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
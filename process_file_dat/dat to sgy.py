@@ -9,11 +9,14 @@
 
 
 import os
-import numpy as np
-import segyio
-from concurrent.futures import ThreadPoolExecutor
+import sys
+from concurrent.futures import ProcessPoolExecutor
 import time
 from tqdm import tqdm
+from dat_reader import DatFile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'process_file_sgy'))
+from sgy_block_io import write_sgy
 
 # Define input directory list
 input_paths = [
@@ -24,37 +27,17 @@ output_folder_path = r"K:\diff_distance_cavity\1_new"
 
 def process_file(input_path, dat):
     output_path = os.path.join(output_folder_path, os.path.basename(input_path) + '_sgy')
-    if not os.path.exists(output_path):
-        os.makedirs(output_path)
+    os.makedirs(output_path, exist_ok=True)
 
     try:
         dat_path = os.path.join(input_path, dat)
-        with open(dat_path, 'rb') as f:
-            A = np.fromfile(f, dtype=np.float32)
-            C = A[:64]
-            B = np.ascontiguousarray(A[64:])
-            fs = C[10]
-
-            N = int(C[16])
-            length = int(fs * C[17])
-
-            DD = B.reshape(int(length), N)
-            D = np.ascontiguousarray(DD.T)
-
+        with DatFile(dat_path) as dat_file:
+            fs = dat_file.sampling_rate
             save_path = os.path.join(output_path, dat[:-4] + '.sgy')
 
-            spec = segyio.spec()
-            spec.format = 1
-            spec.tracecount = N
-            spec.samples = np.arange(length) / (1 / fs * 1000 / 4)
-
-            with segyio.create(save_path, spec) as sgy:
-                for i in range(N):
-                    sgy.trace[i] = D[i]
-                    sgy.header[i].update({
-                        segyio.TraceField.TraceNumber: i + 1,
-                        segyio.TraceField.TRACE_SAMPLE_INTERVAL: int(1e6 / fs)
-                    })
+            # Sample interval in microseconds, i.e. 1000 / fs ms between samples
+            write_sgy(save_path, dat_file.channels(), int(round(1e6 / fs)),
+                      text_lines={1: f"DAS DATA CONVERTED FROM {dat}", 2: f"SAMPLING RATE {fs:g} HZ"})
         return True
     except Exception as e:
         print(f"Error processing {dat}: {str(e)}")
@@ -64,7 +47,7 @@ def main():
     start_time = time.time()
     cpu_cores = os.cpu_count()
     max_workers = cpu_cores if cpu_cores else 4
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
         futures = []
         progress = tqdm(total=sum(len(os.listdir(path)) for path in input_paths), desc="Total Progress", unit="file")
 
@@ -0,0 +1,131 @@
+# -*- encoding: utf-8 -*-
+'''
+@File        :   dat_reader.py
+@Time        :   2026/10/18 09:12:40
+@Author      :   Haiyang Liao
+@Affiliation :   Nanjing University (NJU)
+@Contact     :   haiyangliao@smail.nju.edu.cn
+@Description :   Memory-mapped reader for the raw DAS `.dat` files. The waveform block is
+                 exposed as an `np.memmap`, so only the channels and time window that are
+                 actually sliced are copied into RAM.
+'''
+
+
+import os
+import numpy as np
+
+HEADER_LENGTH = 64  # Number of float32 values in the file header
+HEADER_BYTES = HEADER_LENGTH * 4
+
+
+def read_dat_header(dat_path):
+    """
+    Read the 64-float header of a `.dat` file.
+
+    Args:
+        dat_path (str): Path to the `.dat` file.
+
+    Returns:
+        dict: Sampling rate (Hz), number of channels, duration (s) and samples per channel.
+    """
+    header = np.fromfile(dat_path, dtype=np.float32, count=HEADER_LENGTH)
+    if len(header) < HEADER_LENGTH:
+        raise ValueError(f"File is shorter than the {HEADER_BYTES}-byte header: {dat_path}")
+
+    return {
+        "sampling_rate": float(header[10]),
+        "num_channels": int(header[16]),
+        "duration": float(header[17]),
+        "samples_per_channel": int(header[10] * header[17]),
+    }
+
+
+class DatFile:
+    """
+    Memory-mapped view of a raw DAS `.dat` file.
+
+    The samples are stored time-major on disk, so `data` has the shape
+    (samples_per_channel, num_channels). Nothing is read until it is sliced.
+
+    Args:
+        dat_path (str): Path to the `.dat` file.
+    """
+
+    def __init__(self, dat_path):
+        self.path = dat_path
+        self.file_name = os.path.basename(dat_path)
+
+        header = read_dat_header(dat_path)
+        self.sampling_rate = header["sampling_rate"]
+        self.num_channels = header["num_channels"]
+        self.duration = header["duration"]
+        self.samples_per_channel = header["samples_per_channel"]
+
+        # Raises ValueError when the file is shorter than the header promises
+        self.data = np.memmap(dat_path, dtype=np.float32, mode="r", offset=HEADER_BYTES,
+                              shape=(self.samples_per_channel, self.num_channels))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Drop the memory map; it is unmapped once no views of it remain."""
+        self.data = None
+
+    def time_to_sample(self, time_s):
+        """Convert a time in seconds from the file start to a sample index."""
+        return int(round(time_s * self.sampling_rate))
+
+    def channels(self, start_channel=1, end_channel=None, start_time=None, end_time=None):
+        """
+        Zero-copy view of a channel range and time window.
+
+        Args:
+            start_channel (int): First channel (1-based, inclusive).
+            end_channel (int): Last channel (1-based, inclusive). Defaults to the last channel.
+            start_time (float): Window start in seconds from the file start.
+            end_time (float): Window end in seconds from the file start.
+
+        Returns:
+            np.ndarray: View of shape (n_channels, n_samples) backed by the memory map.
+        """
+        if end_channel is None:
+            end_channel = self.num_channels
+        if start_channel < 1 or end_channel > self.num_channels or start_channel > end_channel:
+            raise ValueError(f"Invalid channel range {start_channel}-{end_channel}. "
+                             f"File contains {self.num_channels} channels.")
+
+        start_sample = 0 if start_time is None else self.time_to_sample(start_time)
+        end_sample = self.samples_per_channel if end_time is None else self.time_to_sample(end_time)
+        if start_sample < 0 or end_sample > self.samples_per_channel or start_sample >= end_sample:
+            raise ValueError(f"Invalid time range {start_time}-{end_time} s. "
+                             f"File contains {self.duration} seconds.")
+
+        return self.data[start_sample:end_sample, start_channel - 1:end_channel].T
+
+    def read(self, start_channel=1, end_channel=None, start_time=None, end_time=None):
+        """
+        Copy a channel range and time window into a contiguous array.
+
+        Only the requested block is copied; the arguments are the same as for `channels`.
+
+        Returns:
+            np.ndarray: float32 array of shape (n_channels, n_samples).
+        """
+        return np.ascontiguousarray(self.channels(start_channel, end_channel, start_time, end_time))
+
+
+def list_dat_files(input_dir):
+    """
+    List the `.dat` files in a directory, sorted by name (i.e. by acquisition time).
+
+    Args:
+        input_dir (str): Directory with `.dat` files.
+
+    Returns:
+        list: Full paths of the `.dat` files.
+    """
+    return [os.path.join(input_dir, f) for f in sorted(os.listdir(input_dir)) if f.endswith(".dat")]
@@ -0,0 +1,167 @@
+# -*- encoding: utf-8 -*-
+'''
+@File        :   sac_writer.py
+@Time        :   2026/10/18 10:05:12
+@Author      :   Haiyang Liao
+@Affiliation :   Nanjing University (NJU)
+@Contact     :   haiyangliao@smail.nju.edu.cn
+@Description :   Bulk SAC writer for `.dat` conversion. The 632-byte SAC headers of a whole
+                 channel block are built as one numpy array and written together with the
+                 float32 payloads, without creating an ObsPy Trace per channel.
+'''
+
+
+import os
+import shutil
+from datetime import datetime
+import numpy as np
+from dat_reader import DatFile
+
+# Binary SAC header: 70 floats, 40 ints and 192 bytes of strings (little-endian, version 6)
+SAC_HEADER_DTYPE = np.dtype([("floats", "<f4", 70), ("ints", "<i4", 40), ("strings", "S192")])
+SAC_UNDEFINED = -12345
+
+# Float header indices
+DELTA, DEPMIN, DEPMAX, SCALE, B, E, DEPMEN = 0, 1, 2, 3, 5, 6, 56
+# Int header indices
+NZYEAR, NZJDAY, NZHOUR, NZMIN, NZSEC, NZMSEC, NVHDR, NPTS = 0, 1, 2, 3, 4, 5, 6, 9
+IFTYPE, IZTYPE, LEVEN, LPSPOL, LOVROK, LCALDA = 15, 17, 35, 36, 37, 38
+# String header slots (8 bytes each, kevnm takes two)
+KSTNM, KCMPNM, KNETWK = 0, 20, 21
+
+ITIME = 1  # iftype: time series file
+IB = 9     # iztype: reference time is the begin time
+
+MAX_BLOCK_BYTES = 512 * 1024 ** 2  # Memory budget for one channel block
+
+
+def parse_starttime(file_name):
+    """
+    Parse the start time from a `.dat` file name such as `2024-01-24-11-17-19-out.dat`.
+
+    Args:
+        file_name (str): Base name of the `.dat` file.
+
+    Returns:
+        datetime: Start time of the recording.
+    """
+    return datetime.strptime(file_name[0:19], "%Y-%m-%d-%H-%M-%S")
+
+
+def sac_header_template(sampling_rate, npts, starttime, network="NJU", station="STA", channel="BHZ"):
+    """
+    Build the SAC header shared by all channels of one file.
+
+    The fields match what `obspy.Trace.write(..., format='sac')` writes for a trace
+    without SAC-specific stats.
+
+    Args:
+        sampling_rate (float): Sampling rate in Hz.
+        npts (int): Number of samples per trace.
+        starttime (datetime): Start time of the traces.
+        network (str): Network code (knetwk).
+        station (str): Station code (kstnm).
+        channel (str): Channel code (kcmpnm).
+
+    Returns:
+        np.ndarray: Zero-dimensional array of `SAC_HEADER_DTYPE`.
+    """
+    header = np.zeros((), dtype=SAC_HEADER_DTYPE)
+    header["floats"][:] = SAC_UNDEFINED
+    header["ints"][:] = SAC_UNDEFINED
+
+    delta = np.float32(1.0 / np.float32(sampling_rate))
+    header["floats"][DELTA] = delta
+    header["floats"][SCALE] = 1.0
+    header["floats"][B] = 0.0
+    header["floats"][E] = delta * (npts - 1)
+
+    header["ints"][[NZYEAR, NZJDAY, NZHOUR, NZMIN, NZSEC, NZMSEC]] = [
+        starttime.year, starttime.timetuple().tm_yday, starttime.hour,
+        starttime.minute, starttime.second, starttime.microsecond // 1000,
+    ]
+    header["ints"][NVHDR] = 6
+    header["ints"][NPTS] = npts
+    header["ints"][IFTYPE] = ITIME
+    header["ints"][IZTYPE] = IB
+    header["ints"][[LEVEN, LPSPOL, LOVROK, LCALDA]] = [1, 1, 1, 0]
+
+    slots = [b"-12345  "] * 24
+    slots[KSTNM] = station.encode().ljust(8)
+    slots[KCMPNM] = channel.encode().ljust(8)
+    slots[KNETWK] = network.encode().ljust(8)
+    header["strings"] = b"".join(slots)
+    return header
+
+
+def build_sac_headers(block, template):
+    """
+    Fill per-channel headers for a block of traces in one vectorized pass.
+
+    Args:
+        block (np.ndarray): float32 array of shape (n_channels, npts).
+        template (np.ndarray): Header from `sac_header_template`.
+
+    Returns:
+        np.ndarray: Array of `SAC_HEADER_DTYPE` with shape (n_channels,).
+    """
+    headers = np.repeat(template[np.newaxis], block.shape[0])
+    headers["floats"][:, DEPMIN] = block.min(axis=1)
+    headers["floats"][:, DEPMAX] = block.max(axis=1)
+    headers["floats"][:, DEPMEN] = block.mean(axis=1)
+    return headers
+
+
+def write_sac_block(block, headers, sac_paths):
+    """
+    Write one SAC file per row of `block`.
+
+    Args:
+        block (np.ndarray): C-contiguous float32 array of shape (n_channels, npts).
+        headers (np.ndarray): Headers from `build_sac_headers`.
+        sac_paths (list): Output path for every row.
+    """
+    for header, trace, sac_path in zip(headers, block, sac_paths):
+        with open(sac_path, "wb") as f:
+            f.write(header.tobytes())
+            f.write(trace.tobytes())
+
+
+def convert_dat_to_sac(dat_path, output_dir, max_block_bytes=MAX_BLOCK_BYTES):
+    """
+    Convert every channel of a `.dat` file to SAC files.
+
+    Files are written to `output_dir/<file name without .dat>/` and named
+    `{file_name[:19]}{file_name[-8:-4]}{channel:04}.sac`. Channels are copied out of the
+    memory map in blocks of at most `max_block_bytes`.
+
+    Args:
+        dat_path (str): Path to the `.dat` file.
+        output_dir (str): Root output directory.
+        max_block_bytes (int): Memory budget for one channel block.
+
+    Returns:
+        int: Number of SAC files written.
+    """
+    file_name = os.path.basename(dat_path)
+    file_output_dir = os.path.join(output_dir, file_name[:-4])
+    if os.path.exists(file_output_dir):
+        shutil.rmtree(file_output_dir)
+    os.makedirs(file_output_dir)
+
+    with DatFile(dat_path) as dat:
+        npts = dat.samples_per_channel
+        template = sac_header_template(dat.sampling_rate, npts, parse_starttime(file_name))
+        block_channels = max(1, int(max_block_bytes // max(1, npts * 4)))
+
+        for first in range(1, dat.num_channels + 1, block_channels):
+            last = min(first + block_channels - 1, dat.num_channels)
+            block = dat.read(first, last)
+            headers = build_sac_headers(block, template)
+            sac_paths = [
+                os.path.join(file_output_dir, f"{file_name[:19]}{file_name[-8:-4]}{channel:04}.sac")
+                for channel in range(first, last + 1)
+            ]
+            write_sac_block(block, headers, sac_paths)
+
+        return dat.num_channels
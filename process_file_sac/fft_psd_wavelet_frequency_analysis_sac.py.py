@@ -9,19 +9,23 @@
 
 
 import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 import pywt
 from scipy import signal
 from obspy import read
-from scipy.signal import welch, butter, sosfilt
+from scipy.signal import welch, sosfilt
 from scipy.interpolate import interp1d
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common_tools'))
+import design_cache
+
 def bandpass_filter(data, lowcut, highcut, fs, order=5):
     nyq = 0.5 * fs
     low = lowcut / nyq
     high = highcut / nyq
-    sos = butter(order, [low, high], analog=False, btype='band', output='sos')
+    sos = design_cache.butter_sos(order, [low, high], 'band')
     y = sosfilt(sos, data)
     return y
 
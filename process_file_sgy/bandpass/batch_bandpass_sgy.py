@@ -9,7 +9,11 @@
 
 
 import os
-import subprocess
+import sys
+from bandpass_sgy import process_sgy_file_with_obspy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common_tools'))
+from batch_runner import run_batch, report
 
 def find_sgy_files(folder_path):
     sgy_files = []
@@ -25,20 +29,22 @@ def create_output_folder(folder_path):
         os.makedirs(output_folder)
     return output_folder
 
-def call_bandpass_script(sgy_file, output_folder, lowcut, highcut, current_sample_rate):
-    script_path = r".\bandpass_sgy.py"
+def bandpass_file(sgy_file, output_folder, lowcut, highcut, current_sample_rate):
     output_file = os.path.join(output_folder, os.path.basename(sgy_file))
-    subprocess.call(['python', script_path, sgy_file, output_file, str(lowcut), str(highcut), str(current_sample_rate)])
+    process_sgy_file_with_obspy(sgy_file, output_file, lowcut, highcut, current_sample_rate)
+    return output_file
 
-def main(folder_path, lowcut, highcut, current_sample_rate):
+def main(folder_path, lowcut, highcut, current_sample_rate, processes=None):
     sgy_files = find_sgy_files(folder_path)
     output_folder = create_output_folder(folder_path)
-    for sgy_file in sgy_files:
-        call_bandpass_script(sgy_file, output_folder, lowcut, highcut, current_sample_rate)
+    tasks = [(sgy_file, output_folder, lowcut, highcut, current_sample_rate) for sgy_file in sgy_files]
+    results = run_batch(bandpass_file, tasks, processes, desc="Bandpass")
+    return report(results)
 
 if __name__ == "__main__":
     folder_path = r"I:\diff_dis_to_cavity\17-19_3hours_downsampled"
     lowcut = 0.5  # Low cut frequency in Hz
     highcut = 50  # High cut frequency in Hz
     current_sample_rate = 100  # Specify the current sample rate in Hz
-    main(folder_path, lowcut, highcut, current_sample_rate)
\ No newline at end of file
+    processes = None  # Number of worker processes (None = number of CPU cores)
+    main(folder_path, lowcut, highcut, current_sample_rate, processes)
\ No newline at end of file
@@ -9,7 +9,11 @@
 
 
 import os
-import subprocess
+import sys
+from downsample_sgy import process_sgy_file_with_obspy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common_tools'))
+from batch_runner import run_batch, report
 
 def find_sgy_files(folder_path):
     sgy_files = []
@@ -25,21 +29,25 @@ def create_output_folder(folder_path):
         os.makedirs(output_folder)
     return output_folder
 
-def call_downsample_script(sgy_file, output_folder, current_sample_rate, target_sample_rate):
-    script_path = r".\downsample_sgy.py"
+def downsample_file(sgy_file, output_folder, current_sample_rate, target_sample_rate):
     output_file = os.path.join(output_folder, os.path.basename(sgy_file))
-    
-    if current_sample_rate > target_sample_rate:
-        subprocess.call(['python', script_path, sgy_file, output_file, str(current_sample_rate), str(target_sample_rate)])
+    process_sgy_file_with_obspy(sgy_file, output_file, current_sample_rate, target_sample_rate)
+    return output_file
+
+def main(folder_path, current_sample_rate, target_sample_rate, processes=None):
+    if current_sample_rate <= target_sample_rate:
+        print(f"Nothing to do: current sample rate {current_sample_rate} Hz is not above {target_sample_rate} Hz.")
+        return []
 
-def main(folder_path, current_sample_rate, target_sample_rate):
     sgy_files = find_sgy_files(folder_path)
     output_folder = create_output_folder(folder_path)
-    for sgy_file in sgy_files:
-        call_downsample_script(sgy_file, output_folder, current_sample_rate, target_sample_rate)
+    tasks = [(sgy_file, output_folder, current_sample_rate, target_sample_rate) for sgy_file in sgy_files]
+    results = run_batch(downsample_file, tasks, processes, desc="Downsampling")
+    return report(results)
 
 if __name__ == "__main__":
     folder_path = r"I:\diff_dis_to_cavity\2024-06-28_sgy"  # Change this to your input folder
     current_sample_rate = 500  # Specify the current sample rate in Hz
     target_sample_rate = 100  # Desired downsampled frequency in Hz
-    main(folder_path, current_sample_rate, target_sample_rate)
\ No newline at end of file
+    processes = None  # Number of worker processes (None = number of CPU cores)
+    main(folder_path, current_sample_rate, target_sample_rate, processes)
\ No newline at end of file
@@ -10,11 +10,14 @@
 import numpy as np
 import segyio
 from scipy.fftpack import fft2, ifft2, fftshift, ifftshift
-from scipy.ndimage import gaussian_filter
 from scipy.signal.windows import tukey
 import os
 import matplotlib
 import matplotlib.pyplot as plt
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common_tools'))
+import design_cache
 
 # Ensure matplotlib works in a non-GUI environment
 matplotlib.use('Agg')
@@ -31,15 +34,7 @@ def define_filter_polygon(vmin, vmax, freq_min, freq_max, freqs, kx):
     """
     Define a polygonal filter mask for F-K filtering.
     """
-    nt = len(freqs)
-    nx = len(kx)
-    mask = np.zeros((nt, nx))
-    for i, f in enumerate(freqs):
-        for j, k in enumerate(kx):
-            velocity = np.inf if k == 0 else np.abs(f / k)
-            if vmin <= velocity <= vmax and freq_min <= np.abs(f) <= freq_max:
-                mask[i, j] = 1
-    return mask
+    return design_cache.fk_polygon_mask(vmin, vmax, freq_min, freq_max, freqs, kx)
 
 def fk_transform_and_filter_using_predefined_mask(seismic_data, mask):
     """
@@ -87,9 +82,7 @@ def apply_gaussian_decay(mask, sigma=10):
     Returns:
     - The smoothed mask.
     """
-    smoothed_mask = gaussian_filter(mask.astype(float), sigma=sigma)
-    smoothed_mask = np.clip(smoothed_mask, 0, 1)
-    return smoothed_mask
+    return design_cache.gaussian_decay(mask, sigma)
 
 def plot_six_combined(seismic_data, seismic_filtered, fk_data, fk_filtered, mask, freqs, kx, input_file_base, fmax=500):
     """
@@ -11,6 +11,7 @@
 import segyio
 import numpy as np
 import os
+from sgy_index import load_index, build_index
 
 def find_sgy_files(directory, start_filename, end_filename):
     """
@@ -28,6 +29,23 @@ def find_sgy_files(directory, start_filename, end_filename):
 
     return [os.path.join(directory, f) for f in files[start_index:end_index+1]]
 
+def count_traces(file_list):
+    """
+    Count the traces of all files, using the directory's .sgyidx sidecar when there is one.
+    """
+    directory = os.path.dirname(file_list[0])
+    if load_index(directory) is not None:
+        index = build_index(directory)  # Only rescans files changed since the last build
+        counts = dict(zip(index.files["file_name"].tolist(), index.files["trace_count"].tolist()))
+        if all(os.path.basename(f) in counts for f in file_list):
+            return sum(counts[os.path.basename(f)] for f in file_list)
+
+    total_traces = 0
+    for f in file_list:
+        with segyio.open(f, 'r', ignore_geometry=True) as src:
+            total_traces += src.tracecount
+    return total_traces
+
 def merge_sgy_files(file_list, output_file):
     """
     Merge multiple SEG-Y files into a single SEG-Y file.
@@ -37,10 +55,7 @@ def merge_sgy_files(file_list, output_file):
         return
 
     # Calculate the total number of traces from all files
-    total_traces = 0
-    for f in file_list:
-        with segyio.open(f, 'r', ignore_geometry=True) as src:
-            total_traces += src.tracecount
+    total_traces = count_traces(file_list)
 
     # Read specifications from the first file
     with segyio.open(file_list[0], 'r', ignore_geometry=True) as first_file:
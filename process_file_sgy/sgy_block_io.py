@@ -0,0 +1,250 @@
+# -*- encoding: utf-8 -*-
+'''
+@File        :   sgy_block_io.py
+@Time        :   2026/10/18 11:02:31
+@Author      :   Haiyang Liao
+@Affiliation :   Nanjing University (NJU)
+@Contact     :   haiyangliao@smail.nju.edu.cn
+@Description :   Whole-file SEG-Y block I/O with numpy. A SEG-Y file is laid out as the
+                 3600-byte file header followed by fixed-size trace records, so the trace
+                 records can be mapped as one structured array and filled with array
+                 operations instead of one segyio call per trace.
+'''
+
+
+import os
+import numpy as np
+
+TEXT_HEADER_BYTES = 3200
+BINARY_HEADER_BYTES = 400
+FILE_HEADER_BYTES = TEXT_HEADER_BYTES + BINARY_HEADER_BYTES
+TRACE_HEADER_BYTES = 240
+
+IBM_FLOAT = 1   # Data sample format code: 4-byte IBM float
+IEEE_FLOAT = 5  # Data sample format code: 4-byte IEEE float
+
+# Data sample format code -> on-disk sample type
+SAMPLE_FORMATS = {
+    IBM_FLOAT: ">u4",  # Decoded with ibm_to_ieee
+    2: ">i4",
+    3: ">i2",
+    IEEE_FLOAT: ">f4",
+    8: "i1",
+}
+
+# Trace header fields: name -> (byte position as in segyio.TraceField, big-endian type)
+TRACE_HEADER_FIELDS = {
+    "TRACE_SEQUENCE_LINE": (1, ">i4"),
+    "TRACE_SEQUENCE_FILE": (5, ">i4"),
+    "FieldRecord": (9, ">i4"),
+    "TraceNumber": (13, ">i4"),
+    "CDP": (21, ">i4"),
+    "offset": (37, ">i4"),
+    "SourceGroupScalar": (71, ">i2"),
+    "SourceX": (73, ">i4"),
+    "SourceY": (77, ">i4"),
+    "GroupX": (81, ">i4"),
+    "GroupY": (85, ">i4"),
+    "DelayRecordingTime": (109, ">i2"),
+    "TRACE_SAMPLE_COUNT": (115, ">u2"),
+    "TRACE_SAMPLE_INTERVAL": (117, ">u2"),
+    "YearDataRecorded": (157, ">i2"),
+    "DayOfYear": (159, ">i2"),
+    "HourOfDay": (161, ">i2"),
+    "MinuteOfHour": (163, ">i2"),
+    "SecondOfMinute": (165, ">i2"),
+}
+
+# Binary header fields: name -> (byte position as in segyio.BinField, big-endian type)
+BINARY_HEADER_FIELDS = {
+    "Traces": (3213, ">u2"),
+    "AuxTraces": (3215, ">u2"),
+    "Interval": (3217, ">u2"),
+    "IntervalOriginal": (3219, ">u2"),
+    "Samples": (3221, ">u2"),
+    "SamplesOriginal": (3223, ">u2"),
+    "Format": (3225, ">i2"),
+    "ExtendedHeaders": (3505, ">i2"),
+}
+
+
+def _fields_dtype(fields, base, itemsize):
+    return np.dtype({
+        "names": list(fields),
+        "formats": [fmt for _, fmt in fields.values()],
+        "offsets": [pos - base for pos, _ in fields.values()],
+        "itemsize": itemsize,
+    })
+
+
+TRACE_HEADER_DTYPE = _fields_dtype(TRACE_HEADER_FIELDS, 1, TRACE_HEADER_BYTES)
+BINARY_HEADER_DTYPE = _fields_dtype(BINARY_HEADER_FIELDS, TEXT_HEADER_BYTES + 1, BINARY_HEADER_BYTES)
+
+
+def trace_record_dtype(num_samples, sample_dtype=">f4", raw_header=False):
+    """
+    Structured dtype of one trace record: the 240-byte header followed by the samples.
+
+    Args:
+        num_samples (int): Samples per trace.
+        sample_dtype (str): On-disk sample type.
+        raw_header (bool): Type the header as 240 opaque bytes, so copies keep every
+                           field and not only those in `TRACE_HEADER_FIELDS`.
+
+    Returns:
+        np.dtype: Record dtype with fields `header` and `data`.
+    """
+    header_dtype = np.dtype((np.void, TRACE_HEADER_BYTES)) if raw_header else TRACE_HEADER_DTYPE
+    return np.dtype([("header", header_dtype), ("data", sample_dtype, (num_samples,))])
+
+
+def make_text_header(lines=None):
+    """
+    Build a 3200-byte EBCDIC textual header.
+
+    Args:
+        lines (dict): Optional {line number (1-40): text}.
+
+    Returns:
+        bytes: The encoded textual header.
+    """
+    lines = lines or {}
+    rows = [f"C{i:2d} {lines.get(i, '')}"[:80].ljust(80) for i in range(1, 41)]
+    return "".join(rows).encode("cp037")
+
+
+def create_sgy(path, trace_count, num_samples, sample_interval_us, text_lines=None):
+    """
+    Preallocate a SEG-Y file and map its trace records.
+
+    The file header is written in full; the trace records are returned as a writable
+    memmap so headers and samples can be filled with array assignments. The sample
+    format is 4-byte IEEE float. Sample count, sample interval and the 1-based trace
+    sequence numbers are already set in every trace header.
+
+    Args:
+        path (str): Output SEG-Y path.
+        trace_count (int): Number of traces.
+        num_samples (int): Samples per trace.
+        sample_interval_us (int): Sample interval in microseconds.
+        text_lines (dict): Optional textual header lines, see `make_text_header`.
+
+    Returns:
+        np.memmap: Trace records of dtype `trace_record_dtype(num_samples)`.
+    """
+    record_dtype = trace_record_dtype(num_samples)
+
+    binary = np.zeros((), dtype=BINARY_HEADER_DTYPE)
+    binary["Traces"] = trace_count
+    binary["AuxTraces"] = trace_count
+    binary["Interval"] = binary["IntervalOriginal"] = sample_interval_us
+    binary["Samples"] = binary["SamplesOriginal"] = num_samples
+    binary["Format"] = IEEE_FLOAT
+
+    with open(path, "wb") as f:
+        f.write(make_text_header(text_lines))
+        f.write(binary.tobytes())
+        f.truncate(FILE_HEADER_BYTES + trace_count * record_dtype.itemsize)
+
+    records = np.memmap(path, dtype=record_dtype, mode="r+", offset=FILE_HEADER_BYTES, shape=(trace_count,))
+    sequence = np.arange(1, trace_count + 1)
+    records["header"]["TRACE_SEQUENCE_LINE"] = sequence
+    records["header"]["TraceNumber"] = sequence
+    records["header"]["TRACE_SAMPLE_COUNT"] = num_samples
+    records["header"]["TRACE_SAMPLE_INTERVAL"] = sample_interval_us
+    return records
+
+
+def write_sgy(path, data, sample_interval_us, text_lines=None):
+    """
+    Write a (trace_count, num_samples) array to a new SEG-Y file in one pass.
+
+    Args:
+        path (str): Output SEG-Y path.
+        data (np.ndarray): Trace data, one row per trace (may be a memmap view).
+        sample_interval_us (int): Sample interval in microseconds.
+        text_lines (dict): Optional textual header lines.
+    """
+    trace_count, num_samples = data.shape
+    records = create_sgy(path, trace_count, num_samples, sample_interval_us, text_lines)
+    records["data"] = data
+    records.flush()
+    del records
+
+
+def ibm_to_ieee(raw):
+    """
+    Decode 4-byte IBM floats (read as unsigned 32-bit integers) to float32.
+
+    Args:
+        raw (np.ndarray): Unsigned 32-bit integers holding IBM float bit patterns.
+
+    Returns:
+        np.ndarray: float32 array of the same shape.
+    """
+    raw = np.asarray(raw, dtype=np.uint32)
+    sign = np.where(raw >> 31, -1.0, 1.0)
+    exponent = ((raw >> 24) & 0x7F).astype(np.int32) - 64
+    mantissa = (raw & 0x00FFFFFF) / float(1 << 24)
+    return (sign * np.ldexp(mantissa, 4 * exponent)).astype(np.float32)
+
+
+def decode_samples(data, format_code):
+    """
+    Convert on-disk samples to float32.
+
+    Args:
+        data (np.ndarray): Samples as stored (e.g. the `data` field of the trace records).
+        format_code (int): Data sample format code from the binary header.
+
+    Returns:
+        np.ndarray: float32 samples.
+    """
+    if format_code == IBM_FLOAT:
+        return ibm_to_ieee(data)
+    return np.asarray(data, dtype=np.float32)
+
+
+def read_binary_header(path):
+    """
+    Read the binary file header fields of a SEG-Y file.
+
+    Args:
+        path (str): SEG-Y path.
+
+    Returns:
+        dict: Binary header fields, plus `data_offset` (byte offset of the first trace)
+              and `trace_count` derived from the file size.
+    """
+    binary = np.fromfile(path, dtype=BINARY_HEADER_DTYPE, count=1, offset=TEXT_HEADER_BYTES)
+    if len(binary) == 0:
+        raise ValueError(f"File is shorter than the SEG-Y file header: {path}")
+    header = {name: int(binary[name][0]) for name in BINARY_HEADER_FIELDS}
+
+    if header["Format"] not in SAMPLE_FORMATS:
+        raise ValueError(f"Unsupported sample format {header['Format']} in {path}")
+    header["data_offset"] = FILE_HEADER_BYTES + max(header["ExtendedHeaders"], 0) * TEXT_HEADER_BYTES
+
+    record_size = trace_record_dtype(header["Samples"], SAMPLE_FORMATS[header["Format"]]).itemsize
+    header["trace_count"] = (os.path.getsize(path) - header["data_offset"]) // record_size
+    return header
+
+
+def open_sgy(path, mode="r", raw_header=False):
+    """
+    Map the trace records of an existing SEG-Y file.
+
+    Args:
+        path (str): SEG-Y path.
+        mode (str): memmap mode, "r" or "r+".
+        raw_header (bool): Map the trace headers as opaque bytes, see `trace_record_dtype`.
+
+    Returns:
+        tuple: (binary header dict from `read_binary_header`, np.memmap of trace records).
+               Decode the `data` field with `decode_samples`.
+    """
+    binary = read_binary_header(path)
+    record_dtype = trace_record_dtype(binary["Samples"], SAMPLE_FORMATS[binary["Format"]], raw_header)
+    records = np.memmap(path, dtype=record_dtype, mode=mode, offset=binary["data_offset"],
+                        shape=(binary["trace_count"],))
+    return binary, records
@@ -0,0 +1,301 @@
+# -*- encoding: utf-8 -*-
+'''
+@File        :   sgy_index.py
+@Time        :   2026/10/18 13:20:05
+@Author      :   Haiyang Liao
+@Affiliation :   Nanjing University (NJU)
+@Contact     :   haiyangliao@smail.nju.edu.cn
+@Description :   Sidecar index (`.sgyidx`) for a directory of SEG-Y files. The directory is
+                 scanned once; per-file layout (sample interval, sample count, trace count,
+                 start time from the file name) and per-trace byte offsets plus key header
+                 fields are stored as columns, so a request such as "traces 90-203 from
+                 20:00 to 22:00" resolves to byte ranges without reopening every file.
+'''
+
+
+import os
+import re
+import sys
+import numpy as np
+from sgy_block_io import (SAMPLE_FORMATS, TRACE_HEADER_BYTES, decode_samples, open_sgy,
+                          trace_record_dtype)
+
+INDEX_NAME = "index.sgyidx"
+INDEX_VERSION = 1
+
+# Trace header fields stored in the index
+INDEXED_TRACE_FIELDS = ["TraceNumber", "FieldRecord", "offset", "SourceGroupScalar",
+                        "SourceX", "GroupX", "GroupY"]
+
+FILE_DTYPE = np.dtype([
+    ("file_name", "U256"),
+    ("start_time", "datetime64[us]"),
+    ("sample_interval_us", np.int32),
+    ("num_samples", np.int32),
+    ("trace_count", np.int64),
+    ("format", np.int16),
+    ("data_offset", np.int64),
+    ("record_size", np.int64),
+    ("file_size", np.int64),
+    ("mtime", np.float64),
+])
+
+# e.g. 2024-07-10-01-29-40-out.sgy or 2024-05-07-18-19-28.000_24.851_output.sgy
+FILE_TIME_PATTERN = re.compile(r"(\d{4}-\d{2}-\d{2})-(\d{2})-(\d{2})-(\d{2})(\.\d+)?")
+
+
+def parse_file_time(file_name):
+    """
+    Parse the start time from a SEG-Y file name.
+
+    Args:
+        file_name (str): Base name, e.g. `2024-07-10-01-29-40-out.sgy`.
+
+    Returns:
+        np.datetime64: Start time in microseconds, or NaT if the name has no time stamp.
+    """
+    match = FILE_TIME_PATTERN.search(file_name)
+    if not match:
+        return np.datetime64("NaT", "us")
+    date, hour, minute, second, fraction = match.groups()
+    return np.datetime64(f"{date}T{hour}:{minute}:{second}{fraction or ''}", "us")
+
+
+def scan_sgy_file(path):
+    """
+    Read the layout and the indexed trace header fields of one SEG-Y file.
+
+    Args:
+        path (str): SEG-Y path.
+
+    Returns:
+        tuple: (file entry dict, dict of per-trace columns).
+    """
+    binary, records = open_sgy(path)
+    headers = records["header"]
+    traces = {name: np.array(headers[name], dtype=np.int32) for name in INDEXED_TRACE_FIELDS}
+    record_size = records.dtype.itemsize
+    traces["byte_offset"] = binary["data_offset"] + np.arange(binary["trace_count"], dtype=np.int64) * record_size
+    del records
+
+    stat = os.stat(path)
+    entry = {
+        "file_name": os.path.basename(path),
+        "start_time": parse_file_time(os.path.basename(path)),
+        "sample_interval_us": binary["Interval"],
+        "num_samples": binary["Samples"],
+        "trace_count": binary["trace_count"],
+        "format": binary["Format"],
+        "data_offset": binary["data_offset"],
+        "record_size": record_size,
+        "file_size": stat.st_size,
+        "mtime": stat.st_mtime,
+    }
+    return entry, traces
+
+
+class SgyIndex:
+    """
+    Columnar index of the SEG-Y files in one directory.
+
+    `files` holds one row per file and `traces` one row per trace; `traces["file_id"]`
+    points into `files`. Use `build_index` or `load_index` to create one.
+    """
+
+    def __init__(self, directory, files, traces):
+        self.directory = directory
+        self.files = files
+        self.traces = traces
+
+    @property
+    def paths(self):
+        return [os.path.join(self.directory, name) for name in self.files["file_name"]]
+
+    def file_traces(self, file_id):
+        """Per-trace columns of one file."""
+        mask = self.traces["file_id"] == file_id
+        return {name: column[mask] for name, column in self.traces.items()}
+
+    def end_times(self):
+        """End time (exclusive) of every file."""
+        duration_us = self.files["num_samples"].astype(np.int64) * self.files["sample_interval_us"]
+        return self.files["start_time"] + duration_us.astype("timedelta64[us]")
+
+    def select(self, first_trace=0, last_trace=None, start_time=None, end_time=None):
+        """
+        Resolve a trace range and time window to byte ranges.
+
+        Args:
+            first_trace (int): First trace (0-based index within each file, inclusive).
+            last_trace (int): Last trace (inclusive). Defaults to the last trace of each file.
+            start_time (str or np.datetime64): Window start, e.g. "2024-07-02T20:00:00".
+            end_time (str or np.datetime64): Window end (exclusive).
+
+        Returns:
+            list: One dict per overlapping file, in time order, with `file_id`, `path`,
+                  `first_trace`, `last_trace`, `first_sample`, `end_sample`, `format` and `byte_ranges`
+                  (an (n_traces, 2) array of absolute sample-block offsets and lengths).
+        """
+        starts = self.files["start_time"]
+        ends = self.end_times()
+        keep = np.ones(len(self.files), dtype=bool)
+        if start_time is not None:
+            keep &= ends > np.datetime64(start_time, "us")
+        if end_time is not None:
+            keep &= starts < np.datetime64(end_time, "us")
+
+        selection = []
+        for file_id in np.flatnonzero(keep)[np.argsort(starts[keep], kind="stable")]:
+            file = self.files[file_id]
+            dt_us = int(file["sample_interval_us"])
+            num_samples = int(file["num_samples"])
+            last = int(file["trace_count"]) - 1 if last_trace is None else min(last_trace, int(file["trace_count"]) - 1)
+            if first_trace > last:
+                continue
+
+            first_sample, end_sample = 0, num_samples
+            if start_time is not None:
+                offset_us = (np.datetime64(start_time, "us") - file["start_time"]).astype(np.int64)
+                first_sample = int(np.clip(-(-offset_us // dt_us), 0, num_samples))
+            if end_time is not None:
+                offset_us = (np.datetime64(end_time, "us") - file["start_time"]).astype(np.int64)
+                end_sample = int(np.clip(-(-offset_us // dt_us), 0, num_samples))
+            if first_sample >= end_sample:
+                continue
+
+            traces = self.file_traces(file_id)
+            sample_bytes = np.dtype(SAMPLE_FORMATS[int(file["format"])]).itemsize
+            offsets = traces["byte_offset"][first_trace:last + 1] + TRACE_HEADER_BYTES + first_sample * sample_bytes
+            lengths = np.full(len(offsets), (end_sample - first_sample) * sample_bytes, dtype=np.int64)
+            selection.append({
+                "file_id": int(file_id),
+                "path": os.path.join(self.directory, file["file_name"]),
+                "first_trace": first_trace,
+                "last_trace": last,
+                "first_sample": first_sample,
+                "end_sample": end_sample,
+                "format": int(file["format"]),
+                "byte_ranges": np.column_stack([offsets, lengths]),
+            })
+        return selection
+
+    def read(self, first_trace=0, last_trace=None, start_time=None, end_time=None):
+        """
+        Read a trace range and time window, concatenating the files along time.
+
+        Arguments are the same as for `select`. All selected files must have the same
+        sample interval.
+
+        Returns:
+            np.ndarray: float32 array of shape (n_traces, n_samples).
+        """
+        blocks = []
+        for part in self.select(first_trace, last_trace, start_time, end_time):
+            file = self.files[part["file_id"]]
+            record_dtype = trace_record_dtype(int(file["num_samples"]), SAMPLE_FORMATS[part["format"]])
+            records = np.memmap(part["path"], dtype=record_dtype, mode="r", offset=int(file["data_offset"]),
+                                shape=(int(file["trace_count"]),))
+            data = records["data"][part["first_trace"]:part["last_trace"] + 1, part["first_sample"]:part["end_sample"]]
+            blocks.append(decode_samples(data, part["format"]))
+            del records
+        if not blocks:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate(blocks, axis=1)
+
+
+def _index_path(directory, index_path=None):
+    return index_path or os.path.join(directory, INDEX_NAME)
+
+
+def load_index(directory, index_path=None):
+    """
+    Load the sidecar index of a directory.
+
+    Args:
+        directory (str): Directory with SEG-Y files.
+        index_path (str): Sidecar path. Defaults to `<directory>/index.sgyidx`.
+
+    Returns:
+        SgyIndex: The loaded index, or None if there is no sidecar.
+    """
+    index_path = _index_path(directory, index_path)
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path, "rb") as f, np.load(f) as archive:
+        if int(archive["version"]) != INDEX_VERSION:
+            return None
+        files = archive["files"]
+        traces = {name[len("trace_"):]: archive[name] for name in archive.files if name.startswith("trace_")}
+    return SgyIndex(directory, files, traces)
+
+
+def build_index(directory, index_path=None, update=True):
+    """
+    Scan the SEG-Y files of a directory and write the `.sgyidx` sidecar.
+
+    With `update=True` an existing index is reused for files whose size and
+    modification time are unchanged, so only new or changed files are opened.
+
+    Args:
+        directory (str): Directory with SEG-Y files (not searched recursively).
+        index_path (str): Sidecar path. Defaults to `<directory>/index.sgyidx`.
+        update (bool): Reuse entries of an existing index; the sidecar is only
+                       rewritten if a file was added, removed or changed.
+
+    Returns:
+        SgyIndex: The new index.
+    """
+    index_path = _index_path(directory, index_path)
+    old = load_index(directory, index_path) if update else None
+    old_rows = {}
+    if old is not None:
+        old_rows = {name: i for i, name in enumerate(old.files["file_name"])}
+
+    file_names = sorted(f for f in os.listdir(directory) if f.lower().endswith((".sgy", ".segy")))
+    entries = []
+    columns = []
+    changed = old is None or len(old_rows) != len(file_names)
+    for file_id, file_name in enumerate(file_names):
+        path = os.path.join(directory, file_name)
+        row = old_rows.get(file_name)
+        stat = os.stat(path)
+        if row is not None and old.files["file_size"][row] == stat.st_size and old.files["mtime"][row] == stat.st_mtime:
+            entry = {name: old.files[name][row] for name in old.files.dtype.names}
+            traces = old.file_traces(row)
+        else:
+            changed = True
+            try:
+                entry, traces = scan_sgy_file(path)
+            except ValueError as e:
+                print(f"Skipping {file_name}: {e}")
+                continue
+        traces = {name: traces[name] for name in INDEXED_TRACE_FIELDS + ["byte_offset"]}
+        traces["file_id"] = np.full(len(traces["byte_offset"]), len(entries), dtype=np.int32)
+        entries.append(entry)
+        columns.append(traces)
+
+    if not changed:
+        return old
+
+    files = np.array([tuple(entry[name] for name in FILE_DTYPE.names) for entry in entries], dtype=FILE_DTYPE)
+    trace_names = INDEXED_TRACE_FIELDS + ["byte_offset", "file_id"]
+    if columns:
+        traces = {name: np.concatenate([c[name] for c in columns]) for name in trace_names}
+    else:
+        traces = {name: np.zeros(0, dtype=np.int64 if name == "byte_offset" else np.int32) for name in trace_names}
+
+    with open(index_path, "wb") as f:
+        np.savez_compressed(f, version=INDEX_VERSION, files=files,
+                            **{f"trace_{name}": column for name, column in traces.items()})
+    return SgyIndex(directory, files, traces)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python sgy_index.py <sgy_directory> [<sgy_directory> ...]")
+        sys.exit(1)
+
+    for directory in sys.argv[1:]:
+        index = build_index(directory)
+        print(f"Indexed {len(index.files)} files, {len(index.traces['file_id'])} traces: "
+              f"{_index_path(directory)}")
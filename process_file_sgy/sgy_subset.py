@@ -0,0 +1,194 @@
+# -*- encoding: utf-8 -*-
+'''
+@File        :   sgy_subset.py
+@Time        :   2026/10/18 14:41:26
+@Author      :   Haiyang Liao
+@Affiliation :   Nanjing University (NJU)
+@Contact     :   haiyangliao@smail.nju.edu.cn
+@Description :   Shared SEG-Y sub-setting engine. Copies trace ranges and/or time windows
+                 of a SEG-Y file as whole blocks: the source traces are read once, headers
+                 and samples are copied with array slicing, and the sequence-number and
+                 sample-count fields are rewritten in bulk. Several outputs can be cut from
+                 one read of the source.
+'''
+
+
+import os
+import numpy as np
+from sgy_block_io import (SAMPLE_FORMATS, TEXT_HEADER_BYTES, BINARY_HEADER_DTYPE, open_sgy,
+                          read_binary_header, trace_record_dtype)
+
+MAX_BLOCK_BYTES = 1024 ** 3  # Read the source block into memory up to this size
+
+
+def _sample_window(binary, start_time, end_time):
+    """Convert a time window in seconds to a [start_sample, end_sample) range."""
+    sample_interval = binary["Interval"] / 1_000_000
+    num_samples = binary["Samples"]
+    if start_time is None and end_time is None:
+        return 0, num_samples
+
+    start_sample = 0 if start_time is None else int(round(start_time / sample_interval))
+    end_sample = num_samples if end_time is None else int(round(end_time / sample_interval))
+    if start_sample < 0 or end_sample > num_samples or start_sample >= end_sample:
+        raise ValueError(f"Invalid time range. Data contains {num_samples * sample_interval} seconds.")
+    return start_sample, end_sample
+
+
+def _trace_window(binary, start_trace, end_trace):
+    """Validate a 1-based inclusive trace range and return it as a 0-based slice."""
+    trace_count = binary["trace_count"]
+    start_trace = 1 if start_trace is None else start_trace
+    end_trace = trace_count if end_trace is None else end_trace
+    if start_trace < 1 or end_trace > trace_count or start_trace > end_trace:
+        raise ValueError(f"Invalid trace range. File contains {trace_count} traces.")
+    return start_trace - 1, end_trace
+
+
+def _write_subset(dst_filename, file_header, binary, block, trace_slice, sample_slice):
+    """Write one output file from an in-memory (or mapped) block of raw trace records."""
+    num_samples = sample_slice.stop - sample_slice.start
+    trace_count = trace_slice.stop - trace_slice.start
+    sample_dtype = SAMPLE_FORMATS[binary["Format"]]
+
+    file_header = bytearray(file_header)
+    bin_view = np.frombuffer(file_header, dtype=BINARY_HEADER_DTYPE, count=1, offset=TEXT_HEADER_BYTES)
+    bin_view["Samples"] = num_samples
+
+    raw_dtype = trace_record_dtype(num_samples, sample_dtype, raw_header=True)
+    with open(dst_filename, "wb") as f:
+        f.write(file_header)
+        f.truncate(len(file_header) + trace_count * raw_dtype.itemsize)
+
+    dst = np.memmap(dst_filename, dtype=raw_dtype, mode="r+", offset=len(file_header), shape=(trace_count,))
+    dst["header"] = block["header"][trace_slice]
+    dst["data"] = block["data"][trace_slice, sample_slice]
+
+    headers = dst.view(trace_record_dtype(num_samples, sample_dtype))["header"]
+    headers["TRACE_SEQUENCE_LINE"] = np.arange(1, trace_count + 1)
+    if num_samples != binary["Samples"]:
+        headers["TRACE_SAMPLE_COUNT"] = num_samples
+    dst.flush()
+    del dst, headers
+
+
+def load_sgy(src_filename):
+    """
+    Read a whole SEG-Y file into memory with one read.
+
+    The result can be passed to `extract_subsets` as `source`, so a file that is
+    already in memory for other processing is not read from disk again.
+
+    Args:
+        src_filename (str): Path to the SEG-Y file.
+
+    Returns:
+        tuple: (binary header dict, raw file bytes as a uint8 array, raw trace records
+               of dtype `trace_record_dtype(..., raw_header=True)` viewing those bytes).
+    """
+    binary = read_binary_header(src_filename)
+    raw = np.fromfile(src_filename, dtype=np.uint8)
+    record_dtype = trace_record_dtype(binary["Samples"], SAMPLE_FORMATS[binary["Format"]], raw_header=True)
+    data_offset = binary["data_offset"]
+    records = raw[data_offset:data_offset + binary["trace_count"] * record_dtype.itemsize].view(record_dtype)
+    return binary, raw, records
+
+
+def extract_subsets(src_filename, subsets, max_block_bytes=MAX_BLOCK_BYTES, source=None):
+    """
+    Cut several trace-range / time-window subsets out of one SEG-Y file.
+
+    The traces spanned by all subsets are read from the source once. Text and binary
+    headers are copied from the source (with the sample count updated), trace headers
+    are copied unchanged except for TRACE_SEQUENCE_LINE, which is renumbered from 1.
+
+    Args:
+        src_filename (str): Path to the source SEG-Y file.
+        subsets (list): One dict per output with the keys
+            `dst_filename` (str),
+            `start_trace` / `end_trace` (int, 1-based inclusive, optional),
+            `start_time` / `end_time` (float, seconds from the first sample, optional).
+        max_block_bytes (int): Largest source block that is copied into memory; larger
+            spans are copied straight from the memory map.
+        source (tuple): The file as returned by `load_sgy`; if given, nothing is read from disk.
+
+    Returns:
+        list: Paths of the files written. Subsets with an invalid range are reported and skipped.
+    """
+    if source is not None:
+        binary, raw, src = source
+        file_header = raw[:binary["data_offset"]].tobytes()
+    else:
+        binary, src = open_sgy(src_filename, raw_header=True)
+        with open(src_filename, "rb") as f:
+            file_header = f.read(binary["data_offset"])
+
+    windows = []
+    for subset in subsets:
+        try:
+            first, last = _trace_window(binary, subset.get("start_trace"), subset.get("end_trace"))
+            start_sample, end_sample = _sample_window(binary, subset.get("start_time"), subset.get("end_time"))
+        except ValueError as e:
+            print(f"Skipping {subset['dst_filename']}: {e}")
+            continue
+        windows.append((subset["dst_filename"], first, last, start_sample, end_sample))
+
+    if not windows:
+        return []
+
+    # Read every trace the subsets need as one contiguous block
+    block_first = min(w[1] for w in windows)
+    block_last = max(w[2] for w in windows)
+    block = src[block_first:block_last]
+    if source is None and block.nbytes <= max_block_bytes:
+        block = np.array(block)
+
+    written = []
+    for dst_filename, first, last, start_sample, end_sample in windows:
+        _write_subset(dst_filename, file_header, binary, block,
+                      slice(first - block_first, last - block_first), slice(start_sample, end_sample))
+        written.append(dst_filename)
+    del block, src
+    return written
+
+
+def copy_trace_range(src_filename, dst_filename, start_trace, end_trace):
+    """
+    Copy a range of traces from a source SEG-Y file to a new destination SEG-Y file.
+
+    Args:
+        src_filename (str): Path to the source SEG-Y file.
+        dst_filename (str): Path to the destination SEG-Y file.
+        start_trace (int): Starting trace index (1-based).
+        end_trace (int): Ending trace index (1-based, inclusive).
+
+    Returns:
+        bool: True if the file was written.
+    """
+    written = extract_subsets(src_filename, [{"dst_filename": dst_filename,
+                                              "start_trace": start_trace, "end_trace": end_trace}])
+    return bool(written)
+
+
+def copy_time_range(src_filename, dst_filename, start_time, end_time):
+    """
+    Copy all traces of a SEG-Y file within a time window to a new SEG-Y file.
+
+    Args:
+        src_filename (str): Path to the source SEG-Y file.
+        dst_filename (str): Path to the destination SEG-Y file.
+        start_time (float): Start time in seconds, rounded to the nearest sample.
+        end_time (float): End time in seconds (exclusive), rounded to the nearest sample.
+
+    Returns:
+        bool: True if the file was written.
+    """
+    written = extract_subsets(src_filename, [{"dst_filename": dst_filename,
+                                              "start_time": start_time, "end_time": end_time}])
+    return bool(written)
+
+
+def output_name(src_filename, output_folder, suffix):
+    """Build `<output_folder>/<source name without extension><suffix>.sgy`."""
+    base_name = os.path.splitext(os.path.basename(src_filename))[0]
+    return os.path.join(output_folder, f"{base_name}{suffix}.sgy")
@@ -8,11 +8,14 @@
 '''
 
 
-import segyio
 import os
 import re
 import sys
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'process_file_sgy'))
+from sgy_block_io import read_binary_header
+from sgy_subset import extract_subsets
+
 # Accept directory path from command line
 if len(sys.argv) > 1:
     root_folder = sys.argv[1]
@@ -26,26 +29,6 @@ def extract_numbers_from_parent_folder_name(folder_path):
     parent_folder_name = os.path.basename(os.path.dirname(folder_path))
     return re.findall(r'\d+', parent_folder_name)
 
-def copy_trace_range(src_filename, dst_filename, start_trace, end_trace):
-    with segyio.open(src_filename, "r", ignore_geometry=True) as src:
-        if start_trace < 1 or end_trace > src.tracecount:
-            print(f"Invalid trace range. File contains {src.tracecount} traces.")
-            return
-
-        spec = segyio.tools.metadata(src)
-        spec.tracecount = end_trace - start_trace + 1
-
-        with segyio.create(dst_filename, spec) as dst:
-            dst.text[0] = src.text[0]
-            dst.bin = src.bin
-
-            for i in range(start_trace - 1, end_trace):
-                dst.trace[i - start_trace + 1] = src.trace[i]
-                dst.header[i - start_trace + 1] = src.header[i]
-                dst.header[i - start_trace + 1].update({segyio.TraceField.TRACE_SEQUENCE_LINE: i - start_trace + 2})
-
-        print(f"Copied traces {start_trace} to {end_trace} from {src_filename} to {dst_filename}.")
-
 def process_sgy_file(sgy_file_path, x1, x2):
 
     grandfather_folder_name = os.path.basename(os.path.dirname(os.path.dirname(os.path.dirname(sgy_file_path))))
@@ -60,21 +43,23 @@ def process_sgy_file(sgy_file_path, x1, x2):
 
     print(f"Calculated shot_trace_index: {shot_trace_index} for shot number: {shot_number}")
 
-    with segyio.open(sgy_file_path, "r", ignore_geometry=True) as src:
-        total_traces = src.tracecount
-        print(f"Total traces in file: {total_traces}")
+    total_traces = read_binary_header(sgy_file_path)["trace_count"]
+    print(f"Total traces in file: {total_traces}")
 
     start_trace = 1
     end_trace = total_traces  # Use total number of traces in the file as the end_trace
 
     path = os.path.dirname(sgy_file_path)
-    new_name = f"to_1028.sgy"
-    to_1028_name = os.path.join(path, new_name)
-    copy_trace_range(sgy_file_path, to_1028_name, start_trace, shot_trace_index)
-
-    new_name = f"to_1267.sgy"
-    to_1267_name = os.path.join(path, new_name)
-    copy_trace_range(sgy_file_path, to_1267_name, shot_trace_index, end_trace)
+    to_1028_name = os.path.join(path, "to_1028.sgy")
+    to_1267_name = os.path.join(path, "to_1267.sgy")
+
+    # Both halves share the shot trace and are cut from one read of the source
+    written = extract_subsets(sgy_file_path, [
+        {"dst_filename": to_1028_name, "start_trace": start_trace, "end_trace": shot_trace_index},
+        {"dst_filename": to_1267_name, "start_trace": shot_trace_index, "end_trace": end_trace},
+    ])
+    for dst_filename in written:
+        print(f"Copied traces from {sgy_file_path} to {dst_filename}.")
 
 def process_folder(root_folder, max_depth, x1, x2, x0):
     for subdir, dirs, files in os.walk(root_folder):
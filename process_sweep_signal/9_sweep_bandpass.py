@@ -10,11 +10,14 @@
 
 import segyio
 import numpy as np
-from scipy.signal import butter, filtfilt
+from scipy.signal import filtfilt
 import sys
 import shutil
 import os
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common_tools'))
+import design_cache
+
 # Check for required command-line arguments
 if len(sys.argv) < 5:
     print("Error: Insufficient arguments. Required: file_path, lowcut, highcut, fs, order")
@@ -44,7 +47,7 @@ def bandpass_filter(data, lowcut, highcut, fs, order=3):
     nyquist = 0.5 * fs
     low = lowcut / nyquist
     high = highcut / nyquist
-    b, a = butter(order, [low, high], btype='band')
+    b, a = design_cache.butter_ba(order, [low, high], 'band')
     y = filtfilt(b, a, data)
     return y
 